@@ -115,3 +115,7 @@ CONST_GPU_INSTANCE_PROFILE_MIG7_G = "MIG7g"
 
 CONST_CREDENTIAL_FORMAT_AZURE = "azure"
 CONST_CREDENTIAL_FORMAT_EXEC = "exec"
+
+# aks-periscope reports the diagnostics of each node in a diagnostic resource named after it
+CONST_PERISCOPE_DIAGNOSTIC_PREFIX = "aks-periscope-diagnostic-"
+CONST_PERISCOPE_DIAGNOSTICS_TIMEOUT = 120
@@ -0,0 +1,213 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import errno
+import os
+import platform
+import stat
+import tempfile
+import time
+
+import yaml  # pylint: disable=import-error
+from knack.log import get_logger
+from knack.prompting import NoTTYException, prompt_y_n
+from knack.util import CLIError
+
+logger = get_logger(__name__)
+
+# the libyaml implementations are much faster on large kubeconfig files, when PyYAML was built with them
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+KUBECONFIG_SECTIONS = ("clusters", "users", "contexts")
+# kubectl takes the same lock file while it writes a kubeconfig file
+KUBECONFIG_LOCK_SUFFIX = ".lock"
+KUBECONFIG_LOCK_TIMEOUT = 30
+KUBECONFIG_LOCK_STALE_SECONDS = 60
+
+
+class KubeconfigLock:
+    """Lock file held while a kubeconfig file is read, merged and written, so that commands run in parallel
+    don't overwrite each other's changes. A lock older than KUBECONFIG_LOCK_STALE_SECONDS is left over by a killed
+    process and is removed.
+    """
+
+    def __init__(self, path, timeout=KUBECONFIG_LOCK_TIMEOUT):
+        self.lock_path = path + KUBECONFIG_LOCK_SUFFIX
+        self.timeout = timeout
+
+    def __enter__(self):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                os.close(os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600))
+                return self
+            except OSError as ex:
+                # Windows fails with EACCES while the lock file is being removed
+                if ex.errno not in (errno.EEXIST, errno.EACCES):
+                    raise
+            if self._remove_if_stale():
+                continue
+            if time.time() >= deadline:
+                raise CLIError("Timed out waiting for the lock file {} of the kubeconfig file. Remove it if no "
+                               "other command is writing the kubeconfig file.".format(self.lock_path))
+            time.sleep(0.05)
+
+    def __exit__(self, *args):
+        try:
+            os.remove(self.lock_path)
+        except OSError:
+            pass
+
+    def _remove_if_stale(self):
+        try:
+            if time.time() - os.stat(self.lock_path).st_mtime < KUBECONFIG_LOCK_STALE_SECONDS:
+                return False
+            logger.warning("Removing the stale lock file %s", self.lock_path)
+            os.remove(self.lock_path)
+        except OSError:
+            pass
+        return True
+
+
+def load_kubernetes_configuration(filename):
+    try:
+        with open(filename) as stream:
+            return yaml.load(stream, Loader=YAML_LOADER)
+    except (IOError, OSError) as ex:
+        if getattr(ex, 'errno', 0) == errno.ENOENT:
+            raise CLIError('{} does not exist'.format(filename))
+    except (yaml.parser.ParserError, UnicodeDecodeError) as ex:
+        raise CLIError('Error parsing {} ({})'.format(filename, str(ex)))
+
+
+def write_kubernetes_configuration(filename, config):
+    """Replace the kubeconfig file with a complete new one, so that it is never read half written."""
+    # write through a symbolic link rather than replacing it
+    filename = os.path.realpath(filename)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(filename), prefix=os.path.basename(filename) + ".",
+                                     suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as stream:
+            yaml.dump(config, stream, Dumper=YAML_DUMPER, default_flow_style=False)
+        try:
+            os.chmod(temp_path, stat.S_IMODE(os.stat(filename).st_mode))
+        except OSError:
+            pass
+        os.replace(temp_path, filename)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _rename_contexts(addition, context_name):
+    if context_name is not None:
+        addition['contexts'][0]['name'] = context_name
+        addition['contexts'][0]['context']['cluster'] = context_name
+        addition['clusters'][0]['name'] = context_name
+        addition['current-context'] = context_name
+
+    # rename the admin context so it doesn't overwrite the user context
+    for ctx in addition.get('contexts') or []:
+        try:
+            if ctx['context']['user'].startswith('clusterAdmin'):
+                admin_name = ctx['name'] + '-admin'
+                addition['current-context'] = ctx['name'] = admin_name
+                break
+        except (KeyError, TypeError):
+            continue
+
+
+class KubeconfigMerger:
+    """Merges kubeconfigs into an existing one. The entries of each section are indexed by name, so merging a
+    kubeconfig takes as long as its own entries whatever the number of existing ones.
+    """
+
+    def __init__(self, existing, replace):
+        self.config = existing
+        self.replace = replace
+        self.sections = {}
+        if existing is not None:
+            self._index()
+
+    def _index(self):
+        for key in KUBECONFIG_SECTIONS:
+            entries = {}
+            for entry in self.config.get(key) or []:
+                name = entry.get('name') if isinstance(entry, dict) else None
+                # entries without a name, or with the name of a previous one, are kept as they are
+                entries[name if name is not None and name not in entries else object()] = entry
+            self.sections[key] = entries
+
+    def merge(self, addition, context_name=None):
+        """Merge a loaded kubeconfig and return its current context."""
+        _rename_contexts(addition, context_name)
+        if self.config is None:
+            self.config = addition
+            self._index()
+        else:
+            for key in KUBECONFIG_SECTIONS:
+                self._merge_section(key, addition.get(key))
+            self.config['current-context'] = addition.get('current-context')
+        return addition.get('current-context', 'UNKNOWN')
+
+    def _merge_section(self, key, additions):
+        entries = self.sections[key]
+        for entry in additions or []:
+            name = entry['name']
+            existing = entries.get(name)
+            if existing is not None:
+                if not (self.replace or existing == entry or self._confirm_overwrite(name)):
+                    msg = 'A different object named {} already exists in {} in your kubeconfig file.'
+                    raise CLIError(msg.format(name, key))
+                # the merged entry goes to the end, as if the existing one was removed
+                del entries[name]
+            entries[name] = entry
+
+    @staticmethod
+    def _confirm_overwrite(name):
+        msg = 'A different object named {} already exists in your kubeconfig file.\nOverwrite?'
+        try:
+            return prompt_y_n(msg.format(name))
+        except NoTTYException:
+            return False
+
+    def get_config(self):
+        if self.config is not None:
+            for key, entries in self.sections.items():
+                if entries or self.config.get(key) is not None:
+                    self.config[key] = list(entries.values())
+        return self.config
+
+
+def _check_permissions(filename):
+    # check that ~/.kube/config is only read- and writable by its owner
+    if platform.system() != 'Windows':
+        existing_file_perms = "{:o}".format(stat.S_IMODE(os.lstat(filename).st_mode))
+        if not existing_file_perms.endswith('600'):
+            logger.warning('%s has permissions "%s".\nIt should be readable and writable only by its owner.',
+                           filename, existing_file_perms)
+
+
+def merge_kubeconfigs(existing_file, kubeconfigs, replace):
+    """Merge kubeconfigs, given as (kubeconfig, context name) pairs where a kubeconfig is either YAML or already
+    loaded, into an existing kubeconfig file. The file is read and written once for all of them while its lock is
+    held. Returns the current context of each kubeconfig.
+    """
+    with KubeconfigLock(existing_file):
+        merger = KubeconfigMerger(load_kubernetes_configuration(existing_file), replace)
+        current_contexts = []
+        for kubeconfig, context_name in kubeconfigs:
+            addition = yaml.load(kubeconfig, Loader=YAML_LOADER) if isinstance(kubeconfig, str) else kubeconfig
+            if addition is None:
+                raise CLIError('failed to load additional configuration')
+            current_contexts.append(merger.merge(addition, context_name))
+
+        _check_permissions(existing_file)
+        write_kubernetes_configuration(existing_file, merger.get_config())
+    return current_contexts
@@ -14,7 +14,6 @@ import os.path
 import platform
 import re
 import ssl
-import stat
 import subprocess
 import sys
 import tempfile
@@ -52,7 +51,7 @@ from azure.graphrbac.models import (
 from dateutil.parser import parse  # pylint: disable=import-error
 from dateutil.relativedelta import relativedelta  # pylint: disable=import-error
 from knack.log import get_logger
-from knack.prompting import NoTTYException, prompt_pass
+from knack.prompting import prompt_pass
 from knack.util import CLIError
 from msrestazure.azure_exceptions import CloudError
 from six.moves.urllib.error import URLError  # pylint: disable=import-error
@@ -93,6 +92,8 @@ from ._consts import (
     CONST_MONITORING_LOG_ANALYTICS_WORKSPACE_RESOURCE_ID,
     CONST_MONITORING_USING_AAD_MSI_AUTH,
     CONST_OPEN_SERVICE_MESH_ADDON_NAME,
+    CONST_PERISCOPE_DIAGNOSTIC_PREFIX,
+    CONST_PERISCOPE_DIAGNOSTICS_TIMEOUT,
     CONST_ROTATION_POLL_INTERVAL,
     CONST_SCALE_DOWN_MODE_DELETE,
     CONST_SCALE_SET_PRIORITY_REGULAR,
@@ -105,6 +106,7 @@ from ._consts import (
 from ._helpers import (
     _trim_fqdn_name_containing_hcp,
 )
+from ._kubeconfig import load_kubernetes_configuration, merge_kubeconfigs
 from ._podidentity import (
     _ensure_managed_identity_operator_permission,
     _ensure_pod_identity_addon_is_enabled,
@@ -2358,104 +2360,22 @@ def _print_or_merge_credentials(path, kubeconfig, overwrite_existing, context_na
             pass
 
     # merge the new kubeconfig into the existing one
-    fd, temp_path = tempfile.mkstemp()
-    additional_file = os.fdopen(fd, 'w+t')
     try:
-        additional_file.write(kubeconfig)
-        additional_file.flush()
-        merge_kubernetes_configurations(
-            path, temp_path, overwrite_existing, context_name)
+        current_context, = merge_kubeconfigs(path, [(kubeconfig, context_name)], overwrite_existing)
     except yaml.YAMLError as ex:
         logger.warning(
             'Failed to merge credentials to kube config file: %s', ex)
-    finally:
-        additional_file.close()
-        os.remove(temp_path)
-
-
-def _handle_merge(existing, addition, key, replace):
-    if not addition[key]:
-        return
-    if existing[key] is None:
-        existing[key] = addition[key]
         return
-
-    for i in addition[key]:
-        for j in existing[key]:
-            if i['name'] == j['name']:
-                if replace or i == j:
-                    existing[key].remove(j)
-                else:
-                    from knack.prompting import prompt_y_n
-                    msg = 'A different object named {} already exists in your kubeconfig file.\nOverwrite?'
-                    overwrite = False
-                    try:
-                        overwrite = prompt_y_n(msg.format(i['name']))
-                    except NoTTYException:
-                        pass
-                    if overwrite:
-                        existing[key].remove(j)
-                    else:
-                        msg = 'A different object named {} already exists in {} in your kubeconfig file.'
-                        raise CLIError(msg.format(i['name'], key))
-        existing[key].append(i)
-
-
-def load_kubernetes_configuration(filename):
-    try:
-        with open(filename) as stream:
-            return yaml.safe_load(stream)
-    except (IOError, OSError) as ex:
-        if getattr(ex, 'errno', 0) == errno.ENOENT:
-            raise CLIError('{} does not exist'.format(filename))
-    except (yaml.parser.ParserError, UnicodeDecodeError) as ex:
-        raise CLIError('Error parsing {} ({})'.format(filename, str(ex)))
+    print('Merged "{}" as current context in {}'.format(current_context, path))
 
 
 def merge_kubernetes_configurations(existing_file, addition_file, replace, context_name=None):
-    existing = load_kubernetes_configuration(existing_file)
     addition = load_kubernetes_configuration(addition_file)
-
-    if context_name is not None:
-        addition['contexts'][0]['name'] = context_name
-        addition['contexts'][0]['context']['cluster'] = context_name
-        addition['clusters'][0]['name'] = context_name
-        addition['current-context'] = context_name
-
-    # rename the admin context so it doesn't overwrite the user context
-    for ctx in addition.get('contexts', []):
-        try:
-            if ctx['context']['user'].startswith('clusterAdmin'):
-                admin_name = ctx['name'] + '-admin'
-                addition['current-context'] = ctx['name'] = admin_name
-                break
-        except (KeyError, TypeError):
-            continue
-
     if addition is None:
         raise CLIError(
             'failed to load additional configuration from {}'.format(addition_file))
 
-    if existing is None:
-        existing = addition
-    else:
-        _handle_merge(existing, addition, 'clusters', replace)
-        _handle_merge(existing, addition, 'users', replace)
-        _handle_merge(existing, addition, 'contexts', replace)
-        existing['current-context'] = addition['current-context']
-
-    # check that ~/.kube/config is only read- and writable by its owner
-    if platform.system() != 'Windows':
-        existing_file_perms = "{:o}".format(
-            stat.S_IMODE(os.lstat(existing_file).st_mode))
-        if not existing_file_perms.endswith('600'):
-            logger.warning('%s has permissions "%s".\nIt should be readable and writable only by its owner.',
-                           existing_file, existing_file_perms)
-
-    with open(existing_file, 'w+') as stream:
-        yaml.safe_dump(existing, stream, default_flow_style=False)
-
-    current_context = addition.get('current-context', 'UNKNOWN')
+    current_context, = merge_kubeconfigs(existing_file, [(addition, context_name)], replace)
     msg = 'Merged "{}" as current context in {}'.format(
         current_context, existing_file)
     print(msg)
@@ -2489,25 +2409,98 @@ def get_storage_account_from_diag_settings(cli_ctx, resource_group_name, name):
     return None
 
 
-def display_diagnostics_report(temp_kubeconfig_path):   # pylint: disable=too-many-statements
-    if not which('kubectl'):
-        raise CLIError('Can not find kubectl executable in PATH')
-
-    nodes = subprocess.check_output(
+def _get_ready_nodes(temp_kubeconfig_path):
+    nodes = json.loads(subprocess.check_output(
         ["kubectl", "--kubeconfig", temp_kubeconfig_path,
-            "get", "node", "--no-headers"],
-        universal_newlines=True)
-    logger.debug(nodes)
-    node_lines = nodes.splitlines()
-    ready_nodes = {}
-    for node_line in node_lines:
-        columns = node_line.split()
-        logger.debug(node_line)
-        if columns[1] != "Ready":
+            "get", "node", "-o", "json"],
+        universal_newlines=True))
+    ready_nodes = []
+    for node in nodes.get("items", []):
+        node_name = node["metadata"]["name"]
+        ready = [condition.get("status") for condition in node.get("status", {}).get("conditions", [])
+                 if condition.get("type") == "Ready"]
+        if ready != ["True"]:
             logger.warning(
-                "Node %s is not Ready. Current state is: %s.", columns[0], columns[1])
+                "Node %s is not Ready. Current state is: %s.", node_name, "NotReady" if ready else "Unknown")
         else:
-            ready_nodes[columns[0]] = False
+            ready_nodes.append(node_name)
+    return ready_nodes
+
+
+def _iter_json_objects(stream):
+    """Yield the JSON objects printed one after the other, indented, by a kubectl watch."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    for line in stream:
+        buffer += line
+        # an object can only end with a closing brace at the start of a line
+        if not line.startswith("}"):
+            continue
+        try:
+            obj, _ = decoder.raw_decode(buffer.strip())
+        except ValueError:
+            continue
+        buffer = ""
+        yield obj
+
+
+def _watch_periscope_diagnostics(temp_kubeconfig_path, node_names, timeout=CONST_PERISCOPE_DIAGNOSTICS_TIMEOUT):
+    """Return the complete diagnostics of the nodes, by node name, as soon as all of them are reported or the
+    timeout expires. The diagnostic resources are read from a single kubectl watch, whatever the number of nodes.
+    """
+    diagnostics = {}
+    if not node_names:
+        return diagnostics
+
+    process = subprocess.Popen(
+        ["kubectl", "--kubeconfig", temp_kubeconfig_path, "get", "apd",
+            "-n", "aks-periscope", "-o", "json", "--watch"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    expired = threading.Event()
+
+    def _expire():
+        expired.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, _expire)
+    timer.start()
+    try:
+        for obj in _iter_json_objects(process.stdout):
+            for apd in obj.get("items", []) if obj.get("kind") == "List" else [obj]:
+                node_name = apd.get("metadata", {}).get("name", "")[len(CONST_PERISCOPE_DIAGNOSTIC_PREFIX):]
+                spec = apd.get("spec") or {}
+                if node_name not in node_names or not spec.get("networkconfig") or not spec.get("networkoutbound"):
+                    continue
+                logger.debug('Dns status for node %s is %s', node_name, spec["networkconfig"])
+                logger.debug('Network status for node %s is %s', node_name, spec["networkoutbound"])
+                diagnostics[node_name] = spec
+            print("Got {} diagnostic results for {} ready nodes\r".format(len(diagnostics), len(node_names)), end='')
+            if len(diagnostics) == len(node_names):
+                break
+    finally:
+        timer.cancel()
+        if process.poll() is None:
+            process.kill()
+        _, error = process.communicate()
+    print()
+
+    # the watch only ends by itself when kubectl fails
+    if process.returncode and not expired.is_set() and len(diagnostics) < len(node_names):
+        raise CLIError(error)
+    for node_name in node_names:
+        if node_name not in diagnostics:
+            logger.warning("The diagnostics information for node %s is not ready yet.", node_name)
+    return diagnostics
+
+
+def display_diagnostics_report(temp_kubeconfig_path):
+    if not which('kubectl'):
+        raise CLIError('Can not find kubectl executable in PATH')
+
+    try:
+        ready_nodes = _get_ready_nodes(temp_kubeconfig_path)
+    except subprocess.CalledProcessError as err:
+        raise CLIError(err.output)
 
     logger.debug('There are %s ready nodes in the cluster',
                  str(len(ready_nodes)))
@@ -2518,63 +2511,15 @@ def display_diagnostics_report(temp_kubeconfig_path):   # pylint: disable=too-ma
 
     network_config_array = []
     network_status_array = []
-    apds_created = False
-
-    max_retry = 10
-    for retry in range(0, max_retry):
-        if not apds_created:
-            apd = subprocess.check_output(
-                ["kubectl", "--kubeconfig", temp_kubeconfig_path, "get",
-                    "apd", "-n", "aks-periscope", "--no-headers"],
-                universal_newlines=True
-            )
-            apd_lines = apd.splitlines()
-            if apd_lines and 'No resources found' in apd_lines[0]:
-                apd_lines.pop(0)
-
-            print("Got {} diagnostic results for {} ready nodes{}\r".format(len(apd_lines),
-                                                                            len(ready_nodes),
-                                                                            '.' * retry), end='')
-            if len(apd_lines) < len(ready_nodes):
-                time.sleep(3)
-            else:
-                apds_created = True
-                print()
-        else:
-            for node_name in ready_nodes:
-                if ready_nodes[node_name]:
-                    continue
-                apdName = "aks-periscope-diagnostic-" + node_name
-                try:
-                    network_config = subprocess.check_output(
-                        ["kubectl", "--kubeconfig", temp_kubeconfig_path,
-                         "get", "apd", apdName, "-n",
-                         "aks-periscope", "-o=jsonpath={.spec.networkconfig}"],
-                        universal_newlines=True)
-                    logger.debug('Dns status for node %s is %s',
-                                 node_name, network_config)
-                    network_status = subprocess.check_output(
-                        ["kubectl", "--kubeconfig", temp_kubeconfig_path,
-                         "get", "apd", apdName, "-n",
-                         "aks-periscope", "-o=jsonpath={.spec.networkoutbound}"],
-                        universal_newlines=True)
-                    logger.debug('Network status for node %s is %s',
-                                 node_name, network_status)
-
-                    if not network_config or not network_status:
-                        print("The diagnostics information for node {} is not ready yet. "
-                              "Will try again in 10 seconds.".format(node_name))
-                        time.sleep(10)
-                        break
-
-                    network_config_array += json.loads(
-                        '[' + network_config + ']')
-                    network_status_object = json.loads(network_status)
-                    network_status_array += format_diag_status(
-                        network_status_object)
-                    ready_nodes[node_name] = True
-                except subprocess.CalledProcessError as err:
-                    raise CLIError(err.output)
+    diagnostics = _watch_periscope_diagnostics(temp_kubeconfig_path, ready_nodes)
+    for node_name in ready_nodes:
+        if node_name not in diagnostics:
+            continue
+        network_config_array += json.loads(
+            '[' + diagnostics[node_name]["networkconfig"] + ']')
+        network_status_object = json.loads(diagnostics[node_name]["networkoutbound"])
+        network_status_array += format_diag_status(
+            network_status_object)
 
     print()
     if network_config_array:
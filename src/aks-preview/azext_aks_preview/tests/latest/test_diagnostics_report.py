@@ -0,0 +1,90 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import io
+import json
+import unittest
+from unittest import mock
+
+from knack.util import CLIError
+
+from azext_aks_preview.custom import _watch_periscope_diagnostics, display_diagnostics_report
+
+
+def _apd(node_name, ready=True):
+    spec = {}
+    if ready:
+        spec = {
+            "networkconfig": json.dumps({"HostName": node_name, "NetworkPlugin": "kubenet"}),
+            "networkoutbound": json.dumps([{"Type": "DNS", "Status": "Connected"}]),
+        }
+    return {"kind": "Diagnostic", "metadata": {"name": "aks-periscope-diagnostic-" + node_name}, "spec": spec}
+
+
+def _node(name, status="True"):
+    return {"metadata": {"name": name}, "status": {"conditions": [{"type": "Ready", "status": status}]}}
+
+
+class _WatchProcess:
+    """ the output of a kubectl watch which stays open until it is killed, unless it fails """
+
+    def __init__(self, objects, returncode=None, error=""):
+        self.stdout = io.StringIO("".join(json.dumps(obj, indent=4) + "\n" for obj in objects))
+        self.returncode = returncode
+        self.error = error
+        self.killed = False
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self):
+        self.killed = True
+        self.returncode = -9
+
+    def communicate(self):
+        return "", self.error
+
+
+class TestDiagnosticsReport(unittest.TestCase):
+    def setUp(self):
+        for patcher in [mock.patch("azext_aks_preview.custom.which", return_value="kubectl"),
+                        mock.patch("builtins.print")]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_report_reads_all_nodes_from_one_watch(self):
+        node_names = ["node{}".format(i) for i in range(500)]
+        nodes = {"items": [_node(name) for name in node_names] + [_node("notready", "False")]}
+        # the diagnostics of a node are complete once periscope has updated its resource
+        apds = [_apd(name, ready=False) for name in node_names] + [_apd(name) for name in node_names]
+        process = _WatchProcess(apds)
+
+        with mock.patch("subprocess.check_output", return_value=json.dumps(nodes)) as check_output, \
+                mock.patch("subprocess.Popen", return_value=process) as popen, \
+                mock.patch("azext_aks_preview.custom.tabulate", return_value="") as tabulate:
+            display_diagnostics_report("kubeconfig")
+
+        check_output.assert_called_once()
+        popen.assert_called_once()
+        self.assertTrue(process.killed)
+        network_config = tabulate.call_args_list[0][0][0]
+        self.assertEqual(node_names, [config["HostName"] for config in network_config])
+        self.assertEqual(500, len(tabulate.call_args_list[1][0][0]))
+
+    def test_watch_returns_the_reported_nodes_when_it_expires(self):
+        process = _WatchProcess([{"kind": "List", "items": [_apd("node1")]}])
+        process.stdout = iter(list(process.stdout))
+        with mock.patch("subprocess.Popen", return_value=process):
+            diagnostics = _watch_periscope_diagnostics("kubeconfig", ["node1", "node2"], timeout=0)
+        self.assertEqual(["node1"], list(diagnostics))
+
+    def test_watch_failure(self):
+        process = _WatchProcess([], returncode=1, error="the server doesn't have a resource type \"apd\"")
+        with mock.patch("subprocess.Popen", return_value=process):
+            with self.assertRaises(CLIError):
+                _watch_periscope_diagnostics("kubeconfig", ["node1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import yaml
+from knack.util import CLIError
+
+from azext_aks_preview._kubeconfig import (KubeconfigLock, load_kubernetes_configuration, merge_kubeconfigs,
+                                           write_kubernetes_configuration)
+
+
+def _kubeconfig(name, server="https://server", user="clusterUser"):
+    return {
+        "apiVersion": "v1",
+        "kind": "Config",
+        "clusters": [{"name": name, "cluster": {"server": server}}],
+        "users": [{"name": "{}_{}".format(user, name), "user": {"token": "token"}}],
+        "contexts": [{"name": name, "context": {"cluster": name, "user": "{}_{}".format(user, name)}}],
+        "current-context": name,
+    }
+
+
+class TestMergeKubeconfigs(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "config")
+        with open(self.path, "w") as stream:
+            yaml.safe_dump(_kubeconfig("existing"), stream)
+
+    def _load(self):
+        with open(self.path) as stream:
+            return yaml.safe_load(stream)
+
+    def test_merge_replaces_entries_by_name(self):
+        merge_kubeconfigs(self.path, [(yaml.safe_dump(_kubeconfig("aks1")), None)], False)
+        merge_kubeconfigs(self.path, [(_kubeconfig("existing", server="https://new"), None)], True)
+
+        config = self._load()
+        self.assertEqual(["aks1", "existing"], [cluster["name"] for cluster in config["clusters"]])
+        self.assertEqual("https://new", config["clusters"][1]["cluster"]["server"])
+        self.assertEqual(["aks1", "existing"], [context["name"] for context in config["contexts"]])
+        self.assertEqual("existing", config["current-context"])
+        self.assertEqual([], [name for name in os.listdir(self.directory) if name != "config"])
+
+    def test_merge_conflict(self):
+        merge_kubeconfigs(self.path, [(_kubeconfig("existing"), None)], False)
+        with mock.patch("azext_aks_preview._kubeconfig.prompt_y_n", return_value=False):
+            with self.assertRaises(CLIError):
+                merge_kubeconfigs(self.path, [(_kubeconfig("existing", server="https://new"), None)], False)
+        self.assertEqual("https://server", self._load()["clusters"][0]["cluster"]["server"])
+
+        with mock.patch("azext_aks_preview._kubeconfig.prompt_y_n", return_value=True):
+            merge_kubeconfigs(self.path, [(_kubeconfig("existing", server="https://new"), None)], False)
+        self.assertEqual("https://new", self._load()["clusters"][0]["cluster"]["server"])
+
+    def test_merge_context_names(self):
+        current_contexts = merge_kubeconfigs(self.path, [(_kubeconfig("aks1"), "renamed"),
+                                                         (_kubeconfig("aks2", user="clusterAdmin"), None)], False)
+        self.assertEqual(["renamed", "aks2-admin"], current_contexts)
+        config = self._load()
+        self.assertEqual(["existing", "renamed", "aks2-admin"], [context["name"] for context in config["contexts"]])
+        self.assertEqual("aks2-admin", config["current-context"])
+
+    def test_merge_into_empty_file(self):
+        open(self.path, "w").close()
+        merge_kubeconfigs(self.path, [(_kubeconfig("aks1"), None), (_kubeconfig("aks2"), None)], False)
+        self.assertEqual(["aks1", "aks2"], [cluster["name"] for cluster in self._load()["clusters"]])
+
+    def test_merge_many_clusters_in_one_batch(self):
+        kubeconfigs = [(_kubeconfig("aks{}".format(i)), None) for i in range(1000)]
+        with mock.patch("azext_aks_preview._kubeconfig.load_kubernetes_configuration",
+                        wraps=load_kubernetes_configuration) as load, \
+                mock.patch("azext_aks_preview._kubeconfig.write_kubernetes_configuration",
+                           wraps=write_kubernetes_configuration) as write:
+            merge_kubeconfigs(self.path, kubeconfigs, False)
+            # the file is read and written once for the whole batch
+            load.assert_called_once_with(self.path)
+            write.assert_called_once()
+            # merging the same clusters again replaces every one of them by name
+            merge_kubeconfigs(self.path, kubeconfigs, True)
+        self.assertEqual(2, load.call_count)
+        self.assertEqual(2, write.call_count)
+        self.assertEqual(1001, len(self._load()["clusters"]))
+
+    def test_parallel_merges_are_all_kept(self):
+        threads = [threading.Thread(target=merge_kubeconfigs,
+                                    args=(self.path, [(_kubeconfig("aks{}".format(i)), None)], False))
+                   for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(11, len(self._load()["clusters"]))
+
+    def test_stale_lock_is_removed(self):
+        with KubeconfigLock(self.path):
+            with self.assertRaises(CLIError):
+                with KubeconfigLock(self.path, timeout=0.1):
+                    pass
+            old = time.time() - 120
+            os.utime(self.path + ".lock", (old, old))
+            with KubeconfigLock(self.path):
+                pass
+        self.assertFalse(os.path.exists(self.path + ".lock"))
+
+
+if __name__ == "__main__":
+    unittest.main()
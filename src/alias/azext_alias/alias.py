@@ -4,31 +4,33 @@
 # --------------------------------------------------------------------------------------------
 
 import os
-import re
+import sys
 import json
 import shlex
+import marshal
 import hashlib
 from collections import defaultdict
 
 from knack.log import get_logger
 
-import azext_alias
 from azext_alias import telemetry
 from azext_alias._const import (
     GLOBAL_CONFIG_DIR,
     ALIAS_FILE_NAME,
     ALIAS_HASH_FILE_NAME,
+    ALIAS_INDEX_FILE_NAME,
     COLLIDED_ALIAS_FILE_NAME,
     CONFIG_PARSING_ERROR,
     DEBUG_MSG,
     COLLISION_CHECK_LEVEL_DEPTH,
     POS_ARG_DEBUG_MSG
 )
-from azext_alias.argument import build_pos_args_table, render_template
+from azext_alias.argument import build_pos_args_table, render_template, get_placeholders
 from azext_alias.util import (
     is_alias_command,
     cache_reserved_commands,
     get_config_parser,
+    get_reserved_command_trie,
     build_tab_completion_table
 )
 
@@ -36,6 +38,10 @@ from azext_alias.util import (
 GLOBAL_ALIAS_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_FILE_NAME)
 GLOBAL_ALIAS_HASH_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_HASH_FILE_NAME)
 GLOBAL_COLLIDED_ALIAS_PATH = os.path.join(GLOBAL_CONFIG_DIR, COLLIDED_ALIAS_FILE_NAME)
+GLOBAL_ALIAS_INDEX_PATH = os.path.join(GLOBAL_CONFIG_DIR, ALIAS_INDEX_FILE_NAME)
+
+# Bump this whenever the structure of the compiled alias index changes
+ALIAS_INDEX_FORMAT = 1
 
 logger = get_logger(__name__)
 
@@ -48,8 +54,30 @@ class AliasManager(object):
         self.collided_alias = defaultdict(list)
         self.alias_config_str = ''
         self.alias_config_hash = ''
-        self.load_alias_table()
-        self.load_alias_hash()
+        self.alias_index_key = None
+        self.alias_index = self.load_alias_index()
+        # The alias config file only needs to be parsed if it has changed since the alias index was compiled
+        if self.alias_index is None:
+            self.load_alias_table()
+            self.load_alias_hash()
+
+    def load_alias_index(self):  # pylint: disable=no-self-use
+        """
+        Load the compiled alias index.
+
+        Returns:
+            The alias index, or None if it does not exist or the alias config file has changed since it was compiled.
+        """
+        try:
+            alias_config_stat = os.stat(GLOBAL_ALIAS_PATH)
+            with open(GLOBAL_ALIAS_INDEX_PATH, 'rb') as alias_index_file:
+                alias_index = marshal.loads(alias_index_file.read())
+            if alias_index['key'] != AliasManager.get_alias_index_key(alias_config_stat):
+                return None
+            telemetry.set_number_of_aliases_registered(alias_index['number_of_aliases'])
+            return alias_index
+        except (IOError, OSError, ValueError, EOFError, TypeError, KeyError):
+            return None
 
     def load_alias_table(self):
         """
@@ -59,6 +87,7 @@ class AliasManager(object):
             # w+ creates the alias config file if it does not exist
             open_mode = 'r+' if os.path.exists(GLOBAL_ALIAS_PATH) else 'w+'
             with open(GLOBAL_ALIAS_PATH, open_mode) as alias_config_file:
+                self.alias_index_key = AliasManager.get_alias_index_key(os.fstat(alias_config_file.fileno()))
                 self.alias_config_str = alias_config_file.read()
             self.alias_table.read(GLOBAL_ALIAS_PATH)
             telemetry.set_number_of_aliases_registered(len(self.alias_table.sections()))
@@ -118,19 +147,28 @@ class AliasManager(object):
         Returns:
             A list of transformed commands according to the alias configuration file.
         """
-        if self.parse_error():
-            # Write an empty hash so next run will check the config file against the entire command table again
-            AliasManager.write_alias_config_hash(empty_hash=True)
-            return args
-
-        # Only load the entire command table if it detects changes in the alias config
-        if self.detect_alias_config_change():
-            self.load_full_command_table()
-            self.collided_alias = AliasManager.build_collision_table(self.alias_table.sections())
-            build_tab_completion_table(self.alias_table)
-        else:
-            self.load_collided_alias()
+        if self.alias_index is None:
+            if self.parse_error():
+                # Write an empty hash so next run will check the config file against the entire command table again
+                AliasManager.write_alias_config_hash(empty_hash=True)
+                return args
+
+            # Only load the entire command table if it detects changes in the alias config
+            if self.detect_alias_config_change():
+                self.load_full_command_table()
+                self.collided_alias = AliasManager.build_collision_table(self.alias_table.sections())
+                build_tab_completion_table(self.alias_table)
+                AliasManager.write_alias_config_hash(self.alias_config_hash)
+                AliasManager.write_collided_alias(self.collided_alias)
+            else:
+                self.load_collided_alias()
 
+            self.alias_index = self.compile_alias_index()
+            if self.alias_index_key is not None:
+                AliasManager.write_alias_index(self.alias_index)
+
+        self.collided_alias = self.alias_index['collided_alias']
+        compiled_aliases = self.alias_index['aliases']
         transformed_commands = []
         alias_iter = enumerate(args, 1)
         for alias_index, alias in alias_iter:
@@ -144,16 +182,15 @@ class AliasManager(object):
                 transformed_commands.append(alias)
                 continue
 
-            full_alias = self.get_full_alias(alias)
-
-            if self.alias_table.has_option(full_alias, 'command'):
-                cmd_derived_from_alias = self.alias_table.get(full_alias, 'command')
-                telemetry.set_alias_hit(full_alias)
-            else:
+            compiled_alias = compiled_aliases.get(alias)
+            if compiled_alias is None:
                 transformed_commands.append(alias)
                 continue
 
-            pos_args_table = build_pos_args_table(full_alias, args, alias_index)
+            full_alias, cmd_derived_from_alias, split_command, pos_args_placeholder = marshal.loads(compiled_alias)
+            telemetry.set_alias_hit(full_alias)
+
+            pos_args_table = build_pos_args_table(full_alias, args, alias_index, pos_args_placeholder)
             if pos_args_table:
                 logger.debug(POS_ARG_DEBUG_MSG, full_alias, cmd_derived_from_alias, pos_args_table)
                 transformed_commands += render_template(cmd_derived_from_alias, pos_args_table)
@@ -163,7 +200,8 @@ class AliasManager(object):
                     next(alias_iter)
             else:
                 logger.debug(DEBUG_MSG, full_alias, cmd_derived_from_alias)
-                transformed_commands += shlex.split(cmd_derived_from_alias)
+                transformed_commands += split_command if split_command is not None \
+                    else shlex.split(cmd_derived_from_alias)
 
         return self.post_transform(transformed_commands)
 
@@ -182,17 +220,68 @@ class AliasManager(object):
 
         return next((section for section in self.alias_table.sections() if section.split()[0] == query), '')
 
+    def compile_alias_index(self):
+        """
+        Compile the alias table into a lookup table from each word the user may type to the alias it resolves to.
+
+        The compiled alias index is structured as:
+        {
+            'key': the key of the alias config file the index was compiled from (see get_alias_index_key()),
+            'number_of_aliases': the number of aliases registered,
+            'collided_alias': the collision table (see build_collision_table()),
+            'aliases': {
+                'word': marshal.dumps((full alias, command, split command, positional argument placeholders))
+            }
+        }
+        Each alias is marshalled on its own, so that loading the index with thousands of aliases only decodes
+        the aliases that are used. The split command and the placeholders are None if they cannot be extracted
+        (e.g. a malformed command), in which case the error is raised when the alias is used.
+
+        Returns:
+            The compiled alias index.
+        """
+        sections = self.alias_table.sections()
+        # Same resolution as get_full_alias(): an exact match of an alias or the first alias starting with the word
+        full_aliases = {}
+        for section in sections:
+            full_aliases.setdefault(section.split()[0], section)
+        full_aliases.update((section, section) for section in sections)
+
+        compiled_aliases = {}
+        for word, full_alias in full_aliases.items():
+            if not self.alias_table.has_option(full_alias, 'command'):
+                continue
+            cmd_derived_from_alias = self.alias_table.get(full_alias, 'command')
+            try:
+                pos_args_placeholder = get_placeholders(full_alias, check_duplicates=True)
+            except Exception:  # pylint: disable=broad-except
+                pos_args_placeholder = None
+            try:
+                split_command = None if pos_args_placeholder else shlex.split(cmd_derived_from_alias)
+            except ValueError:
+                split_command = None
+            compiled_aliases[word] = marshal.dumps((full_alias, cmd_derived_from_alias, split_command,
+                                                    pos_args_placeholder))
+
+        return {
+            'key': self.alias_index_key,
+            'number_of_aliases': len(sections),
+            'collided_alias': dict(self.collided_alias),
+            'aliases': compiled_aliases
+        }
+
     def load_full_command_table(self):
         """
-        Perform a full load of the command table to get all the reserved command words.
+        Get all the reserved command words, performing a full load of the command table
+        if it has changed since the last time it was loaded.
         """
         load_cmd_tbl_func = self.kwargs.get('load_cmd_tbl_func', lambda _: {})
-        cache_reserved_commands(load_cmd_tbl_func)
-        telemetry.set_full_command_table_loaded()
+        if cache_reserved_commands(load_cmd_tbl_func):
+            telemetry.set_full_command_table_loaded()
 
     def post_transform(self, args):
         """
-        Inject environment variables, and write hash to alias hash file after transforming alias to commands.
+        Inject environment variables after transforming alias to commands.
 
         Args:
             args: A list of args to post-transform.
@@ -208,9 +297,6 @@ class AliasManager(object):
             else:
                 post_transform_commands.append(os.path.expandvars(arg))
 
-        AliasManager.write_alias_config_hash(self.alias_config_hash)
-        AliasManager.write_collided_alias(self.collided_alias)
-
         return post_transform_commands
 
     def parse_error(self):
@@ -245,15 +331,14 @@ class AliasManager(object):
         Args:
             levels: the amount of levels we tranverse through the command table tree.
         """
+        command_trie = get_reserved_command_trie()
         collided_alias = defaultdict(list)
         for alias in aliases:
             # Only care about the first word in the alias because alias
             # cannot have spaces (unless they have positional arguments)
             word = alias.split()[0]
-            for level in range(1, levels + 1):
-                collision_regex = r'^{}{}($|\s)'.format(r'([a-z\-]*\s)' * (level - 1), word.lower())
-                if list(filter(re.compile(collision_regex).match, azext_alias.cached_reserved_commands)) \
-                        and level not in collided_alias[word]:
+            for level in command_trie.get_levels(word):
+                if level <= levels and level not in collided_alias[word]:
                     collided_alias[word].append(level)
 
         telemetry.set_collided_aliases(list(collided_alias.keys()))
@@ -282,6 +367,34 @@ class AliasManager(object):
             collided_alias_file.truncate()
             collided_alias_file.write(json.dumps(collided_alias_dict))
 
+    @staticmethod
+    def write_alias_index(alias_index):
+        """
+        Write the compiled alias index to the alias index file.
+
+        The index is written to a temporary file first, so that concurrent invocations never read a partial index.
+        """
+        temp_path = '{}.{}.tmp'.format(GLOBAL_ALIAS_INDEX_PATH, os.getpid())
+        try:
+            with open(temp_path, 'wb') as alias_index_file:
+                alias_index_file.write(marshal.dumps(alias_index))
+            os.replace(temp_path, GLOBAL_ALIAS_INDEX_PATH)
+        except (IOError, OSError, ValueError) as exception:
+            logger.debug('Alias Manager: Unable to write the alias index. Error detail: %s', exception)
+
+    @staticmethod
+    def get_alias_index_key(alias_config_stat):
+        """
+        Get the key of the alias index compiled from an alias config file.
+
+        Args:
+            alias_config_stat: The stat of the alias config file.
+
+        Returns:
+            A tuple that changes whenever the alias config file or the format of the index changes.
+        """
+        return (ALIAS_INDEX_FORMAT, sys.hexversion, alias_config_stat.st_size, alias_config_stat.st_mtime_ns)
+
     @staticmethod
     def process_exception_message(exception):
         """
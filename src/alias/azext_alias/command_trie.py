@@ -0,0 +1,146 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+from collections import defaultdict
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class CommandTrie(object):
+    """
+    A word-level prefix tree of the reserved commands.
+
+    Every node is a dictionary from a command word to its child node. Next to the tree, the parent commands
+    of every word are kept so that looking up where a word appears in the command table is a dictionary lookup.
+    For example, with the commands 'account list' and 'storage account create':
+    {
+        'tree': {'account': {'list': {}}, 'storage': {'account': {'create': {}}}},
+        'parents': {'account': ['', 'storage'], 'list': ['account'], 'storage': [''], 'create': ['storage account']}
+    }
+    """
+
+    def __init__(self, commands, tree, parents, version=''):
+        self.commands = commands
+        self.tree = tree
+        self.parents = parents
+        self.version = version
+
+    @classmethod
+    def from_commands(cls, commands, version=''):
+        """
+        Build the trie of a list of reserved commands.
+
+        Args:
+            commands: The list of reserved commands.
+            version: The version of the command table the commands come from.
+
+        Returns:
+            The command trie.
+        """
+        tree = {}
+        parents = defaultdict(list)
+        for command in commands:
+            node = tree
+            words = command.split()
+            for i, word in enumerate(words):
+                if word not in node:
+                    node[word] = {}
+                    parents[word].append(' '.join(words[:i]))
+                node = node[word]
+        return cls(commands, tree, dict(parents), version)
+
+    @classmethod
+    def load(cls, path, version):
+        """
+        Load a persisted trie.
+
+        Args:
+            path: The path of the persisted trie.
+            version: The version of the current command table.
+
+        Returns:
+            The command trie, or None if it does not exist or was built for another version of the command table.
+        """
+        try:
+            with open(path, 'r') as trie_file:
+                content = json.load(trie_file)
+            if content['version'] != version:
+                return None
+            return cls(content['commands'], content['tree'], content['parents'], version)
+        except (IOError, OSError, ValueError, KeyError, TypeError) as exception:
+            logger.debug('Alias Manager: Unable to load the reserved command trie. Error detail: %s', exception)
+            return None
+
+    def save(self, path):
+        """
+        Persist the trie.
+
+        Args:
+            path: The path to persist the trie to.
+        """
+        with open(path, 'w') as trie_file:
+            trie_file.write(json.dumps({
+                'version': self.version,
+                'commands': self.commands,
+                'tree': self.tree,
+                'parents': self.parents
+            }))
+
+    def get_node(self, command):
+        """
+        Get the node of a command in the trie.
+
+        Args:
+            command: The space-delimited command words.
+
+        Returns:
+            The children of the command, or None if the command is not in the trie.
+        """
+        node = self.tree
+        for word in command.split():
+            node = node.get(word)
+            if node is None:
+                return None
+        return node
+
+    def get_levels(self, word):
+        """
+        Get the command levels at which a word is reserved.
+
+        Args:
+            word: The word to look up.
+
+        Returns:
+            The sorted list of levels, where level 1 is the top of the command tree.
+        """
+        return sorted({len(parent.split()) + 1 for parent in self.parents.get(word.lower(), [])})
+
+    def get_parent_commands(self, command):
+        """
+        Get the parent commands under which a command appears in the command table.
+
+        Args:
+            command: The space-delimited command words.
+
+        Returns:
+            The list of parent commands, with '' standing for the top of the command tree.
+        """
+        words = command.split()
+        if not words:
+            return []
+
+        parent_commands = []
+        for parent in self.parents.get(words[0], []):
+            node = self.get_node(parent)[words[0]]
+            for word in words[1:]:
+                node = node.get(word)
+                if node is None:
+                    break
+            else:
+                parent_commands.append(parent)
+        return parent_commands
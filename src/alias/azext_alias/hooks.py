@@ -3,25 +3,94 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import os
 import json
 import timeit
 
 from knack.log import get_logger
 
 from azext_alias import telemetry
-from azext_alias.alias import AliasManager
+from azext_alias.alias import AliasManager, GLOBAL_ALIAS_PATH
 from azext_alias.util import (
     is_alias_command,
     cache_reserved_commands,
     get_alias_table,
     filter_aliases
 )
-from azext_alias._const import DEBUG_MSG_WITH_TIMING, GLOBAL_ALIAS_TAB_COMP_TABLE_PATH
+from azext_alias._const import (
+    DEBUG_MSG_WITH_TIMING,
+    COMPLETION_DEBUG_MSG_WITH_TIMING,
+    GLOBAL_ALIAS_TAB_COMP_TABLE_PATH
+)
 from azext_alias.command_tree import CommandBranch
 
 logger = get_logger(__name__)
 
 
+class AliasCompletionTable(object):
+    """
+    The aliases and the tab completion table, kept in memory across completion requests.
+
+    They are reloaded when the alias config file or the tab completion table changes on disk, so
+    a completion request (a keystroke in interactive mode) is a couple of stats and dict lookups.
+    """
+
+    def __init__(self):
+        self.key = None
+        # The alias -> the words of the command it points to
+        self.alias_commands = {}
+        # (The first word of the alias, the command it points to without positional arguments)
+        self.aliases = []
+        # The parent command -> the aliases that can be completed after it
+        self.candidates = {}
+
+    def refresh(self):
+        """
+        Reload the aliases and the tab completion table if they have changed on disk.
+
+        Returns:
+            The completion table itself.
+        """
+        key = (AliasCompletionTable.get_file_key(GLOBAL_ALIAS_PATH),
+               AliasCompletionTable.get_file_key(GLOBAL_ALIAS_TAB_COMP_TABLE_PATH))
+        if key == self.key:
+            return self
+
+        alias_table = get_alias_table()
+        try:
+            with open(GLOBAL_ALIAS_TAB_COMP_TABLE_PATH, 'r') as tab_completion_table_file:
+                tab_completion_table = json.loads(tab_completion_table_file.read())
+        except Exception:  # pylint: disable=broad-except
+            tab_completion_table = {}
+
+        self.alias_commands = {alias: alias_table.get(alias, 'command').split()
+                               for alias in alias_table.sections() if alias_table.has_option(alias, 'command')}
+        self.aliases = list(filter_aliases(alias_table))
+        self.candidates = {}
+        for alias, alias_command in self.aliases:
+            for parent_command in tab_completion_table.get(alias_command, []):
+                parent_candidates = self.candidates.setdefault(parent_command, [])
+                if alias not in parent_candidates:
+                    parent_candidates.append(alias)
+        self.key = key
+        return self
+
+    @staticmethod
+    def get_file_key(path):
+        """
+        Get a key that changes whenever the file changes, or None if the file does not exist.
+        """
+        try:
+            stat = os.stat(path)
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
+
+
+# The completion table of the current process, see AliasCompletionTable
+alias_completion_table = AliasCompletionTable()
+
+
 def alias_event_handler(_, **kwargs):
     """
     An event handler for alias transformation when EVENT_INVOKER_PRE_TRUNCATE_CMD_TBL event is invoked.
@@ -55,16 +124,17 @@ def enable_aliases_autocomplete(_, **kwargs):
     """
     Enable aliases autocomplete by injecting aliases into Azure CLI tab completion list.
     """
+    start_time = timeit.default_timer()
     external_completions = kwargs.get('external_completions', [])
     prefix = kwargs.get('cword_prefix', [])
     cur_commands = kwargs.get('comp_words', [])
-    alias_table = get_alias_table()
+    completion_table = alias_completion_table.refresh()
     # Transform aliases if they are in current commands,
     # so parser can get the correct subparser when chaining aliases
-    _transform_cur_commands(cur_commands, alias_table=alias_table)
+    _transform_cur_commands(cur_commands, alias_commands=completion_table.alias_commands)
 
-    for alias, alias_command in filter_aliases(alias_table):
-        if alias.startswith(prefix) and alias.strip() != prefix and _is_autocomplete_valid(cur_commands, alias_command):
+    for alias in _get_autocomplete_candidates(cur_commands, completion_table):
+        if alias.startswith(prefix) and alias.strip() != prefix:
             # Only autocomplete the first word because alias is space-delimited
             external_completions.append(alias)
 
@@ -74,11 +144,14 @@ def enable_aliases_autocomplete(_, **kwargs):
     if len(external_completions) == 1 and external_completions[0][-1] not in continuation_chars and not prequote:
         external_completions[0] += ' '
 
+    logger.debug(COMPLETION_DEBUG_MSG_WITH_TIMING, 'Tab completion', (timeit.default_timer() - start_time) * 1000)
+
 
 def transform_cur_commands_interactive(_, **kwargs):
     """
     Transform any aliases in current commands in interactive into their respective commands.
     """
+    start_time = timeit.default_timer()
     event_payload = kwargs.get('event_payload', {})
     # text_split = current commands typed in the interactive shell without any unfinished word
     # text = current commands typed in the interactive shell
@@ -88,6 +161,8 @@ def transform_cur_commands_interactive(_, **kwargs):
     event_payload.update({
         'text': ' '.join(cur_commands)
     })
+    logger.debug(COMPLETION_DEBUG_MSG_WITH_TIMING, 'Interactive alias transformation',
+                 (timeit.default_timer() - start_time) * 1000)
 
 
 def enable_aliases_autocomplete_interactive(_, **kwargs):
@@ -98,46 +173,44 @@ def enable_aliases_autocomplete_interactive(_, **kwargs):
     if not subtree or not hasattr(subtree, 'children'):
         return
 
-    for alias, alias_command in filter_aliases(get_alias_table()):
+    start_time = timeit.default_timer()
+    for alias, alias_command in alias_completion_table.refresh().aliases:
         # Only autocomplete the first word because alias is space-delimited
         if subtree.in_tree(alias_command.split()):
             subtree.add_child(CommandBranch(alias))
+    logger.debug(COMPLETION_DEBUG_MSG_WITH_TIMING, 'Interactive tab completion',
+                 (timeit.default_timer() - start_time) * 1000)
 
 
-def _is_autocomplete_valid(cur_commands, alias_command):
+def _get_autocomplete_candidates(cur_commands, completion_table=None):
     """
-    Determine whether autocomplete can be performed at the current state.
+    Get the aliases that can be autocompleted at the current state.
 
     Args:
-        parser: The current CLI parser.
         cur_commands: The current commands typed in the console.
-        alias_command: The alias command.
+        completion_table: The alias completion table.
 
     Returns:
-        True if autocomplete can be performed.
+        The list of aliases whose command can follow the current commands.
     """
+    completion_table = completion_table or alias_completion_table.refresh()
     parent_command = ' '.join(cur_commands[1:])
-    with open(GLOBAL_ALIAS_TAB_COMP_TABLE_PATH, 'r') as tab_completion_table_file:
-        try:
-            tab_completion_table = json.loads(tab_completion_table_file.read())
-            return alias_command in tab_completion_table and parent_command in tab_completion_table[alias_command]
-        except Exception:  # pylint: disable=broad-except
-            return False
+    return completion_table.candidates.get(parent_command, [])
 
 
-def _transform_cur_commands(cur_commands, alias_table=None):
+def _transform_cur_commands(cur_commands, alias_commands=None):
     """
     Transform any aliases in cur_commands into their respective commands.
 
     Args:
-        alias_table: The alias table.
         cur_commands: current commands typed in the console.
+        alias_commands: The dictionary from the aliases to the words of their commands.
     """
     transformed = []
-    alias_table = alias_table if alias_table else get_alias_table()
+    alias_commands = alias_commands if alias_commands is not None else alias_completion_table.refresh().alias_commands
     for cmd in cur_commands:
-        if cmd in alias_table.sections() and alias_table.has_option(cmd, 'command'):
-            transformed += alias_table.get(cmd, 'command').split()
+        if cmd in alias_commands:
+            transformed += alias_commands[cmd]
         else:
             transformed.append(cmd)
     cur_commands[:] = transformed
@@ -8,6 +8,8 @@
 import os
 import sys
 import shlex
+import shutil
+import tempfile
 import unittest
 from unittest.mock import Mock, patch
 from six.moves import configparser
@@ -148,13 +150,18 @@ TEST_FN = {
 class TestAlias(unittest.TestCase):
 
     def setUp(self):
-        azext_alias.alias.AliasManager.write_alias_config_hash = Mock()
-        azext_alias.alias.AliasManager.write_collided_alias = Mock()
-        self.patcher = patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS)
-        self.patcher.start()
+        self.patchers = [
+            patch('azext_alias.alias.AliasManager.write_alias_config_hash', Mock()),
+            patch('azext_alias.alias.AliasManager.write_collided_alias', Mock()),
+            patch('azext_alias.alias.AliasManager.write_alias_index', Mock()),
+            patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS)
+        ]
+        for patcher in self.patchers:
+            patcher.start()
 
     def tearDown(self):
-        self.patcher.stop()
+        for patcher in self.patchers:
+            patcher.stop()
 
     def test_build_empty_collision_table(self):
         alias_manager = self.get_alias_manager(DEFAULT_MOCK_ALIAS_STRING)
@@ -197,8 +204,80 @@ class TestAlias(unittest.TestCase):
         self.assertEqual(shlex.split(value[1]), alias_manager.post_transform(shlex.split(value[0])))
 
 
+class TestAliasIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_config_dir = tempfile.mkdtemp()
+        self.alias_path = os.path.join(self.mock_config_dir, 'alias')
+        self.patchers = [patch('azext_alias.cached_reserved_commands', TEST_RESERVED_COMMANDS)]
+        for name in ['GLOBAL_ALIAS_PATH', 'GLOBAL_ALIAS_HASH_PATH', 'GLOBAL_COLLIDED_ALIAS_PATH', 'GLOBAL_ALIAS_INDEX_PATH']:
+            self.patchers.append(patch('azext_alias.alias.{}'.format(name), os.path.join(self.mock_config_dir, name)))
+        self.patchers.append(patch('azext_alias.alias.GLOBAL_ALIAS_PATH', self.alias_path))
+        self.patchers.append(patch('azext_alias.util.GLOBAL_ALIAS_TAB_COMP_TABLE_PATH', os.path.join(self.mock_config_dir, 'tab_completion')))
+        for patcher in self.patchers:
+            patcher.start()
+        self.write_alias_config(DEFAULT_MOCK_ALIAS_STRING)
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.mock_config_dir)
+
+    def write_alias_config(self, alias_config_str):
+        with open(self.alias_path, 'w') as alias_config_file:
+            alias_config_file.write(alias_config_str)
+
+    def get_config_dir_state(self):
+        return {name: os.stat(os.path.join(self.mock_config_dir, name)).st_mtime_ns for name in os.listdir(self.mock_config_dir)}
+
+    def test_transform_with_alias_index(self):
+        alias_manager = azext_alias.alias.AliasManager()
+        self.assertIsNone(alias_manager.alias_index)
+        self.assertEqual(['account', 'list', '-otable'], alias_manager.transform(['ac', 'ls']))
+
+        config_dir_state = self.get_config_dir_state()
+        for test_case in TEST_DATA[TEST_TRANSFORM_ALIAS][:-1] + [('cp "a b" c', 'storage blob copy start-batch --source-uri "a b" --destination-container c')]:
+            alias_manager = azext_alias.alias.AliasManager()
+            # The alias config file is not parsed when the compiled alias index is up to date
+            self.assertIsNotNone(alias_manager.alias_index)
+            self.assertEqual([], alias_manager.alias_table.sections())
+            self.assertEqual(shlex.split(test_case[1]), alias_manager.transform(shlex.split(test_case[0])))
+
+        with self.assertRaises(CLIError):
+            azext_alias.alias.AliasManager().transform(['cp', 'a'])
+        # Nothing is written when the alias config file has not changed
+        self.assertEqual(config_dir_state, self.get_config_dir_state())
+
+    def test_alias_index_is_recompiled_after_config_change(self):
+        azext_alias.alias.AliasManager().transform(['ac'])
+        self.write_alias_config(DEFAULT_MOCK_ALIAS_STRING + '\n[new]\ncommand = group delete\n')
+        alias_manager = azext_alias.alias.AliasManager()
+        self.assertIsNone(alias_manager.alias_index)
+        self.assertEqual(['group', 'delete'], alias_manager.transform(['new']))
+        self.assertEqual(['group', 'delete'], azext_alias.alias.AliasManager().transform(['new']))
+
+    def test_alias_index_with_2000_aliases(self):
+        self.write_alias_config(''.join('[alias{0}]\ncommand = group delete -n name{0} --yes\n\n'.format(i) for i in range(2000)))
+        args = ['alias1999', '--no-wait']
+        with patch('azext_alias.alias.AliasManager.write_alias_index', wraps=azext_alias.alias.AliasManager.write_alias_index) as write_alias_index:
+            self.assertEqual(['group', 'delete', '-n', 'name1999', '--yes', '--no-wait'], azext_alias.alias.AliasManager().transform(args))
+        write_alias_index.assert_called_once()
+
+        # later invocations only read the compiled index, the alias config file is neither parsed nor compiled again
+        with patch('azext_alias.alias.AliasManager.load_alias_table') as load_alias_table, \
+                patch('azext_alias.alias.AliasManager.write_alias_index') as write_alias_index:
+            for i in [0, 1000, 1999]:
+                self.assertEqual(['group', 'delete', '-n', 'name{}'.format(i), '--yes', '--no-wait'],
+                                 azext_alias.alias.AliasManager().transform(['alias{}'.format(i), '--no-wait']))
+        load_alias_table.assert_not_called()
+        write_alias_index.assert_not_called()
+
+
 class MockAliasManager(azext_alias.alias.AliasManager):
 
+    def load_alias_index(self):
+        return None
+
     def load_alias_table(self):
 
         self.alias_config_str = self.kwargs.get('mock_alias_str', '')
@@ -0,0 +1,136 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: disable=line-too-long
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import azext_alias
+from azext_alias.alias import AliasManager
+from azext_alias.command_trie import CommandTrie
+from azext_alias.util import cache_reserved_commands, build_tab_completion_table, get_config_parser
+from azext_alias._const import ALIAS_TAB_COMP_TABLE_FILE_NAME, COMMAND_TRIE_FILE_NAME, COLLISION_CHECK_LEVEL_DEPTH
+from azext_alias.tests._const import TEST_RESERVED_COMMANDS
+
+
+def _full_command_table(groups=250, subgroups=6, commands_per_group=7):
+    """
+    A list of reserved commands as large as the command table of Azure CLI with all the extensions installed.
+    """
+    commands = []
+    for group in range(groups):
+        for subgroup in range(subgroups):
+            for command in range(commands_per_group):
+                commands.append('group{} sub{} command{}'.format(group, subgroup, command))
+            commands.append('group{} sub{} list'.format(group, subgroup))
+        commands.append('group{} list'.format(group))
+    return commands
+
+
+def _alias_table(aliases=500):
+    alias_table = get_config_parser()
+    for i in range(aliases):
+        alias_table.add_section('alias{}'.format(i))
+        alias_table.set('alias{}'.format(i), 'command', 'sub{} command{} -g {{{{ arg_1 }}}}'.format(i % 6, i % 7))
+    # A few aliases which are also reserved commands
+    for alias in ['list', 'group7', 'sub3']:
+        alias_table.add_section(alias)
+        alias_table.set(alias, 'command', 'group1 list')
+    return alias_table
+
+
+def _build_collision_table_with_regex(aliases, reserved_commands, levels=COLLISION_CHECK_LEVEL_DEPTH):
+    """
+    How the collision table used to be built, by matching every reserved command against a regex per alias and level.
+    """
+    collided_alias = {}
+    for alias in aliases:
+        word = alias.split()[0]
+        for level in range(1, levels + 1):
+            collision_regex = r'^{}{}($|\s)'.format(r'([a-z0-9\-]*\s)' * (level - 1), word.lower())
+            if list(filter(re.compile(collision_regex).match, reserved_commands)):
+                collided_alias.setdefault(word, []).append(level)
+    return collided_alias
+
+
+class TestCommandTrie(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_config_dir = tempfile.mkdtemp()
+        self.trie_path = os.path.join(self.mock_config_dir, COMMAND_TRIE_FILE_NAME)
+        self.patchers = [
+            mock.patch('azext_alias.util.GLOBAL_ALIAS_TAB_COMP_TABLE_PATH', os.path.join(self.mock_config_dir, ALIAS_TAB_COMP_TABLE_FILE_NAME)),
+            mock.patch('azext_alias.util.GLOBAL_COMMAND_TRIE_PATH', self.trie_path),
+            mock.patch('azext_alias.util.get_command_table_version', return_value='1'),
+            mock.patch('azext_alias.cached_reserved_commands', [])
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.mock_config_dir)
+
+    def test_command_trie(self):
+        trie = CommandTrie.from_commands(TEST_RESERVED_COMMANDS)
+        self.assertEqual([1, 2], trie.get_levels('account'))
+        self.assertEqual([2], trie.get_levels('DNS'))
+        self.assertEqual([], trie.get_levels('vm'))
+        self.assertEqual(['', 'storage'], trie.get_parent_commands('account'))
+        self.assertEqual(['storage'], trie.get_parent_commands('account create'))
+        self.assertEqual([], trie.get_parent_commands('account delete'))
+        self.assertEqual([], trie.get_parent_commands(''))
+        self.assertIsNone(trie.get_node('network vnet'))
+
+    def test_cache_reserved_commands_loads_command_table_once_per_version(self):
+        load_cmd_tbl_func = mock.Mock(return_value={command: None for command in TEST_RESERVED_COMMANDS})
+        self.assertTrue(cache_reserved_commands(load_cmd_tbl_func))
+        self.assertEqual(TEST_RESERVED_COMMANDS, azext_alias.cached_reserved_commands)
+
+        azext_alias.cached_reserved_commands = []
+        self.assertFalse(cache_reserved_commands(load_cmd_tbl_func))
+        self.assertEqual(TEST_RESERVED_COMMANDS, azext_alias.cached_reserved_commands)
+        self.assertEqual({'account': [1, 2], 'dns': [2]}, AliasManager.build_collision_table(['account', 'dns', 'vm']))
+        load_cmd_tbl_func.assert_called_once()
+
+        azext_alias.cached_reserved_commands = []
+        with mock.patch('azext_alias.util.get_command_table_version', return_value='2'):
+            self.assertTrue(cache_reserved_commands(load_cmd_tbl_func))
+        self.assertEqual(2, load_cmd_tbl_func.call_count)
+
+    def test_corrupted_command_trie_is_ignored(self):
+        with open(self.trie_path, 'w') as f:
+            f.write('{"version": "1", "comm')
+        self.assertIsNone(CommandTrie.load(self.trie_path, '1'))
+        self.assertTrue(cache_reserved_commands(lambda _: {'vm create': None}))
+        self.assertEqual(['vm create'], azext_alias.cached_reserved_commands)
+
+    def test_alias_tables_with_500_aliases(self):
+        reserved_commands = _full_command_table()
+        alias_table = _alias_table()
+        azext_alias.cached_reserved_commands = reserved_commands
+
+        # both tables are built from a single trie of the reserved commands, instead of a scan of them per alias
+        with mock.patch.object(CommandTrie, 'from_commands', wraps=CommandTrie.from_commands) as from_commands:
+            collided_alias = AliasManager.build_collision_table(alias_table.sections())
+            tab_completion_table = build_tab_completion_table(alias_table)
+        from_commands.assert_called_once_with(reserved_commands)
+        self.assertEqual({'list': [2, 3], 'group7': [1], 'sub3': [2]}, collided_alias)
+        self.assertEqual(['group{}'.format(i) for i in range(250)], tab_completion_table['sub1 command1'])
+        self.assertEqual([''], tab_completion_table['group1 list'])
+
+        # the regex scan is too slow to run over all the aliases, compare with it on a sample
+        sample = alias_table.sections()[:20] + ['list', 'group7', 'sub3']
+        self.assertEqual(collided_alias, _build_collision_table_with_regex(sample, reserved_commands))
+
+
+if __name__ == '__main__':
+    unittest.main()
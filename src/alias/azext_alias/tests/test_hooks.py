@@ -0,0 +1,134 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: disable=line-too-long
+
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_alias.hooks import (
+    AliasCompletionTable,
+    enable_aliases_autocomplete,
+    enable_aliases_autocomplete_interactive,
+    transform_cur_commands_interactive
+)
+from azext_alias.command_tree import CommandHead, CommandBranch
+from azext_alias.util import get_alias_table
+from azext_alias._const import ALIAS_FILE_NAME, ALIAS_TAB_COMP_TABLE_FILE_NAME
+
+TEST_ALIAS_STRING = '''
+[ac]
+command = account
+
+[ll]
+command = list-locations
+
+[dns {{ arg_1 }}]
+command = network dns {{ arg_1 }}
+
+[grp-del]
+command = group delete -n test
+'''
+
+TEST_TAB_COMPLETION_TABLE = {
+    'account': ['', 'storage'],
+    'list-locations': ['account'],
+    'network dns': ['']
+}
+
+
+class TestHooks(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_config_dir = tempfile.mkdtemp()
+        self.alias_path = os.path.join(self.mock_config_dir, ALIAS_FILE_NAME)
+        self.tab_completion_table_path = os.path.join(self.mock_config_dir, ALIAS_TAB_COMP_TABLE_FILE_NAME)
+        self.patchers = [
+            mock.patch('azext_alias.alias.GLOBAL_ALIAS_PATH', self.alias_path),
+            mock.patch('azext_alias.hooks.GLOBAL_ALIAS_PATH', self.alias_path),
+            mock.patch('azext_alias.hooks.GLOBAL_ALIAS_TAB_COMP_TABLE_PATH', self.tab_completion_table_path),
+            mock.patch('azext_alias.hooks.alias_completion_table', AliasCompletionTable())
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+        self.write_files(TEST_ALIAS_STRING, TEST_TAB_COMPLETION_TABLE)
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        shutil.rmtree(self.mock_config_dir)
+
+    def write_files(self, alias_config_str, tab_completion_table):
+        with open(self.alias_path, 'w') as alias_config_file:
+            alias_config_file.write(alias_config_str)
+        with open(self.tab_completion_table_path, 'w') as tab_completion_table_file:
+            tab_completion_table_file.write(json.dumps(tab_completion_table))
+
+    @staticmethod
+    def complete(comp_words, prefix=''):
+        external_completions = []
+        enable_aliases_autocomplete(None, external_completions=external_completions, cword_prefix=prefix,
+                                    comp_words=comp_words)
+        return external_completions
+
+    def test_enable_aliases_autocomplete(self):
+        self.assertEqual(['ac', 'dns'], self.complete(['az']))
+        self.assertEqual(['ac '], self.complete(['az'], prefix='a'))
+        self.assertEqual(['ac '], self.complete(['az', 'storage']))
+        # Aliases in the current commands are transformed before looking for candidates
+        self.assertEqual(['ll '], self.complete(['az', 'ac']))
+        self.assertEqual([], self.complete(['az', 'vm']))
+
+    def test_completion_table_is_cached(self):
+        with mock.patch('azext_alias.hooks.get_alias_table', wraps=get_alias_table) as get_alias_table_mock:
+            self.complete(['az'])
+            self.complete(['az', 'storage'])
+            transform_cur_commands_interactive(None, event_payload={'text': 'ac l'})
+            self.assertEqual(1, get_alias_table_mock.call_count)
+
+            # The completion table is reloaded when the tab completion table changes
+            self.write_files(TEST_ALIAS_STRING, {'account': ['', 'storage'], 'list-locations': ['account', 'storage account']})
+            self.assertEqual(['ll '], self.complete(['az', 'storage', 'ac']))
+            self.assertEqual(2, get_alias_table_mock.call_count)
+
+    def test_missing_tab_completion_table(self):
+        os.remove(self.tab_completion_table_path)
+        self.assertEqual([], self.complete(['az']))
+
+    def test_transform_cur_commands_interactive(self):
+        event_payload = {'text': 'ac ll --output grp-del'}
+        transform_cur_commands_interactive(None, event_payload=event_payload)
+        self.assertEqual('account list-locations --output group delete -n test', event_payload['text'])
+
+    def test_enable_aliases_autocomplete_interactive(self):
+        subtree = CommandHead()
+        subtree.add_child(CommandBranch('account'))
+        subtree.add_child(CommandBranch('network'))
+        subtree.get_child('network').add_child(CommandBranch('dns'))
+        enable_aliases_autocomplete_interactive(None, subtree=subtree)
+        self.assertTrue(subtree.has_child('ac'))
+        self.assertTrue(subtree.has_child('dns'))
+        self.assertFalse(subtree.has_child('ll'))
+
+    def test_completion_with_1000_aliases(self):
+        aliases = ''.join('[alias{0}]\ncommand = group{0} list\n\n'.format(i) for i in range(1000))
+        self.write_files(TEST_ALIAS_STRING + aliases,
+                         dict(TEST_TAB_COMPLETION_TABLE, **{'group{} list'.format(i): [''] for i in range(1000)}))
+
+        # every keystroke is answered from the cached completion table, the alias config file is parsed once
+        with mock.patch('azext_alias.hooks.get_alias_table', wraps=get_alias_table) as get_alias_table_mock:
+            for prefix in ['alias', 'alias9', 'alias99']:
+                completions = self.complete(['az'], prefix=prefix)
+            self.assertEqual(['alias99{}'.format(i) for i in range(10)], completions)
+            self.assertLessEqual({'alias{}'.format(i) for i in range(1000)}, set(self.complete(['az'])))
+        self.assertEqual(1, get_alias_table_mock.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
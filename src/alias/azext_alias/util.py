@@ -5,9 +5,11 @@
 
 # pylint: disable=wrong-import-order,import-error,relative-import
 
+import os
 import re
 import sys
 import json
+import hashlib
 import shlex
 from collections import defaultdict
 from six.moves import configparser
@@ -17,7 +19,16 @@ from six.moves.urllib.request import urlretrieve
 from knack.util import CLIError
 
 import azext_alias
-from azext_alias._const import COLLISION_CHECK_LEVEL_DEPTH, GLOBAL_ALIAS_TAB_COMP_TABLE_PATH, ALIAS_FILE_URL_ERROR
+from azext_alias._const import (
+    COLLISION_CHECK_LEVEL_DEPTH,
+    GLOBAL_ALIAS_TAB_COMP_TABLE_PATH,
+    GLOBAL_COMMAND_TRIE_PATH,
+    ALIAS_FILE_URL_ERROR
+)
+from azext_alias.command_trie import CommandTrie
+
+# The trie of azext_alias.cached_reserved_commands, see get_reserved_command_trie()
+_reserved_command_trie = None
 
 
 def get_config_parser():
@@ -72,11 +83,63 @@ def cache_reserved_commands(load_cmd_tbl_func):
     This cache saves the entire command table globally so custom.py can have access to it.
     Alter this cache through cache_reserved_commands(load_cmd_tbl_func) in util.py.
 
+    The reserved commands are persisted as a command trie, so the entire command table is only loaded
+    once per version of the command table.
+
     Args:
         load_cmd_tbl_func: The function to load the entire command table.
+
+    Returns:
+        True if the entire command table was loaded.
+    """
+    global _reserved_command_trie  # pylint: disable=global-statement
+
+    if azext_alias.cached_reserved_commands:
+        return False
+
+    version = get_command_table_version()
+    trie = CommandTrie.load(GLOBAL_COMMAND_TRIE_PATH, version)
+    full_command_table_loaded = trie is None
+    if full_command_table_loaded:
+        trie = CommandTrie.from_commands(list(load_cmd_tbl_func([]).keys()), version)
+        trie.save(GLOBAL_COMMAND_TRIE_PATH)
+
+    azext_alias.cached_reserved_commands = trie.commands
+    _reserved_command_trie = trie
+    return full_command_table_loaded
+
+
+def get_command_table_version():
     """
-    if not azext_alias.cached_reserved_commands:
-        azext_alias.cached_reserved_commands = list(load_cmd_tbl_func([]).keys())
+    Get the version of the command table, which changes whenever Azure CLI or its extensions are
+    installed, updated or removed.
+
+    Returns:
+        The SHA-1 of the Azure CLI version and of the installed extensions.
+    """
+    from azure.cli.core import __version__ as core_version
+    from azure.cli.core import extension
+
+    parts = [core_version]
+    for extension_dir in (extension.EXTENSIONS_DIR, getattr(extension, 'SYSTEM_EXTENSIONS_DIR', None)):
+        if extension_dir and os.path.isdir(extension_dir):
+            for name in sorted(os.listdir(extension_dir)):
+                parts.append('{}:{}'.format(name, os.path.getmtime(os.path.join(extension_dir, name))))
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def get_reserved_command_trie():
+    """
+    Get the command trie of the reserved commands in azext_alias.cached_reserved_commands.
+
+    Returns:
+        The command trie, built the first time it is needed for the current reserved commands.
+    """
+    global _reserved_command_trie  # pylint: disable=global-statement
+
+    if _reserved_command_trie is None or _reserved_command_trie.commands is not azext_alias.cached_reserved_commands:
+        _reserved_command_trie = CommandTrie.from_commands(azext_alias.cached_reserved_commands)
+    return _reserved_command_trie
 
 
 def remove_pos_arg_placeholders(alias_command):
@@ -134,20 +197,14 @@ def build_tab_completion_table(alias_table):
     Returns:
         The tab completion table.
     """
-    alias_commands = [t[1] for t in filter_aliases(alias_table)]
+    command_trie = get_reserved_command_trie()
     tab_completion_table = defaultdict(list)
-    for alias_command in alias_commands:
-        for reserved_command in azext_alias.cached_reserved_commands:
-            # Check if alias_command has no parent command
-            if reserved_command == alias_command or reserved_command.startswith(alias_command + ' ') \
-                    and '' not in tab_completion_table[alias_command]:
-                tab_completion_table[alias_command].append('')
-            elif ' {} '.format(alias_command) in reserved_command or reserved_command.endswith(' ' + alias_command):
-                # Extract parent commands
-                index = reserved_command.index(alias_command)
-                parent_command = reserved_command[:index - 1]
-                if parent_command not in tab_completion_table[alias_command]:
-                    tab_completion_table[alias_command].append(parent_command)
+    for _, alias_command in filter_aliases(alias_table):
+        if alias_command in tab_completion_table:
+            continue
+        parent_commands = command_trie.get_parent_commands(alias_command)
+        if parent_commands:
+            tab_completion_table[alias_command] = parent_commands
 
     with open(GLOBAL_ALIAS_TAB_COMP_TABLE_PATH, 'w') as f:
         f.write(json.dumps(tab_completion_table))
@@ -133,3 +133,7 @@ CSP_Storage_Url = "https://k8sconnectcsp.azureedge.net"
 CSP_Storage_Url_Mooncake = "https://k8sconnectcsp.blob.core.chinacloudapi.cn"
 HELM_STORAGE_URL = "https://k8connecthelm.azureedge.net"
 HELM_VERSION = 'v3.6.3'
+
+# Helm chart cache constants
+HELM_CHART_CACHE_SIZE = 5  # number of chart versions kept on the machine
+HELM_CHART_CACHE_LOCK_TIMEOUT = 600  # seconds
@@ -3,6 +3,8 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import errno
+import hashlib
 import os
 import shutil
 import subprocess
@@ -70,23 +72,125 @@ def validate_location(cmd, location):
 
 
 def get_chart_path(registry_path, kube_config, kube_context, helm_client_location):
-    # Pulling helm chart from registry
-    os.environ['HELM_EXPERIMENTAL_OCI'] = '1'
-    pull_helm_chart(registry_path, kube_config, kube_context, helm_client_location)
+    if os.getenv('HELMCHART'):
+        return os.getenv('HELMCHART')
+
+    # The charts are cached by registry path, which holds the chart version
+    chart_cache_path = os.path.join(os.path.expanduser('~'), '.azure', 'AzureArcCharts')
+    cache_entry_path = os.path.join(chart_cache_path, hashlib.sha256(registry_path.encode('utf-8')).hexdigest())
+    helm_chart_path = os.path.join(cache_entry_path, 'azure-arc-k8sagents')
+    # A mutable tag can point to another chart at any time. The tag is in the last segment of the path, since the
+    # registry host can have a port
+    cacheable = registry_path.rpartition('/')[2].partition(':')[2] not in ('', 'latest')
+    if cacheable and get_chart_digest(helm_chart_path) == read_chart_digest(cache_entry_path):
+        logger.info("Using the helm chart '%s' cached in '%s'", registry_path, cache_entry_path)
+        os.utime(cache_entry_path)
+        return helm_chart_path
+
+    os.makedirs(chart_cache_path, exist_ok=True)
+    with ChartCacheLock(cache_entry_path):
+        # Another command may have cached the chart while this one waited
+        if cacheable and get_chart_digest(helm_chart_path) == read_chart_digest(cache_entry_path):
+            return helm_chart_path
+
+        # Pulling helm chart from registry
+        os.environ['HELM_EXPERIMENTAL_OCI'] = '1'
+        pull_helm_chart(registry_path, kube_config, kube_context, helm_client_location)
+
+        # Exporting helm chart after cleanup
+        try:
+            if os.path.isdir(cache_entry_path):
+                shutil.rmtree(cache_entry_path)
+        except:
+            logger.warning("Unable to cleanup the azure-arc helm charts already present on the machine. In case of failure, please cleanup the directory '%s' and try again.", cache_entry_path)
+        export_helm_chart(registry_path, cache_entry_path, kube_config, kube_context, helm_client_location)
+        write_chart_digest(cache_entry_path, get_chart_digest(helm_chart_path))
+
+    evict_helm_charts(chart_cache_path)
+    return helm_chart_path
+
+
+def get_chart_digest(chart_path):
+    # Hash of the relative paths and contents of the files of a chart, None if it isn't there
+    if not os.path.isdir(chart_path):
+        return None
+    digest = hashlib.sha256()
+    try:
+        for root, dirs, files in os.walk(chart_path):
+            dirs.sort()
+            for file_name in sorted(files):
+                file_path = os.path.join(root, file_name)
+                digest.update(os.path.relpath(file_path, chart_path).replace(os.sep, '/').encode('utf-8') + b'\0')
+                with open(file_path, 'rb') as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def read_chart_digest(cache_entry_path):
+    try:
+        with open(os.path.join(cache_entry_path, 'digest')) as f:
+            return f.read().strip() or False
+    except OSError:
+        return False
+
 
-    # Exporting helm chart after cleanup
-    chart_export_path = os.path.join(os.path.expanduser('~'), '.azure', 'AzureArcCharts')
+def write_chart_digest(cache_entry_path, digest):
     try:
-        if os.path.isdir(chart_export_path):
-            shutil.rmtree(chart_export_path)
-    except:
-        logger.warning("Unable to cleanup the azure-arc helm charts already present on the machine. In case of failure, please cleanup the directory '%s' and try again.", chart_export_path)
-    export_helm_chart(registry_path, chart_export_path, kube_config, kube_context, helm_client_location)
-
-    # Returning helm chart path
-    helm_chart_path = os.path.join(chart_export_path, 'azure-arc-k8sagents')
-    chart_path = os.getenv('HELMCHART') if os.getenv('HELMCHART') else helm_chart_path
-    return chart_path
+        with open(os.path.join(cache_entry_path, 'digest'), 'w') as f:
+            f.write(digest or '')
+    except OSError as e:
+        logger.debug("Unable to cache the helm chart: %s", str(e))
+
+
+def evict_helm_charts(chart_cache_path):
+    # Keep the most recently used chart versions
+    try:
+        entries = [os.path.join(chart_cache_path, name) for name in os.listdir(chart_cache_path)]
+        entries = sorted((entry for entry in entries if os.path.isdir(entry)), key=os.path.getmtime, reverse=True)
+        for entry in entries[consts.HELM_CHART_CACHE_SIZE:]:
+            shutil.rmtree(entry, ignore_errors=True)
+    except OSError as e:
+        logger.debug("Unable to evict the cached helm charts: %s", str(e))
+
+
+class ChartCacheLock:
+    # Lock file held while a chart is pulled into the cache, so that concurrent commands pull it once
+
+    def __init__(self, cache_entry_path):
+        self.lock_path = cache_entry_path + '.lock'
+        self.locked = False
+
+    def __enter__(self):
+        deadline = time.time() + consts.HELM_CHART_CACHE_LOCK_TIMEOUT
+        while True:
+            try:
+                os.close(os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                self.locked = True
+                return self
+            except OSError as e:
+                if e.errno not in (errno.EEXIST, errno.EACCES):
+                    raise
+            try:
+                # The lock of a command which was killed while pulling the chart
+                if time.time() - os.path.getmtime(self.lock_path) > consts.HELM_CHART_CACHE_LOCK_TIMEOUT:
+                    os.remove(self.lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.time() > deadline:
+                # Pull the chart anyway rather than failing the command
+                return self
+            time.sleep(1)
+
+    def __exit__(self, *args):
+        if not self.locked:
+            return
+        try:
+            os.remove(self.lock_path)
+        except OSError:
+            pass
 
 
 def pull_helm_chart(registry_path, kube_config, kube_context, helm_client_location):
@@ -721,7 +721,7 @@ def delete_connectedk8s(cmd, client, resource_group_name, cluster_name,
 
 
 def get_release_namespace(kube_config, kube_context, helm_client_location):
-    cmd_helm_release = [helm_client_location, "list", "-a", "--all-namespaces", "--output", "json"]
+    cmd_helm_release = [helm_client_location, "list", "-a", "--all-namespaces", "--filter", "^azure-arc$", "--output", "json"]
     if kube_config:
         cmd_helm_release.extend(["--kubeconfig", kube_config])
     if kube_context:
@@ -879,19 +879,26 @@ def update_agents(cmd, client, resource_group_name, cluster_name, https_proxy=""
 
     telemetry.add_extension_event('connectedk8s', {'Context.Default.AzureCLI.AgentVersion': agent_version})
 
-    # Get Helm chart path
-    chart_path = utils.get_chart_path(registry_path, kube_config, kube_context, helm_client_location)
-
     cmd_helm_values = [helm_client_location, "get", "values", "azure-arc", "--namespace", release_namespace]
     if kube_config:
         cmd_helm_values.extend(["--kubeconfig", kube_config])
     if kube_context:
         cmd_helm_values.extend(["--kube-context", kube_context])
 
+    # The values of the release are read while the chart is pulled
     user_values_location = os.path.join(os.path.expanduser('~'), '.azure', 'userValues.txt')
     existing_user_values = open(user_values_location, 'w+')
     response_helm_values_get = Popen(cmd_helm_values, stdout=existing_user_values, stderr=PIPE)
-    _, error_helm_get_values = response_helm_values_get.communicate()
+    try:
+        # Get Helm chart path
+        chart_path = utils.get_chart_path(registry_path, kube_config, kube_context, helm_client_location)
+    except BaseException:
+        response_helm_values_get.kill()
+        raise
+    finally:
+        _, error_helm_get_values = response_helm_values_get.communicate()
+        existing_user_values.close()
+
     if response_helm_values_get.returncode != 0:
         if ('forbidden' in error_helm_get_values.decode("ascii") or 'timed out waiting for the condition' in error_helm_get_values.decode("ascii")):
             telemetry.set_user_fault()
@@ -1060,17 +1067,23 @@ def upgrade_agents(cmd, client, resource_group_name, cluster_name, kube_config=N
 
     telemetry.add_extension_event('connectedk8s', {'Context.Default.AzureCLI.AgentVersion': agent_version})
 
-    # Get Helm chart path
-    chart_path = utils.get_chart_path(registry_path, kube_config, kube_context, helm_client_location)
-
     cmd_helm_values = [helm_client_location, "get", "values", "azure-arc", "--namespace", release_namespace]
     if kube_config:
         cmd_helm_values.extend(["--kubeconfig", kube_config])
     if kube_context:
         cmd_helm_values.extend(["--kube-context", kube_context])
 
+    # The values of the release are read while the chart is pulled
     response_helm_values_get = Popen(cmd_helm_values, stdout=PIPE, stderr=PIPE)
-    output_helm_values, error_helm_get_values = response_helm_values_get.communicate()
+    try:
+        # Get Helm chart path
+        chart_path = utils.get_chart_path(registry_path, kube_config, kube_context, helm_client_location)
+    except BaseException:
+        response_helm_values_get.kill()
+        raise
+    finally:
+        output_helm_values, error_helm_get_values = response_helm_values_get.communicate()
+
     if response_helm_values_get.returncode != 0:
         if ('forbidden' in error_helm_get_values.decode("ascii") or 'timed out waiting for the condition' in error_helm_get_values.decode("ascii")):
             telemetry.set_user_fault()
@@ -1471,7 +1484,7 @@ def disable_features(cmd, client, resource_group_name, cluster_name, features, k
 def load_kubernetes_configuration(filename):
     try:
         with open(filename) as stream:
-            return yaml.safe_load(stream)
+            return yaml.load(stream, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
     except (IOError, OSError) as ex:
         if getattr(ex, 'errno', 0) == errno.ENOENT:
             telemetry.set_exception(exception=ex, fault_type=consts.Kubeconfig_Failed_To_Load_Fault_Type,
@@ -1565,13 +1578,20 @@ def merge_kubernetes_configurations(existing_file, addition_file, replace, conte
             logger.warning('%s has permissions "%s".\nIt should be readable and writable only by its owner.',
                            existing_file, existing_file_perms)
 
-    with open(existing_file, 'w+') as stream:
-        try:
-            yaml.safe_dump(existing, stream, default_flow_style=False)
-        except Exception as e:
-            telemetry.set_exception(exception=e, fault_type=consts.Failed_To_Merge_Kubeconfig_File,
-                                    summary='Exception while merging the kubeconfig file')
-            raise CLIInternalError('Exception while merging the kubeconfig file.' + str(e))
+    # the merged kubeconfig replaces the file once it is complete, so that it is never read half written
+    kubeconfig_path = os.path.realpath(existing_file)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(kubeconfig_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as stream:
+            yaml.dump(existing, stream, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper), default_flow_style=False)
+        os.chmod(temp_path, stat.S_IMODE(os.stat(kubeconfig_path).st_mode))
+        os.replace(temp_path, kubeconfig_path)
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        telemetry.set_exception(exception=e, fault_type=consts.Failed_To_Merge_Kubeconfig_File,
+                                summary='Exception while merging the kubeconfig file')
+        raise CLIInternalError('Exception while merging the kubeconfig file.' + str(e))
 
     current_context = addition.get('current-context', 'UNKNOWN')
     msg = 'Merged "{}" as current context in {}'.format(current_context, existing_file)
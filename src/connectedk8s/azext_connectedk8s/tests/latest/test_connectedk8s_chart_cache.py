@@ -0,0 +1,92 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import azext_connectedk8s._utils as utils
+
+REGISTRY_PATH = "mcr.microsoft.com/azurearck8s/batch1/stable/azure-arc-k8sagents:{}"
+
+
+def _export_helm_chart(registry_path, chart_export_path, *args):
+    chart_path = os.path.join(chart_export_path, 'azure-arc-k8sagents')
+    os.makedirs(os.path.join(chart_path, 'templates'))
+    with open(os.path.join(chart_path, 'Chart.yaml'), 'w') as f:
+        f.write('version: {}\n'.format(registry_path.rpartition(':')[2]))
+    with open(os.path.join(chart_path, 'templates', 'deployment.yaml'), 'w') as f:
+        f.write('kind: Deployment\n')
+
+
+class ChartCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.home = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.home)
+        self.pull = mock.Mock()
+        for patcher in [mock.patch('os.path.expanduser', side_effect=lambda path: path.replace('~', self.home, 1)),
+                        mock.patch.dict(os.environ, {}, clear=False),
+                        mock.patch.object(utils, 'pull_helm_chart', self.pull),
+                        mock.patch.object(utils, 'export_helm_chart', side_effect=_export_helm_chart)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        os.environ.pop('HELMCHART', None)
+
+    def _get_chart_path(self, version='1.5.3'):
+        return utils.get_chart_path(REGISTRY_PATH.format(version), None, None, 'helm')
+
+    def test_chart_is_pulled_once_per_version(self):
+        chart_path = self._get_chart_path()
+        self.assertEqual(chart_path, self._get_chart_path())
+        self.assertEqual(1, self.pull.call_count)
+        with open(os.path.join(chart_path, 'Chart.yaml')) as f:
+            self.assertEqual('version: 1.5.3\n', f.read())
+
+        self.assertNotEqual(chart_path, self._get_chart_path('1.6.0'))
+        self.assertEqual(2, self.pull.call_count)
+
+    def test_modified_chart_is_pulled_again(self):
+        chart_path = self._get_chart_path()
+        with open(os.path.join(chart_path, 'templates', 'deployment.yaml'), 'a') as f:
+            f.write('tampered: true\n')
+        self._get_chart_path()
+        self.assertEqual(2, self.pull.call_count)
+        with open(os.path.join(chart_path, 'templates', 'deployment.yaml')) as f:
+            self.assertEqual('kind: Deployment\n', f.read())
+
+        os.remove(os.path.join(chart_path, 'Chart.yaml'))
+        self._get_chart_path()
+        self.assertEqual(3, self.pull.call_count)
+
+    def test_latest_chart_is_always_pulled(self):
+        self._get_chart_path('latest')
+        self._get_chart_path('latest')
+        self.assertEqual(2, self.pull.call_count)
+
+    def test_registry_port_is_not_a_tag(self):
+        registry_path = "localhost:5000/azurearck8s/azure-arc-k8sagents"
+        utils.get_chart_path(registry_path, None, None, 'helm')
+        utils.get_chart_path(registry_path, None, None, 'helm')
+        self.assertEqual(2, self.pull.call_count)
+
+        utils.get_chart_path(registry_path + ":1.5.3", None, None, 'helm')
+        utils.get_chart_path(registry_path + ":1.5.3", None, None, 'helm')
+        self.assertEqual(3, self.pull.call_count)
+
+    def test_least_recently_used_charts_are_evicted(self):
+        for i in range(7):
+            chart_path = self._get_chart_path('1.{}.0'.format(i))
+            os.utime(os.path.dirname(chart_path), (i, i))
+        self._get_chart_path('1.0.0')
+        self.assertEqual(8, self.pull.call_count)
+        cache_path = os.path.join(self.home, '.azure', 'AzureArcCharts')
+        self.assertEqual(5, len([name for name in os.listdir(cache_path) if os.path.isdir(os.path.join(cache_path, name))]))
+
+
+if __name__ == '__main__':
+    unittest.main()
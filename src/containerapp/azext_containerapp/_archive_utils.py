@@ -8,6 +8,11 @@ import tarfile
 import os
 import re
 import codecs
+import struct
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from io import open
 import requests
 from knack.log import get_logger
@@ -24,23 +29,8 @@ def upload_source_code(cmd, client,
                        registry_name,
                        resource_group_name,
                        source_location,
-                       tar_file_path,
                        docker_file_path,
                        docker_file_in_tar):
-    _pack_source_code(source_location,
-                      tar_file_path,
-                      docker_file_path,
-                      docker_file_in_tar)
-
-    size = os.path.getsize(tar_file_path)
-    unit = 'GiB'
-    for S in ['Bytes', 'KiB', 'MiB', 'GiB']:
-        if size < 1024:
-            unit = S
-            break
-        size = size / 1024.0
-
-    logger.info("Uploading archived source code from '%s'...", tar_file_path)
     upload_url = None
     relative_path = None
     try:
@@ -55,31 +45,92 @@ def upload_source_code(cmd, client,
         raise CLIInternalError("Failed to get a SAS URL to upload context.")
 
     account_name, endpoint_suffix, container_name, blob_name, sas_token = get_blob_info(upload_url)
-    BlockBlobService = get_sdk(cmd.cli_ctx, ResourceType.DATA_STORAGE, 'blob#BlockBlobService')
-    BlockBlobService(account_name=account_name,
-                     sas_token=sas_token,
-                     endpoint_suffix=endpoint_suffix,
-                     # Increase socket timeout from default of 20s for clients with slow network connection.
-                     socket_timeout=300).create_blob_from_path(
-                         container_name=container_name,
-                         blob_name=blob_name,
-                         file_path=tar_file_path)
+    BlockBlobService, BlobBlock = get_sdk(cmd.cli_ctx, ResourceType.DATA_STORAGE, 'blob#BlockBlobService',
+                                          'blob.models#BlobBlock')
+    blob_service = BlockBlobService(account_name=account_name,
+                                    sas_token=sas_token,
+                                    endpoint_suffix=endpoint_suffix,
+                                    # Increase socket timeout from default of 20s for clients with slow network
+                                    # connection.
+                                    socket_timeout=300)
+
+    # The archive is uploaded through a pipe while it is being built, instead of being staged in a temp file
+    logger.info("Uploading archived source code from '%s'...", source_location)
+    read_fd, write_fd = os.pipe()
+    packed = {}
+
+    def _pack():
+        try:
+            with open(write_fd, "wb") as archive:
+                packed['size'] = _pack_source_code(source_location, archive, docker_file_path, docker_file_in_tar)
+        except Exception as ex:  # pylint: disable=broad-except
+            packed['error'] = ex
+
+    packer = threading.Thread(target=_pack, name='pack_source_code')
+    packer.daemon = True
+    with open(read_fd, "rb") as archive:
+        packer.start()
+        try:
+            block_list = _stage_blocks(blob_service, container_name, blob_name, archive)
+        finally:
+            # unblock the packer if the upload stopped reading early
+            archive.close()
+            packer.join()
+
+    # A failed packer closes the pipe as if the archive was complete, so the blob is only committed once the
+    # packer succeeded. The service discards the uncommitted blocks of a failed upload.
+    if 'error' in packed:
+        raise packed['error']
+    blob_service.put_block_list(container_name, blob_name,
+                                [BlobBlock(id=block_id) for block_id in block_list])
+
+    size = packed['size']
+    unit = 'GiB'
+    for S in ['Bytes', 'KiB', 'MiB', 'GiB']:
+        if size < 1024:
+            unit = S
+            break
+        size = size / 1024.0
+
     logger.info("Sending context ({0:.3f} {1}) to registry: {2}...".format(
         size, unit, registry_name))
     return relative_path
 
 
-def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_file_in_tar):
+def _stage_blocks(blob_service, container_name, blob_name, stream, block_size=4 * 1024 * 1024):
+    """Upload the stream as uncommitted blocks of the blob, one at a time as it is not seekable, return their ids."""
+    block_list = []
+    while True:
+        # a read of the buffered pipe only returns a short block at the end of the stream
+        block = stream.read(block_size)
+        if not block:
+            return block_list
+        block_id = '{0:032d}'.format(len(block_list))
+        blob_service.put_block(container_name, blob_name, block, block_id)
+        block_list.append(block_id)
+
+
+def _pack_source_code(source_location, archive, docker_file_path, docker_file_in_tar):
+    """Write the gzipped tar of the source location to the archive stream, return the size of the archive."""
     logger.info("Packing source code into tar to upload...")
 
     original_docker_file_name = os.path.basename(docker_file_path.replace("\\", os.sep))
     ignore_list, ignore_list_size = _load_dockerignore_file(source_location, original_docker_file_name)
+    ignore_matcher = _compile_ignore_rules(ignore_list)
+    # Only a '!' rule can bring back a file below an ignored directory. A directory ignored by a rule with
+    # higher priority than all '!' rules, i.e. a lower index, is skipped without being scanned.
+    first_exception_index = next((index for index, item in enumerate(ignore_list or []) if not item.ignore),
+                                 ignore_list_size)
     common_vcs_ignore_list = {'.git', '.gitignore', '.bzr', 'bzrignore', '.hg', '.hgignore', '.svn'}
 
-    def _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index):
+    def _ignore_check(name, parent_ignored, parent_matching_rule_index):
+        ignored, matching_rule_index = _match_ignore_rules(name, parent_ignored, parent_matching_rule_index)
+        return ignored, matching_rule_index, ignored and matching_rule_index <= first_exception_index
+
+    def _match_ignore_rules(name, parent_ignored, parent_matching_rule_index):
         # ignore common vcs dir or file
-        if tarinfo.name in common_vcs_ignore_list:
-            logger.info("Excluding '%s' based on default ignore rules", tarinfo.name)
+        if name in common_vcs_ignore_list:
+            logger.info("Excluding '%s' based on default ignore rules", name)
             return True, parent_matching_rule_index
 
         if ignore_list is None:
@@ -87,22 +138,24 @@ def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_f
             # eg, it will ignore the files under .git folder.
             return parent_ignored, parent_matching_rule_index
 
-        for index, item in enumerate(ignore_list):
-            # stop checking the remaining rules whose priorities are lower than the parent matching rule
-            # at this point, current item should just inherit from parent
-            if index >= parent_matching_rule_index:
-                break
-            if re.match(item.pattern, tarinfo.name):
+        # the combined pattern matches the rule with the highest priority, i.e. the lowest index.
+        # Rules whose priorities are lower than the parent matching rule are not considered,
+        # the current item just inherits from parent then.
+        matched = ignore_matcher.match(name)
+        if matched:
+            index = int(matched.lastgroup[len(_IGNORE_RULE_GROUP_PREFIX):])
+            if index < parent_matching_rule_index:
+                item = ignore_list[index]
                 logger.debug(".dockerignore: rule '%s' matches '%s'.",
-                             item.rule, tarinfo.name)
+                             item.rule, name)
                 return item.ignore, index
 
         logger.debug(".dockerignore: no rule for '%s'. parent ignore '%s'",
-                     tarinfo.name, parent_ignored)
+                     name, parent_ignored)
         # inherit from parent
         return parent_ignored, parent_matching_rule_index
 
-    with tarfile.open(tar_file_path, "w:gz") as tar:
+    with ParallelGzipFile(archive) as gz, tarfile.open(fileobj=gz, mode="w|") as tar:
         # need to set arcname to empty string as the archive root path
         _archive_file_recursively(tar,
                                   source_location,
@@ -118,6 +171,90 @@ def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_f
                 docker_file_path, docker_file_in_tar)
             with open(docker_file_path, "rb") as f:
                 tar.addfile(docker_file_tarinfo, f)
+    return gz.compressed_size
+
+
+_IGNORE_RULE_GROUP_PREFIX = 'rule'
+
+
+def _compile_ignore_rules(ignore_list):
+    """
+    Combine the patterns of all rules into one regular expression. The alternatives are tried in order,
+    so the name of the matched group gives the index of the first matching rule.
+    """
+    if not ignore_list:
+        return re.compile('(?!)')
+    return re.compile('|'.join('(?P<{}{}>{})'.format(_IGNORE_RULE_GROUP_PREFIX, index, item.pattern)
+                               for index, item in enumerate(ignore_list)))
+
+
+def _deflate_block(block, compresslevel, mode):
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(block) + compressor.flush(mode)
+
+
+class ParallelGzipFile:
+    """
+    Write-only gzip stream that compresses blocks of its input on a thread pool. Every block is deflated on its
+    own and ends with a sync flush, so the compressed blocks concatenate into a single gzip member, as pigz does.
+    """
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, fileobj, compresslevel=9, max_workers=None):
+        self.fileobj = fileobj
+        self.compresslevel = compresslevel
+        self.compressed_size = 0
+        self._max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._crc = 0
+        self._size = 0
+        self._closed = False
+        # magic, deflate, no flags, no mtime, maximum compression, unknown OS
+        self._write_compressed(b'\x1f\x8b\x08\x00' + struct.pack('<I', 0) + b'\x02\xff')
+
+    def write(self, data):
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        self._buffer += data
+        while len(self._buffer) >= self.BLOCK_SIZE:
+            block = bytes(self._buffer[:self.BLOCK_SIZE])
+            del self._buffer[:self.BLOCK_SIZE]
+            self._submit(block, zlib.Z_SYNC_FLUSH)
+        return len(data)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._submit(bytes(self._buffer), zlib.Z_FINISH)
+            while self._pending:
+                self._write_compressed(self._pending.popleft().result())
+            self._write_compressed(struct.pack('<II', self._crc & 0xffffffff, self._size & 0xffffffff))
+        finally:
+            self._executor.shutdown()
+
+    def _submit(self, block, mode):
+        self._pending.append(self._executor.submit(_deflate_block, block, self.compresslevel, mode))
+        # keep the memory bounded, write out the oldest blocks once every worker has one queued
+        while len(self._pending) > self._max_workers * 2:
+            self._write_compressed(self._pending.popleft().result())
+
+    def _write_compressed(self, data):
+        self.fileobj.write(data)
+        self.compressed_size += len(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type:
+            self._executor.shutdown()
+            self._closed = True
+        else:
+            self.close()
 
 
 class IgnoreRule:  # pylint: disable=too-few-public-methods
@@ -189,17 +326,20 @@ def _load_dockerignore_file(source_location, original_docker_file_name):
 
 
 def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matching_rule_index, ignore_check):
-    # create a TarInfo object from the file
-    tarinfo = tar.gettarinfo(name, arcname)
+    # check if the file/dir is ignored before touching the file system
+    ignored, matching_rule_index, skip_children = ignore_check(
+        arcname.replace(os.sep, "/"), parent_ignored, parent_matching_rule_index)
 
-    if tarinfo is None:
-        raise CLIInternalError("tarfile: unsupported type {}".format(name))
+    if ignored:
+        if skip_children or not os.path.isdir(name) or os.path.islink(name):
+            return
+    else:
+        # create a TarInfo object from the file
+        tarinfo = tar.gettarinfo(name, arcname)
 
-    # check if the file/dir is ignored
-    ignored, matching_rule_index = ignore_check(
-        tarinfo, parent_ignored, parent_matching_rule_index)
+        if tarinfo is None:
+            raise CLIInternalError("tarfile: unsupported type {}".format(name))
 
-    if not ignored:
         # append the tar header and data to the archive
         if tarinfo.isreg():
             with open(name, "rb") as f:
@@ -207,12 +347,14 @@ def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matchin
         else:
             tar.addfile(tarinfo)
 
+        if not tarinfo.isdir():
+            return
+
     # even the dir is ignored, its child items can still be included, so continue to scan
-    if tarinfo.isdir():
-        for f in os.listdir(name):
-            _archive_file_recursively(tar, os.path.join(name, f), os.path.join(arcname, f),
-                                      parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
-                                      ignore_check=ignore_check)
+    for f in os.listdir(name):
+        _archive_file_recursively(tar, os.path.join(name, f), os.path.join(arcname, f),
+                                  parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
+                                  ignore_check=ignore_check)
 
 
 def check_remote_source_code(source_location):
@@ -5,8 +5,10 @@
 # pylint: disable=line-too-long, super-with-arguments, too-many-instance-attributes, consider-using-f-string, no-else-return, no-self-use
 
 import json
+import random
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 from azure.cli.core.util import send_raw_request
 from azure.cli.core.commands.client_factory import get_subscription_id
@@ -18,7 +20,10 @@ API_VERSION = "2021-03-01"
 PREVIEW_API_VERSION = "2022-01-01-preview"
 STABLE_API_VERSION = "2022-03-01"
 POLLING_TIMEOUT = 60  # how many seconds before exiting
-POLLING_SECONDS = 2  # how many seconds between requests
+POLLING_SECONDS = 2  # how many seconds between the first requests
+POLLING_BACKOFF = 1.5  # how much longer each wait between requests is
+POLLING_MAX_SECONDS = 15  # how many seconds between requests at most
+DELETE_STATUSES = ["scheduledfordelete", "cancelled"]
 
 
 class PollingAnimation():
@@ -39,35 +44,108 @@ class PollingAnimation():
         sys.stdout.write("\033[K")
 
 
-def poll(cmd, request_url, poll_if_status):  # pylint: disable=inconsistent-return-statements
-    try:
-        start = time.time()
-        end = time.time() + POLLING_TIMEOUT
-        animation = PollingAnimation()
+class LongRunningOperation():
+    """
+    An operation accepted by ARM, followed through its Azure-AsyncOperation or Location header when the response
+    has one, and through the provisioning state of the resource otherwise.
+    """
+
+    def __init__(self, cmd, request_url, poll_if_status, response=None):
+        self.cmd = cmd
+        self.request_url = request_url
+        self.poll_if_status = poll_if_status
+        headers = response.headers if response is not None else {}
+        self.operation_url = headers.get("Azure-AsyncOperation")
+        self.location_url = None if self.operation_url else headers.get("Location")
+        self.done = False
+        self.result = None
+        self.attempts = 0
+        self.end = time.time() + POLLING_TIMEOUT
+        self.due = time.time() + self._get_delay(headers)
+
+    def _get_delay(self, headers):
+        retry_after = headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            return min(int(retry_after), POLLING_TIMEOUT)
+        # exponential backoff with jitter, so that many operations don't poll at the same time
+        delay = min(POLLING_SECONDS * POLLING_BACKOFF ** self.attempts, POLLING_MAX_SECONDS)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _finish(self):
+        self.done = True
+        if self.poll_if_status not in DELETE_STATUSES:
+            self.result = send_raw_request(self.cmd.cli_ctx, "GET", self.request_url).json()
+
+    def check(self):
+        """ requests the status of the operation once """
+        if self.operation_url:
+            r = send_raw_request(self.cmd.cli_ctx, "GET", self.operation_url)
+            if r.json().get("status", "").lower() in ["succeeded", "failed", "canceled", "cancelled"]:
+                self._finish()
+        elif self.location_url:
+            r = send_raw_request(self.cmd.cli_ctx, "GET", self.location_url)
+            if r.status_code != 202:
+                self._finish()
+        else:
+            r = send_raw_request(self.cmd.cli_ctx, "GET", self.request_url)
+            r2 = r.json()
+            if "properties" not in r2 or "provisioningState" not in r2["properties"] or not r2["properties"]["provisioningState"].lower() == self.poll_if_status:
+                self.done = True
+                self.result = r2
+
+        if not self.done and time.time() >= self.end:
+            self._finish()
+        self.attempts += 1
+        self.due = time.time() + self._get_delay(r.headers)
 
-        animation.tick()
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
 
-        while r.status_code in [200, 201] and start < end:
-            time.sleep(POLLING_SECONDS)
+def wait_for_operations(operations):
+    """ waits for the operations at the same time with one progress display, and returns their results """
+    animation = PollingAnimation()
+    animation.tick()
+    pending = list(operations)
+    try:
+        while pending:
+            operation = min(pending, key=lambda o: o.due)
+            time.sleep(max(operation.due - time.time(), 0))
             animation.tick()
+            try:
+                operation.check()
+            except Exception:  # pylint: disable=broad-except
+                # Catch "not found" errors if polling for delete
+                if operation.poll_if_status not in DELETE_STATUSES:
+                    raise
+                operation.done = True
+            if operation.done:
+                pending.remove(operation)
+    finally:
+        animation.flush()
+    return [operation.result for operation in operations]
 
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            r2 = r.json()
 
-            if "properties" not in r2 or "provisioningState" not in r2["properties"] or not r2["properties"]["provisioningState"].lower() == poll_if_status:
-                break
-            start = time.time()
+def poll(cmd, request_url, poll_if_status, response=None):
+    return wait_for_operations([LongRunningOperation(cmd, request_url, poll_if_status, response)])[0]
+
+
+def _get_page(cmd, request_url):
+    return send_raw_request(cmd.cli_ctx, "GET", request_url).json()
 
-        animation.flush()
-        return r.json()
-    except Exception as e:  # pylint: disable=broad-except
-        animation.flush()
 
-        delete_statuses = ["scheduledfordelete", "cancelled"]
+def get_pages(cmd, request_url):
+    """ yields the pages of a list, requesting the next page while the last one is used """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page = _get_page(cmd, request_url)
+        while page is not None:
+            next_page = executor.submit(_get_page, cmd, page["nextLink"]) if page.get("nextLink") else None
+            yield page
+            page = next_page.result() if next_page else None
 
-        if poll_if_status not in delete_statuses:  # Catch "not found" errors if polling for delete
-            raise e
+
+def iter_list(cmd, request_url, formatter=lambda x: x):
+    """ yields the formatted items of all the pages of a list """
+    for page in get_pages(cmd, request_url):
+        for item in page["value"]:
+            yield formatter(item)
 
 
 class ContainerAppClient():
@@ -96,7 +174,7 @@ class ContainerAppClient():
                 resource_group_name,
                 name,
                 api_version)
-            return poll(cmd, request_url, "inprogress")
+            return poll(cmd, request_url, "inprogress", r)
 
         return r.json()
 
@@ -127,7 +205,7 @@ class ContainerAppClient():
                 resource_group_name,
                 name,
                 api_version)
-            return poll(cmd, request_url, "inprogress")
+            return poll(cmd, request_url, "inprogress", r)
 
         return r.json()
 
@@ -160,7 +238,7 @@ class ContainerAppClient():
             if r.status_code == 202:
                 from azure.cli.core.azclierror import ResourceNotFoundError
                 try:
-                    poll(cmd, request_url, "cancelled")
+                    poll(cmd, request_url, "cancelled", r)
                 except ResourceNotFoundError:
                     pass
                 logger.warning('Containerapp successfully deleted')
@@ -183,8 +261,6 @@ class ContainerAppClient():
 
     @classmethod
     def list_by_subscription(cls, cmd, formatter=lambda x: x):
-        app_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = PREVIEW_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -193,26 +269,12 @@ class ContainerAppClient():
             sub_id,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
+        app_list = list(iter_list(cmd, request_url, formatter))
 
         return app_list
 
     @classmethod
     def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
-        app_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = PREVIEW_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -223,19 +285,7 @@ class ContainerAppClient():
             resource_group_name,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
+        app_list = list(iter_list(cmd, request_url, formatter))
 
         return app_list
 
@@ -258,9 +308,6 @@ class ContainerAppClient():
 
     @classmethod
     def list_revisions(cls, cmd, resource_group_name, name, formatter=lambda x: x):
-
-        revisions_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = PREVIEW_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -272,19 +319,7 @@ class ContainerAppClient():
             name,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            revisions_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                revisions_list.append(formatted)
+        revisions_list = list(iter_list(cmd, request_url, formatter))
 
         return revisions_list
 
@@ -358,8 +393,6 @@ class ContainerAppClient():
 
     @classmethod
     def list_replicas(cls, cmd, resource_group_name, container_app_name, revision_name):
-        replica_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         sub_id = get_subscription_id(cmd.cli_ctx)
         url_fmt = "{}/subscriptions/{}/resourceGroups/{}/providers/Microsoft.App/containerApps/{}/revisions/{}/replicas?api-version={}"
@@ -371,17 +404,7 @@ class ContainerAppClient():
             revision_name,
             STABLE_API_VERSION)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for replica in j["value"]:
-            replica_list.append(replica)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for replica in j["value"]:
-                replica_list.append(replica)
+        replica_list = list(iter_list(cmd, request_url))
 
         return replica_list
 
@@ -444,7 +467,7 @@ class ManagedEnvironmentClient():
                 resource_group_name,
                 name,
                 api_version)
-            return poll(cmd, request_url, "waiting")
+            return poll(cmd, request_url, "waiting", r)
 
         return r.json()
 
@@ -473,7 +496,7 @@ class ManagedEnvironmentClient():
                 resource_group_name,
                 name,
                 api_version)
-            return poll(cmd, request_url, "waiting")
+            return poll(cmd, request_url, "waiting", r)
 
         return r.json()
 
@@ -506,7 +529,7 @@ class ManagedEnvironmentClient():
             if r.status_code == 202:
                 from azure.cli.core.azclierror import ResourceNotFoundError
                 try:
-                    poll(cmd, request_url, "scheduledfordelete")
+                    poll(cmd, request_url, "scheduledfordelete", r)
                 except ResourceNotFoundError:
                     pass
                 logger.warning('Containerapp environment successfully deleted')
@@ -530,8 +553,6 @@ class ManagedEnvironmentClient():
 
     @classmethod
     def list_by_subscription(cls, cmd, formatter=lambda x: x):
-        env_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = PREVIEW_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -540,26 +561,12 @@ class ManagedEnvironmentClient():
             sub_id,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for env in j["value"]:
-            formatted = formatter(env)
-            env_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for env in j["value"]:
-                formatted = formatter(env)
-                env_list.append(formatted)
+        env_list = list(iter_list(cmd, request_url, formatter))
 
         return env_list
 
     @classmethod
     def list_by_resource_group(cls, cmd, resource_group_name, formatter=lambda x: x):
-        env_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = PREVIEW_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -570,19 +577,7 @@ class ManagedEnvironmentClient():
             resource_group_name,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for env in j["value"]:
-            formatted = formatter(env)
-            env_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for env in j["value"]:
-                formatted = formatter(env)
-                env_list.append(formatted)
+        env_list = list(iter_list(cmd, request_url, formatter))
 
         return env_list
 
@@ -613,7 +608,7 @@ class GitHubActionClient():
                 resource_group_name,
                 name,
                 api_version)
-            return poll(cmd, request_url, "inprogress")
+            return poll(cmd, request_url, "inprogress", r)
 
         return r.json()
 
@@ -662,7 +657,7 @@ class GitHubActionClient():
             if r.status_code == 202:
                 from azure.cli.core.azclierror import ResourceNotFoundError
                 try:
-                    poll(cmd, request_url, "cancelled")
+                    poll(cmd, request_url, "cancelled", r)
                 except ResourceNotFoundError:
                     pass
                 logger.warning('Containerapp github action successfully deleted')
@@ -698,7 +693,7 @@ class DaprComponentClient():
                 environment_name,
                 name,
                 api_version)
-            return poll(cmd, request_url, "inprogress")
+            return poll(cmd, request_url, "inprogress", r)
 
         return r.json()
 
@@ -733,7 +728,7 @@ class DaprComponentClient():
             if r.status_code == 202:
                 from azure.cli.core.azclierror import ResourceNotFoundError
                 try:
-                    poll(cmd, request_url, "cancelled")
+                    poll(cmd, request_url, "cancelled", r)
                 except ResourceNotFoundError:
                     pass
                 logger.warning('Dapr component successfully deleted')
@@ -758,8 +753,6 @@ class DaprComponentClient():
 
     @classmethod
     def list(cls, cmd, resource_group_name, environment_name, formatter=lambda x: x):
-        app_list = []
-
         management_hostname = cmd.cli_ctx.cloud.endpoints.resource_manager
         api_version = PREVIEW_API_VERSION
         sub_id = get_subscription_id(cmd.cli_ctx)
@@ -770,18 +763,6 @@ class DaprComponentClient():
             environment_name,
             api_version)
 
-        r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-        j = r.json()
-        for app in j["value"]:
-            formatted = formatter(app)
-            app_list.append(formatted)
-
-        while j.get("nextLink") is not None:
-            request_url = j["nextLink"]
-            r = send_raw_request(cmd.cli_ctx, "GET", request_url)
-            j = r.json()
-            for app in j["value"]:
-                formatted = formatter(app)
-                app_list.append(formatted)
+        app_list = list(iter_list(cmd, request_url, formatter))
 
         return app_list
@@ -3,6 +3,8 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import codecs
+import logging
 import os
 import sys
 import time
@@ -47,6 +49,11 @@ SSH_BACKUP_ENCODING = "latin_1"
 
 SSH_CTRL_C_MSG = b"\x00\x00\x03"
 
+# how many bytes of pending input are sent in one message at most
+SSH_INPUT_READ_SIZE = 4096
+# how many seconds the input is waited for before checking the size of the terminal again
+SSH_INPUT_POLL_SECONDS = 0.25
+
 
 class WebSocketConnection:
     def __init__(self, cmd, resource_group_name, name, revision, replica, container, startup_command):
@@ -93,7 +100,18 @@ class WebSocketConnection:
         return self._socket.recv(*args, **kwargs)
 
 
-def _decode_and_output_to_terminal(connection: WebSocketConnection, response, encodings):
+def _decode_and_output_to_terminal(connection: WebSocketConnection, response, encodings, decoders=None):
+    if decoders is not None:
+        # the decoder of each stream keeps the bytes of a character split between messages
+        decoder = decoders.get(response[1])
+        if decoder is None:
+            decoder = decoders[response[1]] = codecs.getincrementaldecoder(encodings[0])()
+        try:
+            print(decoder.decode(response[2:]), end="", flush=True)
+            return
+        except UnicodeDecodeError:
+            decoder.reset()
+
     for i, encoding in enumerate(encodings):
         try:
             print(response[2:].decode(encoding), end="", flush=True)
@@ -110,12 +128,15 @@ def _decode_and_output_to_terminal(connection: WebSocketConnection, response, en
 
 def read_ssh(connection: WebSocketConnection, response_encodings):
     # response_encodings is the ordered list of Unicode encodings to try to decode with before raising an exception
+    log_responses = logger.isEnabledFor(logging.INFO)
+    decoders = {}
     while connection.is_connected:
         response = connection.recv()
         if not response:
             connection.disconnect()
         else:
-            logger.info("Received raw response %s", response.hex())
+            if log_responses:
+                logger.info("Received raw response %s", response.hex())
             proxy_status = response[0]
             if proxy_status == SSH_PROXY_INFO:
                 print(f"INFO: {response[1:].decode(SSH_DEFAULT_ENCODING)}")
@@ -124,37 +145,53 @@ def read_ssh(connection: WebSocketConnection, response_encodings):
             elif proxy_status == SSH_PROXY_FORWARD:
                 control_byte = response[1]
                 if control_byte in (SSH_CLUSTER_STDOUT, SSH_CLUSTER_STDERR):
-                    _decode_and_output_to_terminal(connection, response, response_encodings)
+                    _decode_and_output_to_terminal(connection, response, response_encodings, decoders)
                 else:
                     connection.disconnect()
                     raise CLIInternalError("Unexpected message received")
 
 
-def _send_stdin(connection: WebSocketConnection, getch_fn):
+def _send_stdin(connection: WebSocketConnection, read_fn):
+    # all the pending input goes in one message, and the size of the terminal only when it changes
+    size = None
     while connection.is_connected:
-        _resize_terminal(connection)
-        ch = getch_fn()
-        _resize_terminal(connection)
-        if connection.is_connected:
-            connection.send(b"".join([SSH_INPUT_PREFIX, ch]))
+        size = _resize_terminal(connection, size)
+        data = read_fn()
+        if data is None:  # end of the input
+            break
+        if data and connection.is_connected:
+            connection.send(b"".join([SSH_INPUT_PREFIX, data]))
 
 
-def _resize_terminal(connection: WebSocketConnection):
+def _resize_terminal(connection: WebSocketConnection, last_size=None):
     size = os.get_terminal_size()
-    if connection.is_connected:
+    if size != last_size and connection.is_connected:
         connection.send(b"".join([SSH_TERM_RESIZE_PREFIX,
                                   f'{{"Width": {size.columns}, '
                                   f'"Height": {size.lines}}}'.encode(SSH_DEFAULT_ENCODING)]))
+    return size
+
 
+def _read_stdin_unix():
+    import select
 
-def _getch_unix():
-    return sys.stdin.read(1).encode(SSH_DEFAULT_ENCODING)
+    fd = sys.stdin.fileno()
+    readable, _, _ = select.select([fd], [], [], SSH_INPUT_POLL_SECONDS)
+    if not readable:
+        return b""
+    return os.read(fd, SSH_INPUT_READ_SIZE) or None
 
 
-def _getch_windows():
+def _read_stdin_windows():
+    end = time.time() + SSH_INPUT_POLL_SECONDS
     while not msvcrt.kbhit():
+        if time.time() >= end:
+            return b""
         time.sleep(0.01)
-    return msvcrt.getch()
+    data = []
+    while msvcrt.kbhit() and len(data) < SSH_INPUT_READ_SIZE:
+        data.append(msvcrt.getch())
+    return b"".join(data)
 
 
 def ping_container_app(app):
@@ -171,9 +208,9 @@ def get_stdin_writer(connection: WebSocketConnection):
     if not is_platform_windows():
         import tty
         tty.setcbreak(sys.stdin.fileno())  # needed to prevent printing arrow key characters
-        writer = threading.Thread(target=_send_stdin, args=(connection, _getch_unix))
+        writer = threading.Thread(target=_send_stdin, args=(connection, _read_stdin_unix))
     else:
         enable_vt_mode()  # needed for interactive commands (ie vim)
-        writer = threading.Thread(target=_send_stdin, args=(connection, _getch_windows))
+        writer = threading.Thread(target=_send_stdin, args=(connection, _read_stdin_windows))
 
     return writer
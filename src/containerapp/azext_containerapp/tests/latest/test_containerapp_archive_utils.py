@@ -0,0 +1,63 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+from unittest import mock
+
+from azext_containerapp import _archive_utils
+from azext_containerapp._archive_utils import upload_source_code
+
+ARCHIVE_SIZE = 10 * 1024 * 1024
+
+
+class _BlobBlock(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, id):  # pylint: disable=redefined-builtin
+        self.id = id
+
+
+class UploadSourceCodeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.blob_service = mock.MagicMock()
+        self.staged = []
+        self.blob_service.put_block.side_effect = lambda container, blob, block, block_id: self.staged.append(block)
+        for patcher in [mock.patch.object(_archive_utils, 'get_blob_info',
+                                          return_value=('account', 'suffix', 'container', 'blob', 'sas')),
+                        mock.patch.object(_archive_utils, 'get_sdk',
+                                          return_value=(mock.Mock(return_value=self.blob_service), _BlobBlock))]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _upload(self, pack_source_code):
+        with mock.patch.object(_archive_utils, '_pack_source_code', side_effect=pack_source_code):
+            return upload_source_code(mock.MagicMock(), mock.MagicMock(), 'registry', 'rg', 'source', 'Dockerfile',
+                                      'Dockerfile')
+
+    def test_archive_is_committed_once_packed(self):
+        def _pack_source_code(source_location, archive, docker_file_path, docker_file_in_tar):
+            archive.write(b'x' * ARCHIVE_SIZE)
+            return ARCHIVE_SIZE
+
+        self._upload(_pack_source_code)
+        self.assertEqual(b'x' * ARCHIVE_SIZE, b''.join(self.staged))
+        self.assertEqual([4 * 1024 * 1024, 4 * 1024 * 1024, 2 * 1024 * 1024], [len(block) for block in self.staged])
+        block_list = self.blob_service.put_block_list.call_args[0][2]
+        self.assertEqual([call[0][3] for call in self.blob_service.put_block.call_args_list],
+                         [block.id for block in block_list])
+        self.blob_service.create_blob_from_stream.assert_not_called()
+
+    def test_failed_archive_is_not_committed(self):
+        def _pack_source_code(source_location, archive, docker_file_path, docker_file_in_tar):
+            archive.write(b'x' * ARCHIVE_SIZE)
+            raise OSError('source file vanished')
+
+        with self.assertRaisesRegex(OSError, 'source file vanished'):
+            self._upload(_pack_source_code)
+        self.assertTrue(self.staged)
+        self.blob_service.put_block_list.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from azure.cli.core.azclierror import HTTPError
+
+from azext_containerapp._clients import ContainerAppClient, LongRunningOperation, iter_list, poll, wait_for_operations
+
+SUB_ID = "00000000-0000-0000-0000-000000000000"
+ARM = "https://management.azure.com"
+
+
+class _Response(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, content, status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self.content
+
+
+class ContainerAppClientsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cmd = mock.Mock()
+        self.cmd.cli_ctx.cloud.endpoints.resource_manager = ARM
+        self.pages = {}
+        self.requested = []
+        self.lock = threading.Lock()
+        for patcher in [mock.patch("azext_containerapp._clients.send_raw_request", side_effect=self._send_raw_request),
+                        mock.patch("azext_containerapp._clients.get_subscription_id", return_value=SUB_ID)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _send_raw_request(self, _, method, url, **kwargs):  # pylint: disable=unused-argument
+        with self.lock:
+            self.requested.append(url)
+        if url not in self.pages:
+            raise HTTPError("Not found", _Response(None, 404))
+        return _Response(self.pages[url])
+
+    def _add_pages(self, url, pages):
+        for i, page in enumerate(pages):
+            next_link = "{}&page={}".format(url, i + 1) if i + 1 < len(pages) else None
+            self.pages[url if i == 0 else "{}&page={}".format(url, i)] = {"value": page, "nextLink": next_link}
+
+    def test_next_page_is_requested_while_a_page_is_formatted(self):
+        self._add_pages("list", [[1, 2], [3], [4, 5]])
+
+        def _formatter(item):
+            if item == 1:
+                # the second page is requested while the first one is formatted
+                deadline = time.time() + 5
+                while "list&page=1" not in self.requested and time.time() < deadline:
+                    time.sleep(0.01)
+                self.assertIn("list&page=1", self.requested)
+            return item * 10
+
+        self.assertEqual([10, 20, 30, 40, 50], list(iter_list(self.cmd, "list", _formatter)))
+        self.assertEqual(["list", "list&page=1", "list&page=2"], self.requested)
+
+    def test_list_by_subscription_with_one_page(self):
+        url = "{}/subscriptions/{}/providers/Microsoft.App/containerApps?api-version=2022-01-01-preview".format(ARM, SUB_ID)
+        self._add_pages(url, [[{"name": "app1"}]])
+        self.assertEqual([{"name": "app1"}], ContainerAppClient.list_by_subscription(self.cmd))
+        self.assertEqual([url], self.requested)
+
+    def test_list_by_subscription_follows_next_links(self):
+        url = "{}/subscriptions/{}/providers/Microsoft.App/containerApps?api-version=2022-01-01-preview".format(ARM, SUB_ID)
+        self._add_pages(url, [[{"name": "app1"}, {"name": "app2"}], [{"name": "app3"}], [{"name": "app4"}]])
+        apps = ContainerAppClient.list_by_subscription(self.cmd, formatter=lambda app: app["name"])
+        self.assertEqual(["app1", "app2", "app3", "app4"], apps)
+        # every page is requested once, and only the container apps list is requested
+        self.assertEqual([url, url + "&page=1", url + "&page=2"], self.requested)
+
+
+class PollTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cmd = mock.Mock()
+        self.now = 1000.0
+        self.responses = {}
+        self.requested = []
+        for patcher in [mock.patch("azext_containerapp._clients.send_raw_request", side_effect=self._send_raw_request),
+                        mock.patch("azext_containerapp._clients.time.time", side_effect=lambda: self.now),
+                        mock.patch("azext_containerapp._clients.time.sleep", side_effect=self._sleep),
+                        mock.patch("azext_containerapp._clients.random.uniform", side_effect=lambda low, high: high),
+                        mock.patch("azext_containerapp._clients.PollingAnimation")]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _sleep(self, seconds):
+        self.now += seconds
+
+    def _send_raw_request(self, _, method, url, **kwargs):  # pylint: disable=unused-argument
+        self.requested.append((self.now, url))
+        response = self.responses[url].pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def test_poll_follows_async_operation(self):
+        self.responses = {
+            "operation": [_Response({"status": "InProgress"}, headers={"Retry-After": "5"}),
+                          _Response({"status": "InProgress"}),
+                          _Response({"status": "Succeeded"})],
+            "app": [_Response({"name": "app", "properties": {"provisioningState": "Succeeded"}})]
+        }
+        created = _Response({"properties": {"provisioningState": "InProgress"}}, 201,
+                            {"Azure-AsyncOperation": "operation", "Retry-After": "1"})
+        self.assertEqual("app", poll(self.cmd, "app", "inprogress", created)["name"])
+        # Retry-After is honored, then the waits grow
+        self.assertEqual([(1001.0, "operation"), (1006.0, "operation"), (1010.5, "operation"), (1010.5, "app")],
+                         self.requested)
+
+    def test_poll_provisioning_state_without_headers(self):
+        self.responses = {"app": [_Response({"properties": {"provisioningState": "InProgress"}}),
+                                  _Response({"properties": {"provisioningState": "Succeeded"}})]}
+        self.assertEqual({"properties": {"provisioningState": "Succeeded"}}, poll(self.cmd, "app", "inprogress"))
+        self.assertEqual(2, len(self.requested))
+
+    def test_poll_delete_until_not_found(self):
+        self.responses = {"app": [_Response({"properties": {"provisioningState": "Cancelled"}}),
+                                  HTTPError("Not found", _Response(None, 404))]}
+        self.assertIsNone(poll(self.cmd, "app", "cancelled"))
+
+        self.responses = {"location": [_Response(None, 202), _Response(None, 200)]}
+        self.assertIsNone(poll(self.cmd, "app", "cancelled", _Response(None, 202, {"Location": "location"})))
+
+    def test_wait_for_operations_at_the_same_time(self):
+        self.responses = {}
+        operations = []
+        for i in range(3):
+            self.responses["operation{}".format(i)] = [_Response({"status": "InProgress"})] * i + [_Response({"status": "Succeeded"})]
+            self.responses["app{}".format(i)] = [_Response({"name": "app{}".format(i)})]
+            operations.append(LongRunningOperation(self.cmd, "app{}".format(i), "inprogress",
+                                                   _Response({}, 201, {"Azure-AsyncOperation": "operation{}".format(i)})))
+
+        self.assertEqual(["app0", "app1", "app2"], [app["name"] for app in wait_for_operations(operations)])
+        # waiting on the operations one after the other would have taken 2 + (2 + 3) + (2 + 3 + 4.5) seconds
+        self.assertEqual(1009.5, self.now)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -342,7 +342,7 @@ class ContainerappScenarioTest(ScenarioTest):
             mock_lib = "azext_containerapp._ssh_utils.enable_vt_mode"
 
         with mock.patch("builtins.print", side_effect=mock_print), mock.patch(mock_lib):
-            with mock.patch("azext_containerapp._ssh_utils._getch_unix", side_effect=mock_getch), mock.patch("azext_containerapp._ssh_utils._getch_windows", side_effect=mock_getch):
+            with mock.patch("azext_containerapp._ssh_utils._read_stdin_unix", side_effect=mock_getch), mock.patch("azext_containerapp._ssh_utils._read_stdin_windows", side_effect=mock_getch):
                 containerapp_ssh(cmd=cmd, resource_group_name=namespace.resource_group_name, name=namespace.name,
                                     container=namespace.container, revision=namespace.revision, replica=namespace.replica, startup_command="sh")
         for line in expected_output:
@@ -0,0 +1,68 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import unittest
+from unittest import mock
+
+from azext_containerapp._ssh_utils import (SSH_INPUT_PREFIX, SSH_TERM_RESIZE_PREFIX, SSH_DEFAULT_ENCODING,
+                                           SSH_BACKUP_ENCODING, _send_stdin, read_ssh)
+
+
+class _Connection(object):
+    def __init__(self, responses=None):
+        self.is_connected = True
+        self.sent = []
+        self.responses = list(responses or [])
+
+    def send(self, data):
+        self.sent.append(data)
+
+    def recv(self):
+        return self.responses.pop(0) if self.responses else None
+
+    def disconnect(self):
+        self.is_connected = False
+
+
+class SshUtilsTest(unittest.TestCase):
+
+    def _send_stdin(self, inputs, sizes):
+        connection = _Connection()
+        inputs = list(inputs) + [None]
+        with mock.patch("os.get_terminal_size", side_effect=[os.terminal_size(size) for size in sizes]):
+            _send_stdin(connection, lambda: inputs.pop(0))
+        return connection.sent
+
+    def test_pending_input_is_sent_in_one_message(self):
+        sent = self._send_stdin([b"ls -l\n", b"", b"pwd\n"], [(80, 24)] * 4)
+        self.assertEqual([SSH_TERM_RESIZE_PREFIX + b'{"Width": 80, "Height": 24}',
+                          SSH_INPUT_PREFIX + b"ls -l\n", SSH_INPUT_PREFIX + b"pwd\n"], sent)
+
+    def test_terminal_size_is_sent_when_it_changes(self):
+        sent = self._send_stdin([b"a", b"b", b"c"], [(80, 24), (80, 24), (120, 40), (120, 40)])
+        self.assertEqual([SSH_TERM_RESIZE_PREFIX + b'{"Width": 80, "Height": 24}',
+                          SSH_INPUT_PREFIX + b"a", SSH_INPUT_PREFIX + b"b",
+                          SSH_TERM_RESIZE_PREFIX + b'{"Width": 120, "Height": 40}',
+                          SSH_INPUT_PREFIX + b"c"], sent)
+
+    def test_character_split_between_messages_is_decoded(self):
+        text = "héllo wörld ✓".encode(SSH_DEFAULT_ENCODING)
+        responses = [b"\x00\x01" + text[i:i + 2] for i in range(0, len(text), 2)]
+        connection = _Connection(responses)
+        with mock.patch("builtins.print") as mock_print:
+            read_ssh(connection, [SSH_DEFAULT_ENCODING, SSH_BACKUP_ENCODING])
+        self.assertEqual("héllo wörld ✓", "".join(call[0][0] for call in mock_print.call_args_list))
+        self.assertFalse(connection.is_connected)
+
+    def test_undecodable_message_falls_back_to_backup_encoding(self):
+        connection = _Connection([b"\x00\x01\xff\xfe"])
+        with mock.patch("builtins.print") as mock_print:
+            read_ssh(connection, [SSH_DEFAULT_ENCODING, SSH_BACKUP_ENCODING])
+        self.assertEqual("ÿþ", "".join(call[0][0] for call in mock_print.call_args_list))
+
+
+if __name__ == '__main__':
+    unittest.main()
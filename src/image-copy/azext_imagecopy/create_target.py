@@ -1,202 +1,187 @@
-# --------------------------------------------------------------------------------------------
-# Copyright (c) Microsoft Corporation. All rights reserved.
-# Licensed under the MIT License. See License.txt in the project root for license information.
-# --------------------------------------------------------------------------------------------
-
-import datetime
-import time
-
-from knack.util import CLIError
-from knack.log import get_logger
-
-from azext_imagecopy.cli_utils import run_cli_command, prepare_cli_command, get_storage_account_id_from_blob_path
-
-logger = get_logger(__name__)
-
-STORAGE_ACCOUNT_NAME_LENGTH = 24
-
-
-# pylint: disable=too-many-statements
-# pylint: disable=too-many-locals
-def create_target_image(cmd, location, transient_resource_group_name, source_type, source_object_name,
-                        source_os_disk_snapshot_name, source_os_disk_snapshot_url, source_os_type,
-                        target_resource_group_name, azure_pool_frequency, tags, target_name, target_subscription,
-                        export_as_snapshot, timeout, hyper_v_generation='V1'):
-
-    random_string = get_random_string(
-        STORAGE_ACCOUNT_NAME_LENGTH - len(location))
-
-    # create the target storage account. storage account name must be lowercase.
-    logger.warning(
-        "%s - Creating target storage account (can be slow sometimes)", location)
-    target_storage_account_name = location.lower() + random_string
-    cli_cmd = prepare_cli_command(['storage', 'account', 'create',
-                                   '--name', target_storage_account_name,
-                                   '--resource-group', transient_resource_group_name,
-                                   '--location', location,
-                                   '--sku', 'Standard_LRS'],
-                                  subscription=target_subscription)
-
-    json_output = run_cli_command(cli_cmd, return_as_json=True)
-    target_blob_endpoint = json_output['primaryEndpoints']['blob']
-
-    # Setup the target storage account
-    cli_cmd = prepare_cli_command(['storage', 'account', 'keys', 'list',
-                                   '--account-name', target_storage_account_name,
-                                   '--resource-group', transient_resource_group_name],
-                                  subscription=target_subscription)
-
-    json_output = run_cli_command(cli_cmd, return_as_json=True)
-
-    target_storage_account_key = json_output[0]['value']
-    logger.debug("storage account key: %s", target_storage_account_key)
-
-    expiry_format = "%Y-%m-%dT%H:%MZ"
-    expiry = datetime.datetime.utcnow() + datetime.timedelta(seconds=timeout)
-    logger.debug(
-        "create target storage sas using timeout seconds: %d", timeout)
-
-    cli_cmd = prepare_cli_command(['storage', 'account', 'generate-sas',
-                                   '--account-name', target_storage_account_name,
-                                   '--account-key', target_storage_account_key,
-                                   '--expiry', expiry.strftime(expiry_format),
-                                   '--permissions', 'aclrpuw', '--resource-types',
-                                   'sco', '--services', 'b', '--https-only'],
-                                  output_as_json=False,
-                                  subscription=target_subscription)
-
-    sas_token = run_cli_command(cli_cmd)
-    sas_token = sas_token.rstrip("\n\r")  # STRANGE
-    logger.debug("sas token: %s", sas_token)
-
-    # create a container in the target blob storage account
-    logger.warning(
-        "%s - Creating container in the target storage account", location)
-    target_container_name = 'snapshots'
-    cli_cmd = prepare_cli_command(['storage', 'container', 'create',
-                                   '--name', target_container_name,
-                                   '--account-name', target_storage_account_name],
-                                  subscription=target_subscription)
-
-    run_cli_command(cli_cmd)
-
-    # Copy the snapshot to the target region using the SAS URL
-    blob_name = source_os_disk_snapshot_name + '.vhd'
-    logger.warning(
-        "%s - Copying blob to target storage account", location)
-    cli_cmd = prepare_cli_command(['storage', 'blob', 'copy', 'start',
-                                   '--source-uri', source_os_disk_snapshot_url,
-                                   '--destination-blob', blob_name,
-                                   '--destination-container', target_container_name,
-                                   '--account-name', target_storage_account_name,
-                                   '--sas-token', sas_token],
-                                  subscription=target_subscription)
-
-    run_cli_command(cli_cmd)
-
-    # Wait for the copy to complete
-    start_datetime = datetime.datetime.now()
-    wait_for_blob_copy_operation(blob_name, target_container_name, target_storage_account_name,
-                                 azure_pool_frequency, location, target_subscription)
-    msg = "{0} - Copy time: {1}".format(
-        location, datetime.datetime.now() - start_datetime)
-    logger.warning(msg)
-
-    # Create the snapshot in the target region from the copied blob
-    logger.warning(
-        "%s - Creating snapshot in target region from the copied blob", location)
-    target_blob_path = target_blob_endpoint + \
-        target_container_name + '/' + blob_name
-    target_snapshot_name = source_os_disk_snapshot_name + '-' + location
-    if export_as_snapshot:
-        snapshot_resource_group_name = target_resource_group_name
-    else:
-        snapshot_resource_group_name = transient_resource_group_name
-
-    source_storage_account_id = get_storage_account_id_from_blob_path(cmd,
-                                                                      target_blob_path,
-                                                                      transient_resource_group_name,
-                                                                      target_subscription)
-
-    cli_cmd = prepare_cli_command(['snapshot', 'create',
-                                   '--resource-group', snapshot_resource_group_name,
-                                   '--name', target_snapshot_name,
-                                   '--location', location,
-                                   '--source', target_blob_path,
-                                   '--source-storage-account-id', source_storage_account_id,
-                                   '--hyper-v-generation', hyper_v_generation],
-                                  subscription=target_subscription)
-
-    json_output = run_cli_command(cli_cmd, return_as_json=True)
-    target_snapshot_id = json_output['id']
-
-    # Optionally create the final image
-    if export_as_snapshot:
-        logger.warning("%s - Skipping image creation", location)
-    else:
-        logger.warning("%s - Creating final image", location)
-        if target_name is None:
-            target_image_name = source_object_name
-            if source_type != 'image':
-                target_image_name += '-image'
-            target_image_name += '-' + location
-        else:
-            target_image_name = target_name
-
-        cli_cmd = prepare_cli_command(['image', 'create',
-                                       '--resource-group', target_resource_group_name,
-                                       '--name', target_image_name,
-                                       '--location', location,
-                                       '--os-type', source_os_type,
-                                       '--source', target_snapshot_id,
-                                       '--hyper-v-generation', hyper_v_generation],
-                                      tags=tags,
-                                      subscription=target_subscription)
-
-        run_cli_command(cli_cmd)
-
-
-def wait_for_blob_copy_operation(blob_name, target_container_name, target_storage_account_name,
-                                 azure_pool_frequency, location, subscription):
-    copy_status = "pending"
-    prev_progress = -1
-    while copy_status == "pending":
-        cli_cmd = prepare_cli_command(['storage', 'blob', 'show',
-                                       '--name', blob_name,
-                                       '--container-name', target_container_name,
-                                       '--account-name', target_storage_account_name],
-                                      subscription=subscription)
-
-        json_output = run_cli_command(cli_cmd, return_as_json=True)
-        copy_status = json_output["properties"]["copy"]["status"]
-        copy_progress_1, copy_progress_2 = json_output["properties"]["copy"]["progress"].split(
-            "/")
-        current_progress = int(
-            int(copy_progress_1) / int(copy_progress_2) * 100)
-
-        if current_progress != prev_progress:
-            msg = "{0} - Copy progress: {1}%"\
-                .format(location, str(current_progress))
-            logger.warning(msg)
-
-        prev_progress = current_progress
-
-        try:
-            time.sleep(azure_pool_frequency)
-        except KeyboardInterrupt:
-            return
-
-    if copy_status != 'success':
-        logger.error(
-            "The copy operation didn't succeed. Last status: %s", copy_status)
-        logger.error("Command run: %s", cli_cmd)
-        logger.error("Command output: %s", json_output)
-
-        raise CLIError('Blob copy failed')
-
-
-def get_random_string(length):
-    import string
-    import random
-    chars = string.ascii_lowercase + string.digits
-    return ''.join(random.choice(chars) for _ in range(length))
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import datetime
+import threading
+
+from azure.cli.core.profiles import ResourceType
+from knack.util import CLIError
+from knack.log import get_logger
+
+from azext_imagecopy._client_factory import cf_compute, cf_storage, cf_resource_groups, cf_blob_client
+from azext_imagecopy.cli_utils import get_extension_tags, get_storage_account_id_from_blob_path
+
+logger = get_logger(__name__)
+
+STORAGE_ACCOUNT_NAME_LENGTH = 24
+# how often a wait for a long running operation checks whether the copy was cancelled
+CANCEL_CHECK_INTERVAL = 1
+
+
+class TargetClients:  # pylint: disable=too-few-public-methods
+    '''
+    Management clients of the target subscription, created once and shared by the threads copying to each
+    target location so that they reuse the credentials and the HTTP connection pools
+    '''
+    def __init__(self, cli_ctx, subscription_id):
+        self.subscription_id = subscription_id
+        self.compute = cf_compute(cli_ctx, subscription_id)
+        self.storage = cf_storage(cli_ctx, subscription_id)
+        self.resource_groups = cf_resource_groups(cli_ctx, subscription_id)
+
+
+# pylint: disable=too-many-statements
+# pylint: disable=too-many-locals
+def create_target_image(cmd, clients, location, transient_resource_group_name, source_type, source_object_name,
+                        source_os_disk_snapshot_name, source_os_disk_snapshot_url, source_os_type,
+                        target_resource_group_name, azure_pool_frequency, tags, target_name,
+                        export_as_snapshot, hyper_v_generation='V1', cancel_event=None):
+    storage_account_create_parameters, storage_sku, blob_container = cmd.get_models(
+        'StorageAccountCreateParameters', 'Sku', 'BlobContainer', resource_type=ResourceType.MGMT_STORAGE)
+    snapshot_model, creation_data = cmd.get_models(
+        'Snapshot', 'CreationData', resource_type=ResourceType.MGMT_COMPUTE, operation_group='snapshots')
+
+    random_string = get_random_string(
+        STORAGE_ACCOUNT_NAME_LENGTH - len(location))
+
+    # create the target storage account. storage account name must be lowercase.
+    logger.warning(
+        "%s - Creating target storage account (can be slow sometimes)", location)
+    target_storage_account_name = location.lower() + random_string
+    storage_account = wait_for_poller(clients.storage.storage_accounts.begin_create(
+        transient_resource_group_name, target_storage_account_name,
+        storage_account_create_parameters(sku=storage_sku(name='Standard_LRS'), kind='StorageV2',
+                                          location=location, tags=get_extension_tags())), cancel_event)
+    if storage_account is None:
+        return
+    target_blob_endpoint = storage_account.primary_endpoints.blob
+
+    # Setup the target storage account
+    keys = clients.storage.storage_accounts.list_keys(transient_resource_group_name, target_storage_account_name)
+    target_storage_account_key = keys.keys[0].value
+
+    # create a container in the target blob storage account
+    logger.warning(
+        "%s - Creating container in the target storage account", location)
+    target_container_name = 'snapshots'
+    clients.storage.blob_containers.create(transient_resource_group_name, target_storage_account_name,
+                                           target_container_name, blob_container())
+
+    # Copy the snapshot to the target region using the SAS URL
+    blob_name = source_os_disk_snapshot_name + '.vhd'
+    logger.warning(
+        "%s - Copying blob to target storage account", location)
+    blob_client = cf_blob_client(cmd.cli_ctx, target_blob_endpoint, target_container_name, blob_name,
+                                 target_storage_account_key)
+    blob_client.start_copy_from_url(source_os_disk_snapshot_url)
+
+    # Wait for the copy to complete
+    start_datetime = datetime.datetime.now()
+    if not wait_for_blob_copy_operation(blob_client, azure_pool_frequency, location, cancel_event):
+        return
+    msg = "{0} - Copy time: {1}".format(
+        location, datetime.datetime.now() - start_datetime)
+    logger.warning(msg)
+
+    # Create the snapshot in the target region from the copied blob
+    logger.warning(
+        "%s - Creating snapshot in target region from the copied blob", location)
+    target_blob_path = target_blob_endpoint + \
+        target_container_name + '/' + blob_name
+    target_snapshot_name = source_os_disk_snapshot_name + '-' + location
+    if export_as_snapshot:
+        snapshot_resource_group_name = target_resource_group_name
+    else:
+        snapshot_resource_group_name = transient_resource_group_name
+
+    source_storage_account_id = get_storage_account_id_from_blob_path(cmd,
+                                                                      target_blob_path,
+                                                                      transient_resource_group_name,
+                                                                      clients.subscription_id)
+
+    target_snapshot = wait_for_poller(clients.compute.snapshots.begin_create_or_update(
+        snapshot_resource_group_name, target_snapshot_name,
+        snapshot_model(location=location, hyper_v_generation=hyper_v_generation, tags=get_extension_tags(),
+                       creation_data=creation_data(create_option='Import', source_uri=target_blob_path,
+                                                   storage_account_id=source_storage_account_id))), cancel_event)
+    if target_snapshot is None:
+        return
+
+    # Optionally create the final image
+    if export_as_snapshot:
+        logger.warning("%s - Skipping image creation", location)
+    else:
+        logger.warning("%s - Creating final image", location)
+        if target_name is None:
+            target_image_name = source_object_name
+            if source_type != 'image':
+                target_image_name += '-image'
+            target_image_name += '-' + location
+        else:
+            target_image_name = target_name
+
+        image_model, image_storage_profile, image_os_disk, sub_resource = cmd.get_models(
+            'Image', 'ImageStorageProfile', 'ImageOSDisk', 'SubResource',
+            resource_type=ResourceType.MGMT_COMPUTE, operation_group='images')
+        os_disk = image_os_disk(os_type=source_os_type, os_state='Generalized',
+                                snapshot=sub_resource(id=target_snapshot.id))
+        wait_for_poller(clients.compute.images.begin_create_or_update(
+            target_resource_group_name, target_image_name,
+            image_model(location=location, hyper_v_generation=hyper_v_generation, tags=get_extension_tags(tags),
+                        storage_profile=image_storage_profile(os_disk=os_disk))), cancel_event)
+
+
+def wait_for_poller(poller, cancel_event=None):
+    '''
+    Wait for a long running operation and return its result. Returns None if the wait was cancelled, the operation
+    itself goes on in Azure.
+    '''
+    cancel_event = cancel_event or threading.Event()
+    while not poller.done():
+        if cancel_event.is_set():
+            return None
+        poller.wait(CANCEL_CHECK_INTERVAL)
+    return poller.result()
+
+
+def wait_for_blob_copy_operation(blob_client, azure_pool_frequency, location, cancel_event=None):
+    '''
+    Poll the copy status of the target blob. Returns False if the wait was cancelled.
+    '''
+    cancel_event = cancel_event or threading.Event()
+    copy_status = "pending"
+    prev_progress = -1
+    while copy_status == "pending":
+        copy_properties = blob_client.get_blob_properties().copy
+        copy_status = copy_properties.status
+        if copy_properties.progress:
+            copy_progress_1, copy_progress_2 = copy_properties.progress.split("/")
+            current_progress = int(
+                int(copy_progress_1) / int(copy_progress_2) * 100)
+
+            if current_progress != prev_progress:
+                msg = "{0} - Copy progress: {1}%"\
+                    .format(location, str(current_progress))
+                logger.warning(msg)
+
+            prev_progress = current_progress
+
+        if copy_status == "pending" and cancel_event.wait(azure_pool_frequency):
+            return False
+
+    if copy_status != 'success':
+        logger.error(
+            "The copy operation didn't succeed. Last status: %s", copy_status)
+        logger.error("Copy status description: %s", copy_properties.status_description)
+
+        raise CLIError('Blob copy failed')
+    return True
+
+
+def get_random_string(length):
+    import string
+    import random
+    chars = string.ascii_lowercase + string.digits
+    return ''.join(random.choice(chars) for _ in range(length))
@@ -3,13 +3,16 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
 
+from azure.cli.core.profiles import ResourceType
 from knack.util import CLIError
 from knack.log import get_logger
 
-from azext_imagecopy.cli_utils import run_cli_command, prepare_cli_command, get_storage_account_id_from_blob_path
-from azext_imagecopy.create_target import create_target_image
+from azext_imagecopy._client_factory import cf_compute, cf_resource_groups
+from azext_imagecopy.cli_utils import get_extension_tags, get_subscription_id, get_storage_account_id_from_blob_path
+from azext_imagecopy.create_target import create_target_image, TargetClients
 
 logger = get_logger(__name__)
 
@@ -21,62 +24,50 @@ def imagecopy(cmd, source_resource_group_name, source_object_name, target_locati
               target_resource_group_name, temporary_resource_group_name='image-copy-rg',
               source_type='image', cleanup=False, parallel_degree=-1, tags=None, target_name=None,
               target_subscription=None, export_as_snapshot='false', timeout=3600):
+    source_compute_client = cf_compute(cmd.cli_ctx)
     if cleanup:
         # If --cleanup is set, forbid using an existing temporary resource group name.
         # It is dangerous to clean up an existing resource group.
-        cli_cmd = prepare_cli_command(['group', 'exists', '-n', temporary_resource_group_name],
-                                      output_as_json=False)
-        cmd_output = run_cli_command(cli_cmd)
-        if 'true' in cmd_output:
+        if cf_resource_groups(cmd.cli_ctx).check_existence(temporary_resource_group_name):
             raise CLIError('Don\'t specify an existing resource group in --temporary-resource-group-name '
                            'when --cleanup is set')
 
     # get the os disk id from source vm/image
     logger.warning("Getting OS disk ID of the source VM/image")
-    cli_cmd = prepare_cli_command([source_type, 'show',
-                                   '--name', source_object_name,
-                                   '--resource-group', source_resource_group_name])
-
-    json_cmd_output = run_cli_command(cli_cmd, return_as_json=True)
+    if source_type == 'vm':
+        source_object = source_compute_client.virtual_machines.get(source_resource_group_name, source_object_name)
+    else:
+        source_object = source_compute_client.images.get(source_resource_group_name, source_object_name)
 
-    if json_cmd_output['storageProfile']['dataDisks']:
+    if source_object.storage_profile.data_disks:
         logger.warning(
             "Data disks in the source detected, but are ignored by this extension!")
 
+    source_os_disk = source_object.storage_profile.os_disk
     source_os_disk_id = None
     source_os_disk_type = None
 
-    try:
-        source_os_disk_id = json_cmd_output['storageProfile']['osDisk']['managedDisk']['id']
-        if source_os_disk_id is None:
-            raise TypeError
+    if source_os_disk.managed_disk is not None and source_os_disk.managed_disk.id is not None:
+        source_os_disk_id = source_os_disk.managed_disk.id
         source_os_disk_type = "DISK"
-        logger.debug("found %s: %s", source_os_disk_type, source_os_disk_id)
-    except TypeError:
-        try:
-            source_os_disk_id = json_cmd_output['storageProfile']['osDisk']['blobUri']
-            if source_os_disk_id is None:
-                raise TypeError
-            source_os_disk_type = "BLOB"
-            logger.debug("found %s: %s", source_os_disk_type,
-                         source_os_disk_id)
-        except TypeError:
-            try:  # images created by e.g. image-copy extension
-                source_os_disk_id = json_cmd_output['storageProfile']['osDisk']['snapshot']['id']
-                if source_os_disk_id is None:
-                    raise TypeError
-                source_os_disk_type = "SNAPSHOT"
-                logger.debug("found %s: %s", source_os_disk_type,
-                             source_os_disk_id)
-            except TypeError:
-                pass
+    elif getattr(source_os_disk, 'blob_uri', None) is not None:
+        source_os_disk_id = source_os_disk.blob_uri
+        source_os_disk_type = "BLOB"
+    elif getattr(source_os_disk, 'vhd', None) is not None and source_os_disk.vhd.uri is not None:
+        source_os_disk_id = source_os_disk.vhd.uri
+        source_os_disk_type = "BLOB"
+    elif getattr(source_os_disk, 'snapshot', None) is not None and source_os_disk.snapshot.id is not None:
+        # images created by e.g. image-copy extension
+        source_os_disk_id = source_os_disk.snapshot.id
+        source_os_disk_type = "SNAPSHOT"
 
     if source_os_disk_type is None or source_os_disk_id is None:
         logger.error(
             'Unable to locate a supported OS disk type in the provided source object')
         raise CLIError('Invalid OS Disk Source Type')
+    logger.debug("found %s: %s", source_os_disk_type, source_os_disk_id)
 
-    source_os_type = json_cmd_output['storageProfile']['osDisk']['osType']
+    source_os_type = source_os_disk.os_type
     logger.debug("source_os_disk_type: %s. source_os_disk_id: %s. source_os_type: %s",
                  source_os_disk_type, source_os_disk_id, source_os_type)
 
@@ -84,28 +75,24 @@ def imagecopy(cmd, source_resource_group_name, source_object_name, target_locati
     # TODO: skip creating another snapshot when the source is a snapshot
     logger.warning("Creating source snapshot")
     source_os_disk_snapshot_name = source_object_name + '_os_disk_snapshot'
-    snapshot_location = json_cmd_output['location']
-    hyper_v_generation = json_cmd_output['hyperVGeneration']
+    snapshot_location = source_object.location
+    hyper_v_generation = getattr(source_object, 'hyper_v_generation', None) or 'V1'
+    snapshot_model, creation_data, grant_access_data = cmd.get_models(
+        'Snapshot', 'CreationData', 'GrantAccessData', resource_type=ResourceType.MGMT_COMPUTE,
+        operation_group='snapshots')
     if source_os_disk_type == "BLOB":
         source_storage_account_id = get_storage_account_id_from_blob_path(cmd,
                                                                           source_os_disk_id,
                                                                           source_resource_group_name)
-        cli_cmd = prepare_cli_command(['snapshot', 'create',
-                                       '--name', source_os_disk_snapshot_name,
-                                       '--location', snapshot_location,
-                                       '--resource-group', source_resource_group_name,
-                                       '--source', source_os_disk_id,
-                                       '--source-storage-account-id', source_storage_account_id,
-                                       '--hyper-v-generation', hyper_v_generation])
+        source_creation_data = creation_data(create_option='Import', source_uri=source_os_disk_id,
+                                             storage_account_id=source_storage_account_id)
     else:
-        cli_cmd = prepare_cli_command(['snapshot', 'create',
-                                       '--name', source_os_disk_snapshot_name,
-                                       '--location', snapshot_location,
-                                       '--resource-group', source_resource_group_name,
-                                       '--source', source_os_disk_id,
-                                       '--hyper-v-generation', hyper_v_generation])
+        source_creation_data = creation_data(create_option='Copy', source_resource_id=source_os_disk_id)
 
-    run_cli_command(cli_cmd)
+    source_compute_client.snapshots.begin_create_or_update(
+        source_resource_group_name, source_os_disk_snapshot_name,
+        snapshot_model(location=snapshot_location, hyper_v_generation=hyper_v_generation,
+                       creation_data=source_creation_data, tags=get_extension_tags())).result()
 
     # Get SAS URL for the snapshotName
     logger.warning(
@@ -114,124 +101,127 @@ def imagecopy(cmd, source_resource_group_name, source_object_name, target_locati
         logger.error("Timeout should be greater than 3600 seconds")
         raise CLIError('Invalid Timeout')
 
-    cli_cmd = prepare_cli_command(['snapshot', 'grant-access',
-                                   '--name', source_os_disk_snapshot_name,
-                                   '--resource-group', source_resource_group_name,
-                                   '--duration-in-seconds', str(timeout)])
-
-    json_output = run_cli_command(cli_cmd, return_as_json=True)
+    access_uri = source_compute_client.snapshots.begin_grant_access(
+        source_resource_group_name, source_os_disk_snapshot_name,
+        grant_access_data(access='Read', duration_in_seconds=timeout)).result()
 
-    source_os_disk_snapshot_url = json_output['accessSas']
+    source_os_disk_snapshot_url = access_uri.access_sas
     logger.debug("source os disk snapshot url: %s",
                  source_os_disk_snapshot_url)
 
     # Start processing in the target locations
 
+    # the clients of the target subscription are shared by all target locations
+    target_clients = TargetClients(cmd.cli_ctx, get_subscription_id(cmd.cli_ctx, target_subscription))
+
     transient_resource_group_name = temporary_resource_group_name
     # pick the first location for the temp group
     transient_resource_group_location = target_location[0].strip()
-    create_resource_group(transient_resource_group_name,
-                          transient_resource_group_location,
-                          target_subscription)
+    create_resource_group(cmd, target_clients.resource_groups,
+                          transient_resource_group_name,
+                          transient_resource_group_location)
 
     target_locations_count = len(target_location)
     logger.warning("Target location count: %s", target_locations_count)
 
-    create_resource_group(target_resource_group_name,
-                          target_location[0].strip(),
-                          target_subscription)
-
+    create_resource_group(cmd, target_clients.resource_groups,
+                          target_resource_group_name,
+                          target_location[0].strip())
+
+    # try to get a handle on arm's 409s
+    azure_pool_frequency = 5
+    if target_locations_count >= 5:
+        azure_pool_frequency = 15
+    elif target_locations_count >= 3:
+        azure_pool_frequency = 10
+
+    cancel_event = threading.Event()
+    tasks = []
+    for location in target_location:
+        location = location.strip()
+        tasks.append((cmd, target_clients, location, transient_resource_group_name, source_type,
+                      source_object_name, source_os_disk_snapshot_name, source_os_disk_snapshot_url,
+                      source_os_type, target_resource_group_name, azure_pool_frequency,
+                      tags, target_name, export_as_snapshot, hyper_v_generation, cancel_event))
+
+    cancelled = False
     try:
-
-        # try to get a handle on arm's 409s
-        azure_pool_frequency = 5
-        if target_locations_count >= 5:
-            azure_pool_frequency = 15
-        elif target_locations_count >= 3:
-            azure_pool_frequency = 10
-
         if (target_locations_count == 1) or (parallel_degree == 1):
             # Going to copy to targets one-by-one
             logger.debug("Starting sync process for all locations")
-            for location in target_location:
-                location = location.strip()
-                create_target_image(cmd, location, transient_resource_group_name, source_type,
-                                    source_object_name, source_os_disk_snapshot_name, source_os_disk_snapshot_url,
-                                    source_os_type, target_resource_group_name, azure_pool_frequency,
-                                    tags, target_name, target_subscription, export_as_snapshot, timeout,
-                                    hyper_v_generation)
+            for task in tasks:
+                create_target_image(*task)
         else:
             if parallel_degree == -1:
-                pool = Pool(target_locations_count)
+                max_workers = target_locations_count
             else:
-                pool = Pool(min(parallel_degree, target_locations_count))
-
-            tasks = []
-            for location in target_location:
-                location = location.strip()
-                tasks.append((location, transient_resource_group_name, source_type,
-                              source_object_name, source_os_disk_snapshot_name, source_os_disk_snapshot_url,
-                              source_os_type, target_resource_group_name, azure_pool_frequency,
-                              tags, target_name, target_subscription, export_as_snapshot, timeout,
-                              hyper_v_generation))
+                max_workers = min(parallel_degree, target_locations_count)
 
             logger.warning("Starting async process for all locations")
-
-            for task in tasks:
-                pool.apply_async(create_target_image, task)
-
-            pool.close()
-            pool.join()
+            copy_in_parallel(tasks, max_workers, cancel_event)
 
     except KeyboardInterrupt:
+        cancelled = True
         logger.warning('User cancelled the operation')
         if cleanup:
             logger.warning('To cleanup temporary resources look for ones tagged with "image-copy-extension". \n'
                            'You can use the following command: az resource list --tag created_by=image-copy-extension')
-        pool.terminate()
         return
-
-    # Cleanup
-    if cleanup:
-        logger.warning('Deleting transient resources')
-
-        # Delete resource group
-        cli_cmd = prepare_cli_command(['group', 'delete', '--no-wait', '--yes',
-                                       '--name', transient_resource_group_name],
-                                      subscription=target_subscription)
-        run_cli_command(cli_cmd)
-
-        # Revoke sas for source snapshot
-        cli_cmd = prepare_cli_command(['snapshot', 'revoke-access',
-                                       '--name', source_os_disk_snapshot_name,
-                                       '--resource-group', source_resource_group_name])
-        run_cli_command(cli_cmd)
-
-        # Delete source snapshot
-        # TODO: skip this if source is snapshot and not creating a new one
-        cli_cmd = prepare_cli_command(['snapshot', 'delete',
-                                       '--name', source_os_disk_snapshot_name,
-                                       '--resource-group', source_resource_group_name])
-        run_cli_command(cli_cmd)
-
-
-def create_resource_group(resource_group_name, location, subscription=None):
+    finally:
+        # the transient resources are deleted whether the copies succeeded or not, the source snapshot must not
+        # keep its SAS access granted
+        if cleanup and not cancelled:
+            logger.warning('Deleting transient resources')
+
+            # Delete resource group
+            target_clients.resource_groups.begin_delete(transient_resource_group_name)
+
+            # Revoke sas for source snapshot
+            source_compute_client.snapshots.begin_revoke_access(source_resource_group_name,
+                                                                source_os_disk_snapshot_name).result()
+
+            # Delete source snapshot
+            # TODO: skip this if source is snapshot and not creating a new one
+            source_compute_client.snapshots.begin_delete(source_resource_group_name,
+                                                         source_os_disk_snapshot_name).result()
+
+
+def copy_in_parallel(tasks, max_workers, cancel_event):
+    """
+    Run create_target_image for each of the tasks on a thread pool. Raises CLIError naming the target locations
+    that failed once all the copies are done.
+    """
+    # the copies spend their time waiting on ARM and the storage service, threads are enough
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {executor.submit(create_target_image, *task): task[2] for task in tasks}
+    try:
+        wait(futures)
+    except KeyboardInterrupt:
+        # stop the copies in flight at their next poll and don't wait for them. The futures are cancelled
+        # explicitly as shutdown(cancel_futures=True) needs Python 3.9
+        cancel_event.set()
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+        raise
+    executor.shutdown()
+
+    failed_locations = []
+    for future, location in futures.items():
+        if future.exception() is not None:
+            logger.error('%s - Copy failed: %s', location, future.exception())
+            failed_locations.append(location)
+    if failed_locations:
+        raise CLIError('Failed to copy the image to: {}'.format(', '.join(failed_locations)))
+
+
+def create_resource_group(cmd, resource_groups_client, resource_group_name, location):
     # check if target resource group exists
-    cli_cmd = prepare_cli_command(['group', 'exists',
-                                   '--name', resource_group_name],
-                                  output_as_json=False,
-                                  subscription=subscription)
-
-    cmd_output = run_cli_command(cli_cmd)
-
-    if 'true' in cmd_output:
+    if resource_groups_client.check_existence(resource_group_name):
         return
 
     # create the target resource group
     logger.warning("Creating resource group: %s", resource_group_name)
-    cli_cmd = prepare_cli_command(['group', 'create',
-                                   '--name', resource_group_name,
-                                   '--location', location],
-                                  subscription=subscription)
-
-    run_cli_command(cli_cmd)
+    resource_group = cmd.get_models('ResourceGroup', resource_type=ResourceType.MGMT_RESOURCE_RESOURCES)
+    resource_groups_client.create_or_update(resource_group_name,
+                                            resource_group(location=location, tags=get_extension_tags()))
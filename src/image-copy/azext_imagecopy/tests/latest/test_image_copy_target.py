@@ -0,0 +1,109 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import unittest
+from unittest import mock
+
+from knack.util import CLIError
+
+from azext_imagecopy import custom
+from azext_imagecopy.cli_utils import get_extension_tags
+from azext_imagecopy.create_target import wait_for_blob_copy_operation, wait_for_poller
+
+
+def _blob_client(*states):
+    blob_client = mock.MagicMock()
+    properties = []
+    for status, progress in states:
+        blob_properties = mock.MagicMock()
+        blob_properties.copy.status = status
+        blob_properties.copy.progress = progress
+        properties.append(blob_properties)
+    blob_client.get_blob_properties.side_effect = properties
+    return blob_client
+
+
+class ImageCopyTargetTests(unittest.TestCase):
+
+    def test_extension_tags(self):
+        self.assertEqual(get_extension_tags(), {'created_by': 'image-copy-extension'})
+        self.assertEqual(get_extension_tags({'env': 'test'}), {'created_by': 'image-copy-extension', 'env': 'test'})
+
+    def test_wait_for_blob_copy_operation(self):
+        blob_client = _blob_client(('pending', None), ('pending', '50/100'), ('success', '100/100'))
+        self.assertTrue(wait_for_blob_copy_operation(blob_client, 0, 'westus'))
+        self.assertEqual(blob_client.get_blob_properties.call_count, 3)
+
+    def test_wait_for_blob_copy_operation_failed(self):
+        blob_client = _blob_client(('pending', '50/100'), ('failed', '50/100'))
+        with self.assertRaises(CLIError):
+            wait_for_blob_copy_operation(blob_client, 0, 'westus')
+
+    def test_wait_for_blob_copy_operation_cancelled(self):
+        cancel_event = threading.Event()
+        cancel_event.set()
+        blob_client = _blob_client(('pending', '50/100'))
+        self.assertFalse(wait_for_blob_copy_operation(blob_client, 60, 'westus', cancel_event))
+
+    def test_wait_for_poller(self):
+        poller = mock.MagicMock()
+        poller.done.side_effect = [False, False, True]
+        self.assertEqual(wait_for_poller(poller), poller.result.return_value)
+        self.assertEqual(poller.wait.call_count, 2)
+
+    def test_wait_for_poller_cancelled(self):
+        cancel_event = threading.Event()
+        poller = mock.MagicMock()
+        poller.done.return_value = False
+        poller.wait.side_effect = lambda timeout: cancel_event.set()
+        self.assertIsNone(wait_for_poller(poller, cancel_event))
+        poller.result.assert_not_called()
+
+
+class ImageCopyCleanupTests(unittest.TestCase):
+
+    def setUp(self):
+        self.source_compute_client = mock.MagicMock()
+        self.target_clients = mock.MagicMock()
+        resource_groups = mock.MagicMock()
+        resource_groups.check_existence.return_value = False
+        for patcher in [mock.patch.object(custom, 'cf_compute', return_value=self.source_compute_client),
+                        mock.patch.object(custom, 'cf_resource_groups', return_value=resource_groups),
+                        mock.patch.object(custom, 'get_subscription_id', return_value='subscription'),
+                        mock.patch.object(custom, 'TargetClients', return_value=self.target_clients)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _imagecopy(self, create_target_image, parallel_degree=-1):
+        cmd = mock.MagicMock()
+        cmd.get_models.return_value = (mock.MagicMock(), mock.MagicMock(), mock.MagicMock())
+        with mock.patch.object(custom, 'create_target_image', side_effect=create_target_image):
+            custom.imagecopy(cmd, 'rg', 'image', ['westus', 'eastus', 'northeurope'], 'target-rg', cleanup=True,
+                             parallel_degree=parallel_degree)
+
+    def _assert_cleaned_up(self):
+        self.target_clients.resource_groups.begin_delete.assert_called_once_with('image-copy-rg')
+        self.source_compute_client.snapshots.begin_revoke_access.assert_called_once_with(
+            'rg', 'image_os_disk_snapshot')
+        self.source_compute_client.snapshots.begin_delete.assert_called_once_with('rg', 'image_os_disk_snapshot')
+
+    def test_failed_copies_are_cleaned_up(self):
+        def _create_target_image(*args):
+            if args[2] != 'eastus':
+                raise CLIError('Blob copy failed')
+
+        with self.assertRaisesRegex(CLIError, 'westus, northeurope'):
+            self._imagecopy(_create_target_image)
+        self._assert_cleaned_up()
+
+    def test_failed_sequential_copy_is_cleaned_up(self):
+        with self.assertRaises(CLIError):
+            self._imagecopy(CLIError('Blob copy failed'), parallel_degree=1)
+        self._assert_cleaned_up()
+
+
+if __name__ == '__main__':
+    unittest.main()
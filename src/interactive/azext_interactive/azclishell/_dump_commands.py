@@ -3,8 +3,12 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import hashlib
 import json
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
 import yaml  # pylint: disable=import-error
 
 from azure.cli.core import MainCommandsLoader
@@ -13,9 +17,16 @@ from knack.help import REQUIRED_TAG
 from knack.help_files import helps
 from knack.log import get_logger
 
+from .command_index import CommandIndex, get_index_key, get_index_path, write_command_index
 
 logger = get_logger(__name__)
 
+SHARD_DIR_NAME = 'help_dump_shards'
+SHARD_MANIFEST_NAME = 'manifest.json'
+# bump when the content of the shards changes
+SHARD_FORMAT = '1'
+MAX_DUMP_WORKERS = 8
+
 
 class AzInteractiveCommandsLoader(MainCommandsLoader):  # pylint: disable=too-few-public-methods
 
@@ -90,51 +101,209 @@ class FreshTable(object):
         register_ids_argument(shell_ctx.cli_ctx)
         shell_ctx.cli_ctx.raise_event(events.EVENT_INVOKER_POST_CMD_TBL_CREATE, commands_loader=main_loader)
         cmd_table = main_loader.command_table
+        FreshTable.loader = main_loader
 
-        cmd_table_data = {}
+        command_file = shell_ctx.config.get_help_files()
+        cache_dir = get_cache_dir(shell_ctx)
+        command_file_path = os.path.join(cache_dir, command_file)
+        shards = CommandShards(os.path.join(cache_dir, SHARD_DIR_NAME), cmd_table)
+        if shards.is_current() and os.path.exists(command_file_path):
+            if CommandIndex.load(get_index_path(command_file_path), get_index_key(command_file_path)) is None:
+                # the index is missing or stale, it is rebuilt from the dump without dumping it again
+                with open(command_file_path, 'r') as help_file:
+                    _write_index(json.load(help_file), command_file_path)
+            logger.debug('Command table dump is up to date: %s sec', timeit.default_timer() - start_time)
+            return
+
+        cmd_table_data = shards.dump()
+        elapsed = timeit.default_timer() - start_time
+        logger.debug('Command table dumped: %s sec', elapsed)
+
+        # dump into the cache file
+        with open(command_file_path, 'w') as help_file:
+            help_file.write(json.dumps(cmd_table_data))
+
+        _write_index(cmd_table_data, command_file_path)
+        shards.write_manifest()
+
+
+def _write_index(cmd_table_data, command_file_path):
+    """ index the dump, so the next start doesn't parse it """
+    try:
+        write_command_index(cmd_table_data, get_index_path(command_file_path), get_index_key(command_file_path))
+    except (IOError, OSError) as ex:
+        logger.debug('Failed to write the command table index: %s', ex)
+
+
+class CommandShards(object):
+    """ the dump of the command table kept as one shard per module and extension
+
+    A shard is only dumped again when the version or the files of its package change, the
+    shards of the other packages are read back from the cache.
+    """
+
+    def __init__(self, shard_dir, cmd_table, max_workers=MAX_DUMP_WORKERS):
+        self.shard_dir = shard_dir
+        self.max_workers = max_workers
+        self.packages = {}
         for command_name, cmd in cmd_table.items():
+            self.packages.setdefault(get_command_package(cmd), {})[command_name] = cmd
+        # extensions are loaded after the modules, so their help takes precedence
+        self.order = sorted(self.packages, key=lambda package: (package.startswith('extension-'), package))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            self.keys = dict(zip(self.order, executor.map(
+                lambda package: get_package_key(package, self.packages[package]), self.order)))
 
+    def _get_shard_path(self, package):
+        return os.path.join(self.shard_dir, package + '.json')
+
+    def _get_manifest_path(self):
+        return os.path.join(self.shard_dir, SHARD_MANIFEST_NAME)
+
+    def is_current(self):
+        """ whether the last dump was made from the same packages """
+        try:
+            with open(self._get_manifest_path(), 'r') as manifest_file:
+                return json.load(manifest_file) == self.keys
+        except (IOError, OSError, ValueError):
+            return False
+
+    def write_manifest(self):
+        _write_json(self._get_manifest_path(), self.keys)
+
+    def dump(self):
+        """ dumps the stale shards and returns the merged command table data """
+        if not os.path.exists(self.shard_dir):
+            os.makedirs(self.shard_dir)
+        help_names = _get_help_names(self.packages)
+
+        def _dump_package(package):
+            shard_path = self._get_shard_path(package)
             try:
-                command_description = cmd.description
-                if callable(command_description):
-                    command_description = command_description()
-
-                # checking all the parameters for a single command
-                parameter_metadata = {}
-                for arg in cmd.arguments.values():
-                    options = {
-                        'name': [name for name in arg.options_list],
-                        'required': REQUIRED_TAG if arg.type.settings.get('required') else '',
-                        'help': arg.type.settings.get('help') or ''
-                    }
-                    # the key is the first alias option
-                    if arg.options_list:
-                        parameter_metadata[arg.options_list[0]] = options
-
-                cmd_table_data[command_name] = {
-                    'parameters': parameter_metadata,
-                    'help': command_description,
-                    'examples': ''
-                }
-            except (ImportError, ValueError):
+                with open(shard_path, 'r') as shard_file:
+                    shard = json.load(shard_file)
+                if shard['key'] == self.keys[package]:
+                    return shard['data']
+            except (IOError, OSError, ValueError, KeyError, TypeError):
                 pass
 
-        load_help_files(cmd_table_data)
-        elapsed = timeit.default_timer() - start_time
-        logger.debug('Command table dumped: %s sec', elapsed)
-        FreshTable.loader = main_loader
+            logger.debug('Dumping the commands of %s', package)
+            data = dump_commands(self.packages[package])
+            load_help_files(data, help_names[package])
+            # round trip so that a shard just dumped is the same as one read back
+            data = json.loads(json.dumps(data, default=_serialize, skipkeys=True))
+            _write_json(shard_path, {'key': self.keys[package], 'data': data})
+            return data
 
-        # dump into the cache file
-        command_file = shell_ctx.config.get_help_files()
-        with open(os.path.join(get_cache_dir(shell_ctx), command_file), 'w') as help_file:
-            json.dump(cmd_table_data, help_file, default=lambda x: x.target or '', skipkeys=True)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            shards = list(executor.map(_dump_package, self.order))
+
+        for file_name in os.listdir(self.shard_dir):
+            package, ext = os.path.splitext(file_name)
+            if ext == '.json' and file_name != SHARD_MANIFEST_NAME and package not in self.packages:
+                os.remove(os.path.join(self.shard_dir, file_name))
+
+        cmd_table_data = {}
+        for data in shards:
+            cmd_table_data.update(data)
+        return cmd_table_data
+
+
+def get_command_package(cmd):
+    """ the name of the module or extension a command comes from """
+    source = getattr(cmd, 'command_source', None)
+    extension_name = getattr(source, 'extension_name', None)
+    if extension_name:
+        return 'extension-' + extension_name
+    if isinstance(source, str):
+        return 'module-' + source
+    return 'core'
+
+
+def get_package_key(package, commands):
+    """ the key of a package's shard, which changes with the CLI and the loader module of the package """
+    from azure.cli.core import __version__ as core_version
+
+    parts = [SHARD_FORMAT, sys.version, core_version, package]
+    loader_files = set()
+    for cmd in commands.values():
+        # the loader of the commands lives in the package, installing or upgrading the package rewrites its file
+        module = sys.modules.get(type(getattr(cmd, 'loader', None)).__module__)
+        if getattr(module, '__file__', None):
+            loader_files.add(module.__file__)
+    for loader_file in sorted(loader_files):
+        try:
+            stat = os.stat(loader_file)
+        except OSError:
+            continue
+        parts.append('{}:{}:{}'.format(loader_file, stat.st_size, stat.st_mtime_ns))
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def dump_commands(commands):
+    """ the parameters and descriptions of commands """
+    cmd_table_data = {}
+    for command_name, cmd in commands.items():
+
+        try:
+            command_description = cmd.description
+            if callable(command_description):
+                command_description = command_description()
+
+            # checking all the parameters for a single command
+            parameter_metadata = {}
+            for arg in cmd.arguments.values():
+                options = {
+                    'name': [name for name in arg.options_list],
+                    'required': REQUIRED_TAG if arg.type.settings.get('required') else '',
+                    'help': arg.type.settings.get('help') or ''
+                }
+                # the key is the first alias option
+                if arg.options_list:
+                    parameter_metadata[arg.options_list[0]] = options
+
+            cmd_table_data[command_name] = {
+                'parameters': parameter_metadata,
+                'help': command_description,
+                'examples': ''
+            }
+        except (ImportError, ValueError):
+            pass
+    return cmd_table_data
+
+
+def _get_help_names(packages):
+    """ the help entries of each package: the ones of its commands and of the groups they are in """
+    owners = {}
+    for package, commands in packages.items():
+        for command_name in commands:
+            words = command_name.split()
+            for i in range(1, len(words) + 1):
+                owners.setdefault(' '.join(words[:i]), set()).add(package)
+
+    help_names = {package: [] for package in packages}
+    for name in helps:
+        for package in owners.get(name, ()):
+            help_names[package].append(name)
+    return help_names
+
+
+def _serialize(value):
+    return value.target or ''
+
+
+def _write_json(path, content):
+    temp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temp_path, 'w') as json_file:
+        json.dump(content, json_file, default=_serialize, skipkeys=True)
+    os.replace(temp_path, path)
 
 
-def load_help_files(data):
-    """ loads all the extra information from help files """
-    for command_name, help_yaml in helps.items():
+def load_help_files(data, names=None):
+    """ loads all the extra information from help files, or from the ones of the given names """
+    for command_name in helps if names is None else names:
 
-        help_entry = yaml.safe_load(help_yaml)
+        help_entry = yaml.safe_load(helps[command_name])
         try:
             help_type = help_entry['type']
         except KeyError:
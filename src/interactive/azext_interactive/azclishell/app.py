@@ -166,6 +166,22 @@ class AzInteractiveShell(object):
         except OSError as ex:
             print("cd: %s\n" % ex, file=self.output)
 
+    def refresh_completions(self):
+        """ completes the text again, when the values of a dynamic completer come after the completions """
+        cli = self._cli
+        if cli is None or cli.eventloop is None:
+            return
+
+        def _refresh():
+            complete_state = cli.current_buffer.complete_state
+            # leave the completions alone while the user goes through them
+            if complete_state and complete_state.complete_index is not None:
+                return
+            cli.current_buffer.complete_state = None
+            cli.start_completion()
+
+        cli.eventloop.call_from_executor(_refresh)
+
     def on_input_timeout(self, cli):
         """
         brings up the metadata for the command if there is a valid command already typed
@@ -17,6 +17,7 @@ from prompt_toolkit.completion import Completer, Completion  # pylint: disable=i
 
 from . import configuration
 from .argfinder import ArgsFinder
+from .dynamic_completion import DynamicCompletionCache, call_completer
 from .util import parse_quotes
 
 SELECT_SYMBOL = configuration.SELECT_SYMBOL
@@ -87,6 +88,8 @@ class AzCompleter(Completer):
         self.parser = AzCliCommandParser(parents=[self.global_parser])
         self.argsfinder = ArgsFinder(self.parser)
         self.cmdtab = {}
+        # the values of dynamic completers, which are called in the background
+        self.dynamic_completions = DynamicCompletionCache(on_update=getattr(shell_ctx, 'refresh_completions', None))
 
         if commands:
             self.start(commands, global_params=global_params)
@@ -220,10 +223,24 @@ class AzCompleter(Completer):
         AzCliCommandParser._check_value = _check_value
         return parse_args
 
-    # pylint: disable=too-many-branches
+    def get_subscription(self):
+        """ the subscription dynamic completers list the resources of """
+        from azure.cli.core._profile import Profile
+        try:
+            return Profile(cli_ctx=self.shell_ctx.cli_ctx).get_subscription_id()
+        except Exception:  # pylint: disable=broad-except
+            return None  # if the user isn't logged in
+
+    def get_dynamic_completion_key(self, arg_name, parsed_args):
+        """ the values of a completer depend on the command, the subscription and the other arguments """
+        subscription = getattr(parsed_args, '_subscription', None) or self.get_subscription()
+        other_args = tuple(sorted((name, repr(value)) for name, value in vars(parsed_args).items()
+                                  if name != arg_name))
+        return self.current_command, arg_name, subscription, other_args
+
     def gen_dynamic_completions(self, text):
         """ generates the dynamic values, like the names of resource groups """
-        try:  # pylint: disable=too-many-nested-blocks
+        try:
             param = self.leftover_args[-1]
 
             # command table specific name
@@ -232,26 +249,15 @@ class AzCompleter(Completer):
             for comp in self.gen_enum_completions(arg_name):
                 yield comp
 
-            parsed_args = self.mute_parse_args(text)
-
-            # there are 3 formats for completers the cli uses
-            # this try catches which format it is
-            if self.cmdtab[self.current_command].arguments[arg_name].completer:
-                completions = []
-                try:
-                    completions = self.cmdtab[self.current_command].arguments[arg_name].completer(
-                        prefix=self.unfinished_word, action=None, parsed_args=parsed_args)
-                except TypeError:
-                    try:
-                        completions = self.cmdtab[self.current_command].arguments[arg_name].completer(
-                            prefix=self.unfinished_word)
-                    except TypeError:
-                        try:
-                            completions = self.cmdtab[self.current_command].arguments[arg_name].completer()
-                        except TypeError:
-                            pass  # other completion method used
-
-                for comp in completions:
+            completer = self.cmdtab[self.current_command].arguments[arg_name].completer
+            if completer:
+                parsed_args = self.mute_parse_args(text)
+                # the completer runs in the background, so a slow one doesn't hold the other completions
+                completions = self.dynamic_completions.get(
+                    self.get_dynamic_completion_key(arg_name, parsed_args), self.unfinished_word,
+                    lambda prefix: call_completer(completer, prefix, parsed_args))
+
+                for comp in completions or []:
                     for completion in self.process_dynamic_completion(comp):
                         yield completion
 
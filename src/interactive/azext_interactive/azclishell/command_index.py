@@ -0,0 +1,198 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import marshal
+import os
+import struct
+import sys
+
+from collections.abc import MutableMapping
+
+from knack.log import get_logger
+
+
+logger = get_logger(__name__)
+
+INDEX_MAGIC = b'AZSHIDX1'
+INDEX_SUFFIX = '.idx'
+_LENGTH = struct.Struct('<Q')
+
+# flags kept per command so that lookups don't need to decode its help
+HAS_EXAMPLES = 1
+HAS_PARAMETERS = 2
+
+
+def get_index_path(command_file_path):
+    """ the index is kept next to the dumped command table """
+    return command_file_path + INDEX_SUFFIX
+
+
+def get_index_key(command_file_path):
+    """ the index is valid for one dump of the command table with one installation of the CLI """
+    from azure.cli.core import __version__ as core_version
+    from azure.cli.core import extension
+
+    parts = [sys.version, core_version]
+    for extension_dir in (extension.EXTENSIONS_DIR, getattr(extension, 'SYSTEM_EXTENSIONS_DIR', None)):
+        if extension_dir and os.path.isdir(extension_dir):
+            with os.scandir(extension_dir) as entries:
+                parts.extend(sorted('{}:{}'.format(entry.name, entry.stat().st_mtime_ns) for entry in entries))
+    stat = os.stat(command_file_path)
+    parts.append('{}:{}'.format(stat.st_size, stat.st_mtime_ns))
+    return '\n'.join(parts).encode('utf-8')
+
+
+def visible_parameters(record):
+    """ the parameters of a command that are not suppressed """
+    for param in record.get('parameters', {}).values():
+        if '==SUPPRESS==' not in param['help']:
+            yield param
+
+
+def summarize_command_table(data):
+    """ the parts of the command table needed upfront: the tree of command words, the
+    completable words and parameters, and the flags of each command """
+    tree = {}
+    completable = {}
+    completable_param = {}
+    flags = {}
+    for command, record in data.items():
+        branch = tree
+        for word in command.split():
+            completable[word] = None
+            branch = branch.setdefault(word, {})
+
+        command_flags = HAS_EXAMPLES if 'examples' in record else 0
+        for param in visible_parameters(record):
+            command_flags |= HAS_PARAMETERS
+            for name in param['name']:
+                completable_param[name] = None
+        flags[command] = command_flags
+    return tree, list(completable), list(completable_param), flags
+
+
+def write_command_index(data, index_path, key):
+    """ writes the index of a loaded command table
+
+    The file is the key, the marshalled summary of the table with the offset of each command's
+    record, then the records as json. Loading it only unmarshals the summary, the records are
+    decoded when a command's help is displayed.
+    """
+    tree, completable, completable_param, flags = summarize_command_table(data)
+    blob = bytearray()
+    commands = {}
+    for command, record in data.items():
+        encoded = json.dumps(record).encode('utf-8')
+        commands[command] = (len(blob), len(encoded), flags[command])
+        blob += encoded
+    summary = marshal.dumps({
+        'tree': tree,
+        'commands': commands,
+        'completable': completable,
+        'completable_param': completable_param
+    })
+
+    temp_path = '{}.{}.tmp'.format(index_path, os.getpid())
+    with open(temp_path, 'wb') as index_file:
+        index_file.write(INDEX_MAGIC)
+        index_file.write(_LENGTH.pack(len(key)))
+        index_file.write(key)
+        index_file.write(_LENGTH.pack(len(summary)))
+        index_file.write(summary)
+        index_file.write(blob)
+    os.replace(temp_path, index_path)
+
+
+class CommandIndex(object):
+    """ the loaded index of the dumped command table """
+
+    def __init__(self, summary, blob):
+        self.tree = summary['tree']
+        self.commands = summary['commands']
+        self.completable = summary['completable']
+        self.completable_param = summary['completable_param']
+        self._blob = blob
+
+    @classmethod
+    def load(cls, index_path, key):
+        """ returns the index, or None if it is missing or was built for another command table """
+        try:
+            with open(index_path, 'rb') as index_file:
+                content = index_file.read()
+        except (IOError, OSError):
+            return None
+
+        try:
+            position = len(INDEX_MAGIC)
+            if content[:position] != INDEX_MAGIC:
+                return None
+            key_length, = _LENGTH.unpack_from(content, position)
+            position += _LENGTH.size
+            if content[position:position + key_length] != key:
+                logger.debug('Command table index is out of date')
+                return None
+            position += key_length
+            summary_length, = _LENGTH.unpack_from(content, position)
+            position += _LENGTH.size
+            summary = marshal.loads(content[position:position + summary_length])
+            return cls(summary, memoryview(content)[position + summary_length:])
+        except (struct.error, ValueError, EOFError, TypeError, KeyError):
+            logger.debug('Command table index is corrupted')
+            return None
+
+    def flags(self, command):
+        return self.commands[command][2]
+
+    def get_record(self, command):
+        offset, length, _ = self.commands[command]
+        return json.loads(bytes(self._blob[offset:offset + length]).decode('utf-8'))
+
+
+class LazyMapping(MutableMapping):
+    """ a dict whose values are only computed the first time they are read """
+
+    def __init__(self, keys, compute):
+        # keys only needs to support 'in' and iteration
+        self._keys = keys
+        self._compute = compute
+        self._values = {}
+        self._deleted = set()
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        if key in self._deleted or key not in self._keys:
+            raise KeyError(key)
+        value = self._values[key] = self._compute(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._deleted.discard(key)
+        self._values[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._values.pop(key, None)
+        self._deleted.add(key)
+
+    def __contains__(self, key):
+        if key in self._values:
+            return True
+        return key not in self._deleted and key in self._keys
+
+    def __iter__(self):
+        for key in self._keys:
+            if key not in self._deleted:
+                yield key
+        for key in list(self._values):
+            if key not in self._keys:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
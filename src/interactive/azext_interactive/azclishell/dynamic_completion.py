@@ -0,0 +1,128 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError  # pylint: disable=redefined-builtin
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# seconds the values of a dynamic completer are reused
+DYNAMIC_COMPLETION_TTL = 60
+# seconds the user has to stop typing before a dynamic completer is called
+DYNAMIC_COMPLETION_DEBOUNCE = .15
+# seconds a completion waits for a dynamic completer before showing the other completions
+DYNAMIC_COMPLETION_WAIT = .3
+MAX_COMPLETER_WORKERS = 2
+
+
+def call_completer(completer, prefix, parsed_args):
+    """ calls a completer in any of the 3 formats the cli uses """
+    try:
+        completions = completer(prefix=prefix, action=None, parsed_args=parsed_args)
+    except TypeError:
+        try:
+            completions = completer(prefix=prefix)
+        except TypeError:
+            try:
+                completions = completer()
+            except TypeError:
+                completions = []  # other completion method used
+    return list(completions or [])
+
+
+class DynamicCompletionCache(object):
+    """ runs the completers of dynamic parameters in the background and keeps their values
+
+    The values are kept per key for a while, and reused as long as the word being completed
+    starts with the prefix they were generated for. A completer is only called once the user
+    stops typing, and calls which are still queued when the user moves on are cancelled.
+    """
+
+    def __init__(self, on_update=None, ttl=DYNAMIC_COMPLETION_TTL, debounce=DYNAMIC_COMPLETION_DEBOUNCE,
+                 wait=DYNAMIC_COMPLETION_WAIT, max_workers=MAX_COMPLETER_WORKERS):
+        self.on_update = on_update
+        self.ttl = ttl
+        self.debounce = debounce
+        self.wait = wait
+        self.max_workers = max_workers
+        # key to (time, prefix, values)
+        self._entries = {}
+        # key to (prefix, future) of the completers being called
+        self._pending = {}
+        self._latest_key = None
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _is_fresh(self, entry, prefix, now):
+        return entry is not None and now - entry[0] < self.ttl and prefix.startswith(entry[1])
+
+    def get(self, key, prefix, completer):
+        """ the values of the completer for the prefix, or None if they are not ready in time
+
+        :param completer: a function of the prefix, called in the background
+        """
+        with self._lock:
+            self._latest_key = key
+            if self._is_fresh(self._entries.get(key), prefix, time.monotonic()):
+                return self._entries[key][2]
+
+            pending = self._pending.get(key)
+            if pending is None or not prefix.startswith(pending[0]):
+                if pending is not None:
+                    pending[1].cancel()
+                pending = (prefix, self._get_executor().submit(self._run, key, prefix, completer))
+                self._pending[key] = pending
+            # the user moved on, so drop the calls which have not started yet
+            for other_key, (other_prefix, other_future) in list(self._pending.items()):
+                if (other_key, other_prefix) != (key, pending[0]) and other_future.cancel():
+                    del self._pending[other_key]
+
+        future = pending[1]
+        try:
+            return future.result(timeout=self.wait)
+        except TimeoutError:
+            if self.on_update:
+                future.add_done_callback(lambda done: self._notify(key, done))
+        except CancelledError:
+            pass
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.debug('Dynamic completion failed: %s', ex)
+        return None
+
+    def _run(self, key, prefix, completer):
+        time.sleep(self.debounce)
+        with self._lock:
+            if self._latest_key != key or self._pending.get(key, (None,))[0] != prefix:
+                self._remove_pending(key, prefix)
+                raise CancelledError()
+        try:
+            values = completer(prefix)
+        finally:
+            with self._lock:
+                self._remove_pending(key, prefix)
+
+        now = time.monotonic()
+        with self._lock:
+            self._entries = {entry_key: entry for entry_key, entry in self._entries.items()
+                             if now - entry[0] < self.ttl}
+            self._entries[key] = (now, prefix, values)
+        return values
+
+    def _remove_pending(self, key, prefix):
+        if self._pending.get(key, (None,))[0] == prefix:
+            del self._pending[key]
+
+    def _notify(self, key, future):
+        if future.cancelled() or future.exception() is not None or self._latest_key != key:
+            return
+        self.on_update()
@@ -6,8 +6,11 @@
 import math
 import os
 import json
+from functools import lru_cache
 from knack.log import get_logger
 
+from .command_index import (CommandIndex, LazyMapping, get_index_key, get_index_path,
+                            summarize_command_table, visible_parameters, HAS_EXAMPLES, HAS_PARAMETERS)
 from .command_tree import CommandBranch, CommandHead
 from .util import get_window_dim
 
@@ -114,60 +117,84 @@ class GatherCommands(object):
         """ gathers from the files in a way that is convienent to use """
         command_file = config.get_help_files()
         cache_path = os.path.join(config.get_config_dir(), 'cache')
-        cols = _get_window_columns()
+        command_file_path = os.path.join(cache_path, command_file)
+        line_min = int(_get_window_columns()) - 2 * TOLERANCE
+
+        # the index written with the last dump avoids parsing the whole dump
+        index = CommandIndex.load(get_index_path(command_file_path), get_index_key(command_file_path))
+        if index is not None:
+            tree, completable, completable_param = index.tree, index.completable, index.completable_param
+            commands, flags = index.commands, index.flags
+            get_record = lru_cache(maxsize=64)(index.get_record)
+        else:
+            with open(command_file_path, 'r') as help_file:
+                data = json.load(help_file)
+            tree, completable, completable_param, command_flags = summarize_command_table(data)
+            commands, flags, get_record = data, command_flags.get, data.__getitem__
+
+        # descriptions, examples and parameter help are formatted when they are displayed
+        self.descrip = LazyMapping(commands, lambda command: add_new_lines(
+            get_record(command)['help'], line_min=line_min))
+        self.command_example = LazyMapping(
+            {command for command in commands if flags(command) & HAS_EXAMPLES},
+            lambda command: [[add_new_lines(example[0], line_min=line_min),
+                              add_new_lines(example[1], line_min=line_min)]
+                             for example in get_record(command)['examples']])
+
+        def _get_param_info(command):
+            param_doubles = {}
+            for param in visible_parameters(get_record(command)):
+                param_aliases = set(param['name'])
+                for alias in param_aliases:
+                    param_doubles[alias] = param_aliases
+            return param_doubles
+
+        def _get_param_description(command_param):
+            command, _, par = command_param.rpartition(' ')
+            for param in visible_parameters(get_record(command)):
+                if par in param['name']:
+                    return add_new_lines(param['required'] + " " + param['help'], line_min=line_min)
+            raise KeyError(command_param)
+
+        self.command_param_info = LazyMapping(
+            {command for command in commands if flags(command) & HAS_PARAMETERS}, _get_param_info)
+        self.param_descript = LazyMapping(_ParamKeys(self.command_param_info), _get_param_description)
 
-        with open(os.path.join(cache_path, command_file), 'r') as help_file:
-            data = json.load(help_file)
         self.add_exit()
-        commands = data.keys()
-
-        for command in commands:
-            branch = self.command_tree
-            for word in command.split():
-                if word not in self.completable:
-                    self.completable.append(word)
-                if not branch.has_child(word):
-                    branch.add_child(CommandBranch(word))
-                branch = branch.get_child(word)
-
-            description = data[command]['help']
-            self.descrip[command] = add_new_lines(description, line_min=int(cols) - 2 * TOLERANCE)
-
-            if 'examples' in data[command]:
-                examples = []
-                for example in data[command]['examples']:
-                    examples.append([
-                        add_new_lines(example[0], line_min=int(cols) - 2 * TOLERANCE),
-                        add_new_lines(example[1], line_min=int(cols) - 2 * TOLERANCE)])
-                self.command_example[command] = examples
-
-            command_params = data[command].get('parameters', {})
-            for param in command_params:
-                if '==SUPPRESS==' not in command_params[param]['help']:
-                    param_aliases = set()
-
-                    for par in command_params[param]['name']:
-                        param_aliases.add(par)
-
-                        self.param_descript[command + " " + par] = \
-                            add_new_lines(
-                                command_params[param]['required'] +
-                                " " + command_params[param]['help'],
-                                line_min=int(cols) - 2 * TOLERANCE)
-                        if par not in self.completable_param:
-                            self.completable_param.append(par)
-
-                    param_doubles = self.command_param_info.get(command, {})
-                    for alias in param_aliases:
-                        param_doubles[alias] = param_aliases
-                    self.command_param_info[command] = param_doubles
+        known_words = set(self.completable)
+        self.completable.extend(word for word in completable if word not in known_words)
+        self.completable_param = completable_param
+        _add_branches(self.command_tree, tree)
 
     def get_all_subcommands(self):
         """ returns all the subcommands """
-        subcommands = []
+        subcommands = {}
         for command in self.descrip:
             for word in command.split():
-                for kid in self.command_tree.children:
-                    if word != kid and word not in subcommands:
-                        subcommands.append(word)
-        return subcommands
+                if word not in subcommands and any(word != kid for kid in self.command_tree.children):
+                    subcommands[word] = None
+        return list(subcommands)
+
+
+class _ParamKeys(object):  # pylint: disable=too-few-public-methods
+    """ the keys of the parameter descriptions, which are a command and one of its parameters """
+
+    def __init__(self, command_param_info):
+        self.command_param_info = command_param_info
+
+    def __contains__(self, command_param):
+        command, _, par = command_param.rpartition(' ')
+        return command in self.command_param_info and par in self.command_param_info[command]
+
+    def __iter__(self):
+        for command in self.command_param_info:
+            for par in self.command_param_info[command]:
+                yield command + " " + par
+
+
+def _add_branches(branch, tree):
+    """ adds the words of a tree of dictionaries to the command tree """
+    for word, sub_tree in tree.items():
+        if not branch.has_child(word):
+            branch.add_child(CommandBranch(word))
+        _add_branches(branch.get_child(word), sub_tree)
@@ -0,0 +1,125 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from azext_interactive.azclishell.command_index import (
+    CommandIndex, get_index_key, get_index_path, write_command_index)
+from azext_interactive.azclishell.gather_commands import GatherCommands, add_new_lines, TOLERANCE
+
+
+TEST_DIR = os.path.abspath(os.path.join(os.path.abspath(__file__), '..'))
+COLUMNS = 120
+
+
+def _materialize(commands):
+    return {
+        'descrip': dict(commands.descrip),
+        'command_example': dict(commands.command_example),
+        'command_param_info': dict(commands.command_param_info),
+        'param_descript': dict(commands.param_descript),
+        'completable': commands.completable,
+        'completable_param': commands.completable_param,
+        'subcommands': sorted(commands.get_all_subcommands()),
+    }
+
+
+def _full_command_table(groups=10, commands_per_group=10, params_per_command=5):
+    """ a command table with groups, commands, parameters and examples """
+    data = {}
+    for group in range(groups):
+        group_name = 'group{} sub{}'.format(group, group % 7)
+        data[group_name] = {'help': 'Manage the resources of group {}.'.format(group)}
+        for index in range(commands_per_group):
+            parameters = {}
+            for param in range(params_per_command):
+                name = '--parameter-{}'.format(param)
+                parameters[name] = {'name': [name, '-p{}'.format(param)],
+                                    'required': '[REQUIRED]' if param < 2 else '',
+                                    'help': 'The value of parameter {} of the command. '.format(param) * 3}
+            data['{} command{}'.format(group_name, index)] = {
+                'help': 'Run command {} of group {}, with a long description. '.format(index, group) * 2,
+                'parameters': parameters,
+                'examples': [['Example {}'.format(example),
+                              'az {} command{} --parameter-0 value'.format(group_name, index)]
+                             for example in range(3)]
+            }
+    return data
+
+
+class CommandIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.config_dir)
+        os.makedirs(os.path.join(self.config_dir, 'cache'))
+        self.command_file_path = os.path.join(self.config_dir, 'cache', 'help_dump.json')
+        self.config = mock.MagicMock()
+        self.config.get_help_files.return_value = 'help_dump.json'
+        self.config.get_config_dir.return_value = self.config_dir
+        patcher = mock.patch('azext_interactive.azclishell.gather_commands._get_window_columns', return_value=COLUMNS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _dump(self, data, with_index=True):
+        with open(self.command_file_path, 'w') as help_file:
+            json.dump(data, help_file)
+        if with_index:
+            write_command_index(data, get_index_path(self.command_file_path), get_index_key(self.command_file_path))
+
+    def test_index_matches_the_dump(self):
+        with open(os.path.join(TEST_DIR, 'cache', 'help_dump_test.json')) as help_file:
+            data = json.load(help_file)
+        self._dump(data, with_index=False)
+        from_dump = GatherCommands(self.config)
+        self._dump(data)
+        from_index = GatherCommands(self.config)
+
+        self.assertEqual(_materialize(from_dump), _materialize(from_index))
+        self.assertTrue(from_index.command_tree.in_tree(['storage', 'account', 'create']))
+        self.assertFalse(from_index.command_tree.in_tree(['vm', 'blah']))
+        self.assertEqual(from_index.param_descript['vm create --name'],
+                         add_new_lines('[REQUIRED] Name of the virtual machine.', line_min=COLUMNS - 2 * TOLERANCE))
+        self.assertNotIn('vm create --cmd', from_index.param_descript)
+        self.assertEqual(from_index.command_param_info['vm create']['-n'], {'--name', '-n'})
+        self.assertEqual(from_index.descrip['quit'], 'Exits the program')
+
+    def test_stale_index_is_ignored(self):
+        self._dump({'vm create': {'help': 'Create a VM.', 'parameters': {}, 'examples': ''}})
+        index_path = get_index_path(self.command_file_path)
+        self.assertIsNotNone(CommandIndex.load(index_path, get_index_key(self.command_file_path)))
+
+        self._dump({'vm delete': {'help': 'Delete a VM.', 'parameters': {}, 'examples': ''}}, with_index=False)
+        self.assertIsNone(CommandIndex.load(index_path, get_index_key(self.command_file_path)))
+        commands = GatherCommands(self.config)
+        self.assertIn('vm delete', commands.descrip)
+        self.assertNotIn('vm create', commands.descrip)
+
+    def test_index_defers_the_command_records(self):
+        data = _full_command_table()
+        self._dump(data)
+        with mock.patch('azext_interactive.azclishell.gather_commands.json.load') as json_load, \
+                mock.patch.object(CommandIndex, 'get_record', autospec=True,
+                                  side_effect=CommandIndex.get_record) as get_record:
+            commands = GatherCommands(self.config)
+            # nothing is read from the dump, and no record is decoded until it is displayed
+            json_load.assert_not_called()
+            get_record.assert_not_called()
+            self.assertTrue(commands.command_tree.in_tree(['group3', 'sub3', 'command7']))
+
+            description = commands.descrip['group3 sub3 command7']
+            self.assertEqual(description, commands.descrip['group3 sub3 command7'])
+            self.assertEqual(1, get_record.call_count)
+            # the parameters are read from the record already decoded for the description
+            self.assertEqual({'--parameter-1', '-p1'}, commands.command_param_info['group3 sub3 command7']['-p1'])
+            self.assertEqual(1, get_record.call_count)
+
+if __name__ == '__main__':
+    unittest.main()
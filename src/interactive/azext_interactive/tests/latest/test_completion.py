@@ -3,6 +3,7 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import argparse
 import os
 import unittest
 from unittest import mock
@@ -142,6 +143,21 @@ class CompletionTest(unittest.TestCase):
         self.assertEqual(completion.text, '-g')
         self.assertIn('Name of resource group', completion._display_meta)
 
+    def test_dynamic_completion(self):
+        completer = mock.Mock(return_value=['rg1', 'rg2', 'other rg'])
+        argument = mock.Mock(options_list=['--resource-group', '-g'], completer=completer, choices=None)
+        self.completer.cmdtab = {'storage account create': mock.Mock(arguments={'resource_group_name': argument})}
+        self.completer.dynamic_completions.debounce = 0
+        with mock.patch.object(self.completer, 'get_subscription', return_value='sub'), \
+                mock.patch.object(self.completer, 'mute_parse_args', return_value=argparse.Namespace()):
+            doc = Document(u'storage account create -g ')
+            self.verify_completions(self.completer.get_completions(doc, None), set(['rg1', 'rg2', '"other rg"']), 0)
+
+            # the values of the completer are reused while typing
+            doc = Document(u'storage account create -g rg')
+            self.verify_completions(self.completer.get_completions(doc, None), set(['rg1', 'rg2']), -2)
+        completer.assert_called_once_with(prefix='', action=None, parsed_args=argparse.Namespace())
+
 
 if __name__ == '__main__':
     unittest.main()
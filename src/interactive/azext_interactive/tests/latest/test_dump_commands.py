@@ -0,0 +1,215 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from knack.help import REQUIRED_TAG
+
+from azext_interactive.azclishell import _dump_commands
+from azext_interactive.azclishell._dump_commands import (CommandShards, FreshTable, get_command_package,
+                                                         get_package_key)
+from azext_interactive.azclishell.command_index import CommandIndex, get_index_key, get_index_path
+
+
+class _ArgType(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, **settings):
+        self.settings = settings
+
+
+class _Argument(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, options_list, **settings):
+        self.options_list = options_list
+        self.type = _ArgType(**settings)
+
+
+class _Command(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, description, command_source, arguments=None):
+        self.description = description
+        self.command_source = command_source
+        self.arguments = arguments or {}
+
+
+class _ExtensionCommandSource(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, extension_name):
+        self.extension_name = extension_name
+
+
+HELPS = {
+    'vm': """
+type: group
+short-summary: Manage virtual machines.
+""",
+    'vm create': """
+type: command
+short-summary: Create a virtual machine.
+parameters:
+  - name: --name -n
+    short-summary: Name of the virtual machine.
+examples:
+  - name: Create a VM.
+    text: az vm create -n MyVm
+""",
+    'vm repair': """
+type: group
+short-summary: Repair virtual machines.
+""",
+    'storage': """
+type: group
+short-summary: Manage storage.
+"""
+}
+
+
+def _command_table():
+    return {
+        'vm create': _Command('Create a VM.', 'vm',
+                              {'name': _Argument(['--name', '-n'], required=True, help='The name.'),
+                               'size': _Argument(['--size'], help='The size.')}),
+        'vm list': _Command('List VMs.', 'vm'),
+        'storage account list': _Command('List accounts.', 'storage'),
+        'vm repair create': _Command('Create a repair VM.', _ExtensionCommandSource('vm-repair')),
+    }
+
+
+class CommandShardsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.shard_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.shard_dir)
+        self.keys = {'module-vm': '1', 'module-storage': '1', 'extension-vm-repair': '1'}
+        for patcher in [mock.patch.object(_dump_commands, 'helps', HELPS),
+                        mock.patch.object(_dump_commands, 'get_package_key', lambda package, _: self.keys[package])]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _dump(self, cmd_table=None):
+        shards = CommandShards(self.shard_dir, cmd_table or _command_table(), max_workers=2)
+        with mock.patch.object(_dump_commands, 'dump_commands', wraps=_dump_commands.dump_commands) as dump_commands:
+            data = shards.dump()
+        shards.write_manifest()
+        return data, sorted(sorted(call[0][0]) for call in dump_commands.call_args_list)
+
+    def test_get_command_package(self):
+        cmd_table = _command_table()
+        self.assertEqual(get_command_package(cmd_table['vm create']), 'module-vm')
+        self.assertEqual(get_command_package(cmd_table['vm repair create']), 'extension-vm-repair')
+        self.assertEqual(get_command_package(_Command('', None)), 'core')
+
+    def test_dump(self):
+        data, dumped = self._dump()
+        self.assertEqual(dumped, [['storage account list'], ['vm create', 'vm list'], ['vm repair create']])
+        self.assertEqual(data['vm create'], {
+            'help': 'Create a virtual machine.',
+            'parameters': {
+                '--name': {'name': ['--name', '-n'], 'required': REQUIRED_TAG, 'help': 'Name of the virtual machine.'},
+                '--size': {'name': ['--size'], 'required': '', 'help': 'The size.'}
+            },
+            'examples': [['Create a VM.', 'az vm create -n MyVm']]
+        })
+        self.assertEqual(data['vm list']['help'], 'List VMs.')
+        self.assertEqual(data['vm'], {'help': 'Manage virtual machines.'})
+        self.assertEqual(data['vm repair'], {'help': 'Repair virtual machines.'})
+        self.assertEqual(data['storage'], {'help': 'Manage storage.'})
+
+    def test_only_stale_shards_are_dumped(self):
+        data, _ = self._dump()
+        self.assertTrue(CommandShards(self.shard_dir, _command_table()).is_current())
+
+        self.keys['extension-vm-repair'] = '2'
+        shards = CommandShards(self.shard_dir, _command_table())
+        self.assertFalse(shards.is_current())
+        data_after_update, dumped = self._dump()
+        self.assertEqual(dumped, [['vm repair create']])
+        self.assertEqual(data_after_update, data)
+
+    def test_shards_of_removed_packages_are_deleted(self):
+        self._dump()
+        cmd_table = _command_table()
+        del cmd_table['vm repair create']
+        data, dumped = self._dump(cmd_table)
+        self.assertEqual(dumped, [])
+        self.assertNotIn('vm repair create', data)
+        self.assertNotIn('vm repair', data)
+        self.assertEqual(sorted(os.listdir(self.shard_dir)), ['manifest.json', 'module-storage.json', 'module-vm.json'])
+
+
+class PackageKeyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.package_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.package_root)
+        self.package_dir = os.path.join(self.package_root, 'azext_shardtest')
+        os.makedirs(self.package_dir)
+        self._write('__init__.py', 'class Loader(object):\n    pass\n')
+        sys.path.insert(0, self.package_root)
+        self.addCleanup(sys.path.remove, self.package_root)
+        self.addCleanup(sys.modules.pop, 'azext_shardtest', None)
+        module = importlib.import_module('azext_shardtest')
+        self.command = _Command('', _ExtensionCommandSource('shardtest'))
+        self.command.loader = module.Loader()
+
+    def _write(self, name, content):
+        with open(os.path.join(self.package_dir, name), 'w') as package_file:
+            package_file.write(content)
+
+    def test_package_key_changes_with_the_loader_module(self):
+        commands = {'shardtest create': self.command}
+        key = get_package_key('extension-shardtest', commands)
+        with mock.patch('os.walk') as walk:
+            self.assertEqual(key, get_package_key('extension-shardtest', commands))
+        walk.assert_not_called()
+
+        # installing another version of the package rewrites its loader module
+        self._write('__init__.py', 'class Loader(object):\n    version = 2\n')
+        self.assertNotEqual(key, get_package_key('extension-shardtest', commands))
+
+
+class FreshTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.command_file_path = os.path.join(self.cache_dir, 'help_dump.json')
+        with open(self.command_file_path, 'w') as help_file:
+            json.dump({'vm list': {'help': 'List VMs.', 'parameters': {}, 'examples': []}}, help_file)
+        self.shards = mock.Mock()
+        self.shards.is_current.return_value = True
+        self.shell_ctx = mock.MagicMock()
+        self.shell_ctx.config.get_help_files.return_value = 'help_dump.json'
+        for patcher in [mock.patch.object(_dump_commands, 'AzInteractiveCommandsLoader'),
+                        mock.patch.object(_dump_commands, 'CommandShards', return_value=self.shards),
+                        mock.patch.object(_dump_commands, 'get_cache_dir', return_value=self.cache_dir),
+                        mock.patch('azure.cli.core.commands.arm.register_global_subscription_argument'),
+                        mock.patch('azure.cli.core.commands.arm.register_ids_argument')]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _load_index(self):
+        return CommandIndex.load(get_index_path(self.command_file_path), get_index_key(self.command_file_path))
+
+    def test_missing_or_stale_index_is_rebuilt_from_the_current_dump(self):
+        FreshTable(self.shell_ctx).dump_command_table()
+        self.assertEqual(['vm list'], list(self._load_index().commands))
+
+        with open(get_index_path(self.command_file_path), 'wb') as index_file:
+            index_file.write(b'corrupted')
+        FreshTable(self.shell_ctx).dump_command_table()
+        self.assertIsNotNone(self._load_index())
+
+        with mock.patch.object(_dump_commands, 'write_command_index') as write_command_index:
+            FreshTable(self.shell_ctx).dump_command_table()
+        write_command_index.assert_not_called()
+        self.shards.dump.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
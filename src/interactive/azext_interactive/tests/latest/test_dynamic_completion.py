@@ -0,0 +1,91 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from azext_interactive.azclishell.dynamic_completion import DynamicCompletionCache, call_completer
+
+
+class _Completer(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, values, delay=0):
+        self.values = values
+        self.delay = delay
+        self.prefixes = []
+
+    def __call__(self, prefix):
+        self.prefixes.append(prefix)
+        time.sleep(self.delay)
+        return [value for value in self.values if value.startswith(prefix)]
+
+
+class DynamicCompletionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.updated = threading.Event()
+        self.cache = DynamicCompletionCache(on_update=self.updated.set, debounce=0, wait=1)
+        self.key = ('vm show', 'resource_group_name', 'sub', ())
+
+    def test_values_are_cached_per_key(self):
+        completer = _Completer(['rg1', 'rg2', 'other'])
+        self.assertEqual(['rg1', 'rg2', 'other'], self.cache.get(self.key, '', completer))
+        self.assertEqual(['rg1', 'rg2', 'other'], self.cache.get(self.key, 'r', completer))
+        self.assertEqual([''], completer.prefixes)
+
+        other_key = ('vm show', 'resource_group_name', 'other-sub', ())
+        self.assertEqual(['rg1', 'rg2'], self.cache.get(other_key, 'rg', completer))
+        # the values for a prefix don't complete a word which doesn't start with it
+        self.assertEqual(['other'], self.cache.get(other_key, 'o', completer))
+        self.assertEqual(['', 'rg', 'o'], completer.prefixes)
+        self.assertFalse(self.updated.is_set())
+
+    def test_values_expire(self):
+        completer = _Completer(['rg1'])
+        self.cache.ttl = 10
+        self.cache.get(self.key, '', completer)
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 11):
+            self.cache.get(self.key, '', completer)
+        self.assertEqual(['', ''], completer.prefixes)
+
+    def test_slow_completer_does_not_block(self):
+        completer = _Completer(['rg{}'.format(i) for i in range(2000)], delay=.5)
+        self.cache.wait = .05
+        start = time.monotonic()
+        self.assertIsNone(self.cache.get(self.key, '', completer))
+        self.assertLess(time.monotonic() - start, .4)
+
+        # the completions are refreshed once the values are ready
+        self.assertTrue(self.updated.wait(5))
+        self.assertEqual(2000, len(self.cache.get(self.key, 'r', completer)))
+        self.assertEqual([''], completer.prefixes)
+
+    def test_superseded_completer_is_not_called(self):
+        completer = _Completer(['rg1'])
+        self.cache.debounce = .2
+        self.cache.wait = 0
+        self.assertIsNone(self.cache.get(self.key, '', completer))
+        # the user moves on to another parameter before the first one is completed
+        other_key = ('vm show', 'name', 'sub', ())
+        self.assertIsNone(self.cache.get(other_key, '', _Completer(['vm1'])))
+        time.sleep(.5)
+        self.assertEqual([], completer.prefixes)
+        self.assertTrue(self.updated.is_set())
+
+    def test_failed_completer_is_not_cached(self):
+        completer = mock.Mock(side_effect=[ValueError('not logged in'), ['rg1']])
+        self.assertIsNone(self.cache.get(self.key, '', completer))
+        self.assertEqual(['rg1'], self.cache.get(self.key, '', completer))
+
+    def test_call_completer(self):
+        self.assertEqual(['a'], call_completer(lambda prefix, action, parsed_args: [prefix], 'a', None))
+        self.assertEqual(['b'], call_completer(lambda prefix: [prefix], 'b', None))
+        self.assertEqual(['c'], call_completer(lambda: iter(['c']), 'd', None))
+        self.assertEqual([], call_completer(lambda unknown: [unknown], 'e', None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -41,6 +41,19 @@ helps['graph query'] = """
         - name: --allow-partial-scopes -a
           type: bool
           short-summary: Indicates if query should succeed when only partial number of subscription underneath can be processed by server.
+        - name: --stream
+          type: bool
+          short-summary: Query all the subscriptions or management groups in concurrent batches, follow the skip tokens and write the rows as JSON lines as they arrive.
+          long-summary: Subscriptions are queried in batches of 1000 and management groups in batches of 10. A resource returned by several batches is written once.
+        - name: --cache-ttl
+          type: int
+          short-summary: Return the result of the same query cached in the last N seconds, and cache the result otherwise.
+          long-summary: >
+            Results are cached under the Azure CLI configuration directory, and the least recently used ones are removed
+            when the cache grows over 100 MB. Default value is the `cache_ttl` option of the `graph` section of the configuration, or 0 to not cache.
+        - name: --no-cache
+          type: bool
+          short-summary: Run the query without looking up or caching its result.
     examples:
         - name: Query resources requesting a subset of resource fields.
           text: >
@@ -60,6 +73,12 @@ helps['graph query'] = """
         - name: Query with the skip token.
           text: >
             az graph query -q "where type =~ "Microsoft.Compute" | project name, tags" --skip-token skip_token_value_from_previous_query_response
+        - name: Write all the resources of all the accessible subscriptions as JSON lines.
+          text: >
+            az graph query -q "project id, name, type, location" --stream > resources.jsonl
+        - name: Return the result of the same query run in the last minute.
+          text: >
+            az graph query -q "summarize count() by type" --cache-ttl 60
 """
 
 
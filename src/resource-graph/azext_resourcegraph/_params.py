@@ -42,6 +42,12 @@ def load_arguments(self, _):
         c.argument('allow_partial_scopes', options_list=['--allow-partial-scopes', '-a'],
                    arg_type=get_three_state_flag(), required=False, default=False,
                    help='Indicates if query should succeed when only partial number of subscription underneath can be processed by server.')
+        c.argument('stream', options_list=['--stream'], arg_type=get_three_state_flag(), required=False, default=False,
+                   help='Query all the subscriptions or management groups in concurrent batches, follow the skip tokens and write the rows as JSON lines as they arrive.')
+        c.argument('cache_ttl', options_list=['--cache-ttl'], type=int, required=False, default=None,
+                   help='Return the result of the same query cached in the last N seconds, and cache the result otherwise. Default value is the `cache_ttl` option of the `graph` section of the configuration, or 0 to not cache.')
+        c.argument('no_cache', options_list=['--no-cache'], arg_type=get_three_state_flag(), required=False, default=False,
+                   help='Run the query without looking up or caching its result.')
 
     with self.argument_context('graph shared-query') as c:
         c.argument('graph_query', options_list=['--graph-query', '--q', '-q'],
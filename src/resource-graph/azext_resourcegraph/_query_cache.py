@@ -0,0 +1,113 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import re
+import time
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# bump when the format of the cached results changes
+QUERY_CACHE_FORMAT = 1
+QUERY_CACHE_DIR_NAME = 'resourcegraph_cache'
+QUERY_CACHE_MAX_SIZE = 100 * 1024 * 1024
+
+_QUOTED = re.compile(r'''('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")''')
+
+
+def normalize_query(graph_query):
+    # type: (str) -> str
+    """ collapses the white space of a query outside of its string literals """
+    parts = _QUOTED.split(graph_query.strip())
+    # the odd parts are the string literals
+    return ''.join(part if i % 2 else re.sub(r'\s+', ' ', part) for i, part in enumerate(parts))
+
+
+def get_query_cache_key(graph_query, subscriptions, management_groups, first, skip, skip_token,
+                        allow_partial_scopes, scope_key=None):
+    """
+    The key of the result of a query. When no scope is passed, the scope is the subscriptions of the profile,
+    which scope_key stands for so that the profile isn't loaded to look up a result.
+    """
+    parts = [QUERY_CACHE_FORMAT, normalize_query(graph_query),
+             sorted(sub.lower() for sub in subscriptions) if subscriptions is not None else None,
+             sorted(mg.lower() for mg in management_groups) if management_groups is not None else None,
+             first, skip, skip_token, bool(allow_partial_scopes), scope_key]
+    return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+
+def get_file_key(path):
+    """ changes when the file changes, e.g. when the profile is updated by a login """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [path, stat.st_size, stat.st_mtime_ns]
+
+
+class QueryCache(object):
+    """
+    Results of queries kept as one file each. The oldest used results are removed when the cache grows over
+    its size, and a result older than the TTL of a lookup is not returned.
+    """
+
+    def __init__(self, cache_dir, max_size=QUERY_CACHE_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def _get_path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def get(self, key, ttl):
+        """ the cached result, or None if there is none of at most ttl seconds """
+        path = self._get_path(key)
+        try:
+            with open(path, 'r') as cache_file:
+                entry = json.load(cache_file)
+            if time.time() - entry['time'] > ttl:
+                return None
+            # the modification time orders the results by use
+            os.utime(path)
+            return entry['result']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def set(self, key, result):
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            path = self._get_path(key)
+            temp_path = '{}.{}.tmp'.format(path, os.getpid())
+            with open(temp_path, 'w') as cache_file:
+                json.dump({'time': time.time(), 'result': result}, cache_file)
+            os.replace(temp_path, path)
+            self.evict()
+        except (OSError, TypeError, ValueError) as ex:
+            logger.debug("Failed to cache the result of the query: %s", ex)
+
+    def evict(self):
+        """ removes the least recently used results until the cache fits its size """
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(entry[1] for entry in entries)
+        for _, file_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= file_size
@@ -23,6 +23,15 @@ def validate_query_args(namespace):
         recommendation = 'Try to pass --subscriptions param only or --management-groups param only.'
         raise InvalidArgumentValueError(error_msg, recommendation)
 
+    if namespace.stream and (namespace.first is not None or namespace.skip is not None or
+                             namespace.skip_token is not None):
+        error_msg = '--stream returns all the rows of the query, so it cannot be passed with --first, --skip or --skip-token.'
+        recommendation = 'Try to pass --stream only, or page through the results with --first and --skip-token.'
+        raise InvalidArgumentValueError(error_msg, recommendation)
+
+    if namespace.cache_ttl is not None and namespace.cache_ttl < 0:
+        raise InvalidArgumentValueError("Value of --cache-ttl cannot be negative.")
+
     if namespace.first is not None:
         namespace.first = min(namespace.first, __ROWS_PER_PAGE)
     elif namespace.skip_token is None:
@@ -16,7 +16,8 @@ def load_command_table(self, _):
     )
 
     with self.command_group('graph', client_factory=cf_resource_graph) as g:
-        g.custom_command('query', 'execute_query', validator=validate_query_args)
+        # the client is made by the command, so that a cached result is returned without loading the profile
+        g.custom_command('query', 'execute_query', validator=validate_query_args, client_factory=None)
 
     with self.command_group('graph shared-query', graph_shared_query_sdk, is_experimental=True) as g:
         g.custom_command('create', 'create_shared_query')
@@ -7,7 +7,12 @@
 
 import json
 import os
+import queue
+import sys
+import threading
+import time
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 import requests
@@ -21,16 +26,54 @@ from knack.log import get_logger
 from knack.util import todict
 
 from azext_resourcegraph.vendored_sdks.resourcegraph.models import ResultTruncated
+from ._client_factory import cf_resource_graph
+from ._query_cache import QUERY_CACHE_DIR_NAME, QueryCache, get_file_key, get_query_cache_key
 from .vendored_sdks.resourcegraph import ResourceGraphClient
 from .vendored_sdks.resourcegraph.models import \
     QueryRequest, QueryRequestOptions, QueryResponse, ResultFormat, ErrorResponse, Error
 
 __SUBSCRIPTION_LIMIT = 1000
 __MANAGEMENT_GROUP_LIMIT = 10
+__ROWS_PER_PAGE = 1000
+# Resource Graph allows 15 queries per 5 seconds per user by default
+__MAX_STREAM_WORKERS = 4
+__MAX_THROTTLE_RETRIES = 5
 __logger = get_logger(__name__)
 
 
-def execute_query(client, graph_query, first, skip, subscriptions, management_groups, allow_partial_scopes, skip_token):
+def execute_query(cmd, graph_query, first, skip, subscriptions, management_groups, allow_partial_scopes, skip_token,
+                  stream=False, no_cache=False, cache_ttl=None):
+    # type: (AzCliCommand, str, int, int, list[str], list[str], bool, str, bool, bool, int) -> object
+    # the client is only made on a cache miss, as making it loads the profile
+    if stream:
+        _stream_query(cf_resource_graph(cmd.cli_ctx, None), graph_query, subscriptions, management_groups,
+                      allow_partial_scopes)
+        return None
+
+    if cache_ttl is None:
+        cache_ttl = cmd.cli_ctx.config.getint('graph', 'cache_ttl', fallback=0)
+    if no_cache or not cache_ttl:
+        return _query(cf_resource_graph(cmd.cli_ctx, None), graph_query, first, skip, subscriptions,
+                      management_groups, allow_partial_scopes, skip_token)
+
+    cache = QueryCache(os.path.join(GLOBAL_CONFIG_DIR, QUERY_CACHE_DIR_NAME))
+    scope_key = None
+    if subscriptions is None and management_groups is None:
+        scope_key = get_file_key(os.path.join(cmd.cli_ctx.config.config_dir, 'azureProfile.json'))
+    key = get_query_cache_key(graph_query, subscriptions, management_groups, first, skip, skip_token,
+                              allow_partial_scopes, scope_key)
+    result = cache.get(key, cache_ttl)
+    if result is not None:
+        __logger.info("Returning the result of the query cached in the last %d seconds.", cache_ttl)
+        return result
+
+    result = _query(cf_resource_graph(cmd.cli_ctx, None), graph_query, first, skip, subscriptions,
+                    management_groups, allow_partial_scopes, skip_token)
+    cache.set(key, todict(result))
+    return result
+
+
+def _query(client, graph_query, first, skip, subscriptions, management_groups, allow_partial_scopes, skip_token):
     # type: (ResourceGraphClient, str, int, int, list[str], list[str], bool, str) -> object
     mgs_list = management_groups
     if mgs_list is not None and len(mgs_list) > __MANAGEMENT_GROUP_LIMIT:
@@ -82,10 +125,7 @@ def execute_query(client, graph_query, first, skip, subscriptions, management_gr
                              "see the docs for an example: https://aka.ms/arg-results-truncated")
 
     except HttpResponseError as ex:
-        if ex.model.error.code == 'BadRequest':
-            raise BadRequestError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
-
-        raise AzureInternalError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
+        _raise_query_error(ex)
 
     result_dict = dict()
     result_dict['data'] = response.data
@@ -96,6 +136,150 @@ def execute_query(client, graph_query, first, skip, subscriptions, management_gr
     return result_dict
 
 
+def _raise_query_error(ex):
+    if ex.model.error.code == 'BadRequest':
+        raise BadRequestError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
+
+    raise AzureInternalError(json.dumps(_to_dict(ex.model.error), indent=4)) from ex
+
+
+def _stream_query(client, graph_query, subscriptions, management_groups, allow_partial_scopes, output=None):
+    """
+    Queries all the subscriptions or management groups in batches the service accepts, follows the skip tokens
+    of each batch and writes the rows as they arrive as JSON lines. A resource is only written once.
+    """
+    output = output or sys.stdout
+    if management_groups is not None:
+        scopes = [(None, management_groups[i:i + __MANAGEMENT_GROUP_LIMIT])
+                  for i in range(0, len(management_groups), __MANAGEMENT_GROUP_LIMIT)]
+    else:
+        subs_list = subscriptions or _get_cached_subscriptions()
+        scopes = [(subs_list[i:i + __SUBSCRIPTION_LIMIT], None)
+                  for i in range(0, len(subs_list), __SUBSCRIPTION_LIMIT)]
+    scopes = scopes or [(None, None)]
+
+    workers = min(len(scopes), __MAX_STREAM_WORKERS)
+    # each batch requests its next page while the rows of the last one are written
+    pages = queue.Queue(maxsize=2 * workers)
+    stop = threading.Event()
+    throttle = _QueryThrottle(workers, __MAX_THROTTLE_RETRIES)
+
+    def _put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _query_pages(subs_list, mgs_list):
+        request = QueryRequest(
+            query=graph_query,
+            subscriptions=subs_list,
+            management_groups=mgs_list,
+            options=QueryRequestOptions(top=__ROWS_PER_PAGE,
+                                        result_format=ResultFormat.object_array,
+                                        allow_partial_scopes=allow_partial_scopes))
+        try:
+            while not stop.is_set():
+                response = throttle.call(lambda: client.resources(request, cls=throttle.track))  # type: QueryResponse
+                _put((response.data or [], None))
+                if not response.skip_token:
+                    break
+                request.options.skip_token = response.skip_token
+        except Exception as ex:
+            _put((None, ex))
+        finally:
+            _put((None, None))
+
+    seen_ids = set()
+    rows = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for subs_list, mgs_list in scopes:
+            executor.submit(_query_pages, subs_list, mgs_list)
+        try:
+            running = len(scopes)
+            while running:
+                data, error = pages.get()
+                if error is not None:
+                    if isinstance(error, HttpResponseError) and error.model is not None:
+                        _raise_query_error(error)
+                    raise error
+                if data is None:
+                    running -= 1
+                    continue
+
+                for row in data:
+                    row_id = row.get('id') if isinstance(row, dict) else None
+                    if isinstance(row_id, str):
+                        if row_id.lower() in seen_ids:
+                            continue
+                        seen_ids.add(row_id.lower())
+                    output.write(json.dumps(row) + '\n')
+                    rows += 1
+                output.flush()
+        finally:
+            stop.set()
+    __logger.info("Wrote %d rows from %d batches.", rows, len(scopes))
+
+
+class _QueryThrottle(object):
+    """
+    Paces the concurrent queries of a user by the quota headers of Resource Graph, and retries the throttled ones.
+    """
+
+    def __init__(self, workers, max_retries):
+        self.workers = workers
+        self.max_retries = max_retries
+        self._resume_at = 0
+        self._lock = threading.Lock()
+
+    def _pause(self, seconds):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def track(self, pipeline_response, deserialized, _):
+        headers = pipeline_response.http_response.headers
+        remaining = headers.get('x-ms-user-quota-remaining')
+        resets_after = _parse_timespan(headers.get('x-ms-user-quota-resets-after'))
+        if remaining is not None and resets_after and int(remaining) < self.workers:
+            # spread the queries left over the rest of the quota window
+            self._pause(resets_after / (int(remaining) + 1))
+        return deserialized
+
+    def call(self, query):
+        backoff = 1
+        for attempt in range(self.max_retries + 1):
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                return query()
+            except HttpResponseError as ex:
+                if ex.status_code != 429 or attempt == self.max_retries:
+                    raise
+                headers = ex.response.headers if ex.response is not None else {}
+                retry_after = headers.get('Retry-After')
+                delay = float(retry_after) if retry_after else \
+                    _parse_timespan(headers.get('x-ms-user-quota-resets-after')) or backoff
+                self._pause(delay)
+                backoff *= 2
+        return None
+
+
+def _parse_timespan(value):
+    # type: (str) -> float
+    """ seconds of a "hh:mm:ss" timespan """
+    if not value:
+        return None
+    try:
+        hours, minutes, seconds = value.split(':')
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return None
+
+
 def create_shared_query(client, resource_group_name,
                         resource_name, description,
                         graph_query, location='global', tags=None):
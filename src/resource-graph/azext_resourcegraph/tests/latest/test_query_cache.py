@@ -0,0 +1,106 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: disable=line-too-long
+import os
+import shutil
+import tempfile
+import time
+import timeit
+import unittest
+from unittest import mock
+
+from azext_resourcegraph import custom
+from azext_resourcegraph._query_cache import QueryCache, get_query_cache_key, normalize_query
+from azext_resourcegraph.vendored_sdks.resourcegraph.models import QueryResponse
+
+
+class QueryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.config_dir)
+        self.cache = QueryCache(os.path.join(self.config_dir, 'cache'))
+
+    def test_normalize_query(self):
+        self.assertEqual("where name == 'a  b' | project id", normalize_query("  where  name == 'a  b' |\n  project   id\n"))
+        self.assertNotEqual(normalize_query("where name == 'a  b'"), normalize_query("where name == 'a b'"))
+
+    def test_query_cache_key(self):
+        key = get_query_cache_key('project id', ['A', 'b'], None, 100, 0, None, False)
+        self.assertEqual(key, get_query_cache_key(' project  id ', ['B', 'a'], None, 100, 0, None, False))
+        self.assertNotEqual(key, get_query_cache_key('project id', ['a'], None, 100, 0, None, False))
+        self.assertNotEqual(key, get_query_cache_key('project id', None, ['a', 'b'], 100, 0, None, False))
+        self.assertNotEqual(key, get_query_cache_key('project id', ['a', 'b'], None, 10, 0, None, False))
+        self.assertNotEqual(key, get_query_cache_key('project id', ['a', 'b'], None, 100, 5, None, False))
+
+    def test_result_expires(self):
+        self.cache.set('key', {'data': [1]})
+        self.assertEqual({'data': [1]}, self.cache.get('key', 60))
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertIsNone(self.cache.get('key', 60))
+        self.assertIsNone(self.cache.get('other', 60))
+
+    def test_least_recently_used_results_are_evicted(self):
+        for i in range(3):
+            self.cache.set(str(i), {'data': ['x' * 1000]})
+            os.utime(self.cache._get_path(str(i)), (i, i))  # pylint: disable=protected-access
+        self.cache.get('0', 60)
+        self.cache.max_size = 2500
+        self.cache.set('3', {'data': ['x' * 1000]})
+        self.assertEqual(['0.json', '3.json'], sorted(os.listdir(self.cache.cache_dir)))
+
+
+class ExecuteQueryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.config_dir)
+        self.cmd = mock.Mock()
+        self.cmd.cli_ctx.config.config_dir = self.config_dir
+        self.cmd.cli_ctx.config.getint.return_value = 0
+        self.client = mock.Mock()
+        self.client.resources.return_value = QueryResponse(total_records=1, count=1, result_truncated='false', data=[{'id': 'a'}])
+        for patcher in [mock.patch.object(custom, 'GLOBAL_CONFIG_DIR', self.config_dir),
+                        mock.patch.object(custom, 'cf_resource_graph', return_value=self.client),
+                        mock.patch.object(custom, '_get_cached_subscriptions', return_value=['sub'])]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _query(self, graph_query='project id', **kwargs):
+        return custom.execute_query(self.cmd, graph_query, 100, 0, None, None, False, None, **kwargs)
+
+    def test_cache_hit_skips_profile_and_client(self):
+        expected = {'data': [{'id': 'a'}], 'count': 1, 'total_records': 1, 'skip_token': None}
+        self.assertEqual(expected, self._query(cache_ttl=60))
+        self.assertEqual(expected, self._query(graph_query='project  id', cache_ttl=60))
+        self.assertEqual(1, self.client.resources.call_count)
+        self.assertEqual(1, custom.cf_resource_graph.call_count)
+        self.assertEqual(1, custom._get_cached_subscriptions.call_count)  # pylint: disable=protected-access
+
+        # a login changes the subscriptions of the profile
+        with open(os.path.join(self.config_dir, 'azureProfile.json'), 'w') as profile:
+            profile.write('{}')
+        self._query(cache_ttl=60)
+        self.assertEqual(2, self.client.resources.call_count)
+
+        hit = min(timeit.repeat(lambda: self._query(cache_ttl=60), number=10, repeat=3)) / 10
+        self.assertLess(hit, 0.05)
+
+    def test_cache_is_opt_in(self):
+        self._query()
+        self._query()
+        self.assertEqual(2, self.client.resources.call_count)
+        self.assertFalse(os.path.exists(os.path.join(self.config_dir, 'resourcegraph_cache')))
+
+        self.cmd.cli_ctx.config.getint.return_value = 60
+        self._query()
+        self._query()
+        self._query(no_cache=True)
+        self.assertEqual(4, self.client.resources.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
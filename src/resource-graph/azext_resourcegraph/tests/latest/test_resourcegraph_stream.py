@@ -0,0 +1,111 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: disable=line-too-long
+import io
+import json
+import threading
+import unittest
+from unittest import mock
+
+from azure.core.exceptions import HttpResponseError
+
+from azext_resourcegraph import custom
+from azext_resourcegraph.custom import _parse_timespan, _QueryThrottle, _stream_query
+from azext_resourcegraph.vendored_sdks.resourcegraph.models import QueryResponse
+
+
+class _PipelineResponse(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, headers):
+        self.http_response = mock.Mock(headers=headers)
+
+
+class _Client(object):
+    """ returns the rows of the subscriptions of a request in pages """
+
+    def __init__(self, rows_per_subscription, headers=None, throttled=0, page_size=2):
+        self.rows_per_subscription = rows_per_subscription
+        self.page_size = page_size
+        self.headers = headers or {}
+        self.throttled = throttled
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def resources(self, request, cls=None):
+        with self._lock:
+            self.requests.append((list(request.subscriptions or []), request.options.skip_token))
+            if self.throttled:
+                self.throttled -= 1
+                raise HttpResponseError(response=mock.Mock(status_code=429, headers={'Retry-After': '0'}))
+        rows = [row for sub in request.subscriptions for row in self.rows_per_subscription(sub)]
+        start = int(request.options.skip_token or 0)
+        end = start + self.page_size
+        page = rows[start:end]
+        response = QueryResponse(total_records=len(rows), count=len(page), result_truncated='false', data=page,
+                                 skip_token=str(end) if end < len(rows) else None)
+        return cls(_PipelineResponse(self.headers), response, {}) if cls else response
+
+
+def _rows(sub):
+    return [{'id': '/subscriptions/{}/resourceGroups/rg/providers/p/t/{}'.format(sub, i), 'name': str(i)} for i in range(3)]
+
+
+class ResourceGraphStreamTest(unittest.TestCase):
+
+    def _stream(self, client, subscriptions=None, management_groups=None):
+        output = io.StringIO()
+        _stream_query(client, 'project id, name', subscriptions, management_groups, False, output=output)
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_stream_all_pages_of_all_batches(self):
+        client = _Client(_rows, page_size=1000)
+        subscriptions = ['sub{}'.format(i) for i in range(2500)]
+        rows = self._stream(client, subscriptions=subscriptions)
+
+        self.assertEqual(7500, len(rows))
+        self.assertEqual(sorted(row['id'] for row in rows), sorted(row['id'] for sub in subscriptions for row in _rows(sub)))
+        batches = sorted({tuple(subs) for subs, _ in client.requests}, key=len)
+        self.assertEqual([500, 1000, 1000], [len(batch) for batch in batches])
+        self.assertEqual(8, len(client.requests))
+        # every page of every batch is requested once
+        self.assertEqual(len(client.requests), len(set((tuple(subs), token) for subs, token in client.requests)))
+
+    def test_stream_writes_resources_once(self):
+        client = _Client(lambda sub: [{'id': '/Subscriptions/SHARED/p/t/1'.lower() if sub == 'a' else '/subscriptions/shared/p/t/1'.upper()},
+                                      {'name': 'no id'}])
+        rows = self._stream(client, subscriptions=['a', 'b'])
+        self.assertEqual(3, len(rows))
+
+    def test_stream_uses_cached_subscriptions(self):
+        client = _Client(_rows)
+        with mock.patch.object(custom, '_get_cached_subscriptions', return_value=['sub']):
+            self.assertEqual(3, len(self._stream(client)))
+
+    def test_throttled_query_is_retried(self):
+        client = _Client(_rows, throttled=2)
+        with mock.patch('time.sleep') as sleep:
+            self.assertEqual(3, len(self._stream(client, subscriptions=['sub'])))
+        self.assertEqual(4, len(client.requests))
+        sleep.assert_not_called()
+
+    def test_throttle_paces_by_quota_headers(self):
+        throttle = _QueryThrottle(workers=4, max_retries=0)
+        throttle.track(_PipelineResponse({'x-ms-user-quota-remaining': '1', 'x-ms-user-quota-resets-after': '00:00:04'}), None, {})
+        with mock.patch('time.sleep') as sleep:
+            self.assertEqual('result', throttle.call(lambda: 'result'))
+        self.assertAlmostEqual(2, sleep.call_args[0][0], delta=0.1)
+
+        self.assertEqual(3723.5, _parse_timespan('01:02:03.5'))
+        self.assertIsNone(_parse_timespan('3 seconds'))
+
+    def test_stream_raises_error_of_a_batch(self):
+        client = _Client(_rows, throttled=10)
+        with mock.patch('time.sleep'):
+            with self.assertRaises(HttpResponseError):
+                self._stream(client, subscriptions=['sub'])
+
+
+if __name__ == '__main__':
+    unittest.main()
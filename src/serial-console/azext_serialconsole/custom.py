@@ -119,6 +119,8 @@ class PrintClass:
         return max(max_width, curr_width)
 
     def prompt(self, getch, message):
+        # the output received so far is printed before the prompt, not over or after it
+        OB.flush()
         GV.block_print = True
         width = self.get_terminal_width(getch)
         _, col = self.get_cursor_position(getch)
@@ -141,7 +143,105 @@ class PrintClass:
         return c
 
 
+class InputCoalescer:
+    """
+    Sends the keys to the websocket in batches: the keys typed or pasted within the latency of the first
+    pending one go in one frame, or sooner once the pending keys reach the flush size.
+    """
+    LATENCY = 0.01
+    FLUSH_SIZE = 4096
+
+    def __init__(self, latency=LATENCY, flush_size=FLUSH_SIZE):
+        self.latency = latency
+        self.flush_size = flush_size
+        self.pending = []
+        self.pending_size = 0
+        self.condition = threading.Condition()
+        self.send_lock = threading.Lock()
+        self.thread = None
+
+    def write(self, data):
+        with self.condition:
+            self.pending.append(data)
+            self.pending_size += len(data)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._send_batches, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def _send_batches(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                deadline = time.time() + self.latency
+                while self.pending_size < self.flush_size:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+            self.flush()
+
+    def flush(self):
+        with self.send_lock:
+            with self.condition:
+                data = b"".join(self.pending)
+                self.pending = []
+                self.pending_size = 0
+            if not data:
+                return
+            try:
+                if GV.websocket_instance:
+                    GV.websocket_instance.send(data)
+            except (AttributeError, websocket.WebSocketConnectionClosedException):
+                pass
+
+
+class OutputBatcher:
+    """
+    Prints the messages of the websocket at most FRAME_RATE times a second, all the messages received since
+    the previous frame at once.
+    """
+    FRAME_RATE = 30
+
+    def __init__(self, frame_rate=FRAME_RATE):
+        self.frame_seconds = 1 / frame_rate
+        self.pending = []
+        self.condition = threading.Condition()
+        self.print_lock = threading.Lock()
+        self.thread = None
+        self.last_frame = 0
+
+    def write(self, message):
+        with self.condition:
+            self.pending.append(message)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._print_frames, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def _print_frames(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+            delay = self.last_frame + self.frame_seconds - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            self.flush()
+
+    def flush(self):
+        with self.print_lock:
+            with self.condition:
+                message = "".join(self.pending)
+                self.pending = []
+            if message:
+                self.last_frame = time.time()
+                PC.print(message)
+
+
 def quitapp(from_websocket=False, message="", error_message=None, error_recommendation=None, error_func=None):
+    OB.flush()
     PC.print(message + "\r\n", color=PrintClass.RED)
     GV.terminating_app = True
     GV.loading = False
@@ -158,6 +258,8 @@ def quitapp(from_websocket=False, message="", error_message=None, error_recommen
 
 GV = GlobalVariables()
 PC = PrintClass()
+IC = InputCoalescer()
+OB = OutputBatcher()
 
 
 # pylint: disable=too-few-public-methods
@@ -338,11 +440,7 @@ class SerialConsole:
                         return
                     if c != b'\x1d':
                         continue
-                try:
-                    if GV.websocket_instance:
-                        GV.websocket_instance.send(c)
-                except (AttributeError, websocket.WebSocketConnectionClosedException):
-                    pass
+                IC.write(c)
             else:
                 if c == b'\r' and not GV.loading:
                     GV.serial_console_instance.connect()
@@ -429,12 +527,13 @@ class SerialConsole:
                 PC.clear_screen()
             GV.first_message = False
             GV.loading = False
-            PC.print(message)
+            OB.write(message)
 
         def on_error(*_):
             pass
 
         def on_close(_):
+            OB.flush()
             GV.loading = False
             if not GV.terminating_app:
                 if GV.first_message:
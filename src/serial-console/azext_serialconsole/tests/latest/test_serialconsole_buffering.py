@@ -0,0 +1,150 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import base64
+import hashlib
+import re
+import socket
+import struct
+import threading
+import time
+import unittest
+from unittest import mock
+
+from azext_serialconsole import custom
+from azext_serialconsole.custom import GlobalVariables, InputCoalescer, OutputBatcher, PrintClass, SerialConsole
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _text_frame(payload):
+    # the frames of a server are not masked
+    if len(payload) < 126:
+        header = struct.pack(">BB", 0x81, len(payload))
+    elif len(payload) < 65536:
+        header = struct.pack(">BBH", 0x81, 126, len(payload))
+    else:
+        header = struct.pack(">BBQ", 0x81, 127, len(payload))
+    return header + payload
+
+
+class StandInServer:
+    """ a websocket server on the loopback which sends the given messages and records the frames it receives """
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.frames = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(1)
+        self.url = "ws://127.0.0.1:{}/client".format(self.sock.getsockname()[1])
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        conn, _ = self.sock.accept()
+        request = b""
+        while b"\r\n\r\n" not in request:
+            request += conn.recv(4096)
+        key = re.search(rb"Sec-WebSocket-Key: (\S+)", request, re.IGNORECASE).group(1)
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest())
+        conn.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        conn.sendall(b"".join(_text_frame(message.encode()) for message in self.messages))
+
+        reader = conn.makefile("rb")
+        while True:
+            header = reader.read(2)
+            if len(header) < 2:
+                break
+            opcode, length = header[0] & 0x0f, header[1] & 0x7f
+            if length == 126:
+                length = struct.unpack(">H", reader.read(2))[0]
+            elif length == 127:
+                length = struct.unpack(">Q", reader.read(8))[0]
+            mask = reader.read(4)
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(reader.read(length)))
+            if opcode == 0x8:
+                break
+            self.frames.append(payload)
+        conn.close()
+        self.sock.close()
+
+
+def _wait_until(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class SerialConsoleBufferingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.printed = []
+        self.threads = set(threading.enumerate())
+        for patcher in [mock.patch.object(custom, "GV", GlobalVariables()),
+                        mock.patch.object(custom, "IC", InputCoalescer()),
+                        mock.patch.object(custom, "OB", OutputBatcher()),
+                        mock.patch.object(custom, "cf_serial_port"),
+                        mock.patch.object(SerialConsole, "connect_loading_message_linux"),
+                        mock.patch.object(SerialConsole, "connect_loading_message_windows"),
+                        mock.patch("builtins.print", side_effect=lambda message, **_: self.printed.append(message))]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self._disconnect)
+
+    def _disconnect(self):
+        custom.GV.terminating_app = True
+        if custom.GV.websocket_instance:
+            custom.GV.websocket_instance.close()
+        # the connection is closed once the threads of the console which don't run for good are done
+        for thread in set(threading.enumerate()) - self.threads - {custom.IC.thread, custom.OB.thread}:
+            thread.join(10)
+
+    def _connect(self, messages):
+        server = StandInServer(messages)
+        console = SerialConsole(mock.Mock(), "rg", "vm", None)
+
+        def _load_websocket_url():
+            console.websocket_url, console.access_token = server.url, "token"
+            return True
+
+        console.load_websocket_url = _load_websocket_url
+        console.connect()
+        self.assertTrue(_wait_until(lambda: not custom.GV.first_message))
+        return server
+
+    def test_pasted_input_is_sent_in_batches(self):
+        server = self._connect(["login: "])
+        pasted = b"".join(b"line %d of the configuration\r" % i for i in range(200))
+        for i in range(len(pasted)):
+            custom.IC.write(pasted[i:i + 1])
+
+        self.assertTrue(_wait_until(lambda: sum(len(frame) for frame in server.frames) == len(pasted)))
+        self.assertEqual(pasted, b"".join(server.frames))
+        self.assertLess(len(server.frames), 50)
+
+    def test_output_is_printed_in_frames(self):
+        lines = ["[{:8.6f}] boot message {}\r\n".format(i / 1000, i) for i in range(5000)]
+        self._connect(lines)
+
+        self.assertTrue(_wait_until(lambda: "".join(self.printed).endswith(lines[-1])))
+        self.assertIn("".join(lines), "".join(self.printed))
+        self.assertLess(len(self.printed), 100)
+
+    def test_pending_output_is_printed_before_a_prompt(self):
+        custom.OB.pending.append("boot message\r\n")
+        with mock.patch.object(PrintClass, "get_terminal_width", return_value=80), \
+                mock.patch.object(PrintClass, "get_cursor_position", return_value=(1, 1)):
+            self.assertEqual(b"q", PrintClass().prompt(lambda: b"q", "| Press q to quit Console |"))
+
+        printed = "".join(self.printed)
+        self.assertLess(printed.index("boot message"), printed.index("| Press q to quit Console |"))
+        self.assertEqual([], custom.OB.pending)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,13 +5,21 @@
 
 # pylint: disable=wrong-import-order
 import os
-from re import L
 import tempfile
 import uuid
+from azure.common import AzureException
 from azure.cli.core.azclierror import InvalidArgumentValueError
+from knack.log import get_logger
 from .azure_storage_file import FileService
 from ._utils import (get_azure_files_info, _pack_source_code)
 
+logger = get_logger(__name__)
+
+# Azure Files accepts at most 4MB per put range
+DEFAULT_UPLOAD_RANGE_SIZE = 4 * 1024 * 1024
+DEFAULT_UPLOAD_CONNECTIONS = 8
+DEFAULT_UPLOAD_ATTEMPTS = 3
+
 
 class Empty:
     def upload_and_build(self, **_):
@@ -22,13 +30,17 @@ class FileUpload:
     '''
     Upload a file in local file system to upload url
     '''
-    def __init__(self, upload_url):
+    def __init__(self, upload_url, max_connections=DEFAULT_UPLOAD_CONNECTIONS,
+                 range_size=DEFAULT_UPLOAD_RANGE_SIZE, attempts=DEFAULT_UPLOAD_ATTEMPTS):
         account_name, endpoint_suffix, share_name, relative_name, sas_token = get_azure_files_info(upload_url)
         self.account_name = account_name
         self.endpoint_suffix = endpoint_suffix
         self.share_name = share_name
         self.relative_name = relative_name
         self.sas_token = sas_token
+        self.max_connections = max_connections
+        self.range_size = min(range_size, DEFAULT_UPLOAD_RANGE_SIZE)
+        self.attempts = attempts
 
     def upload_and_build(self, artifact_path, **_):
         if not artifact_path:
@@ -37,7 +49,20 @@ class FileUpload:
 
     def _upload(self, artifact_path):
         file_service = FileService(self.account_name, sas_token=self.sas_token, endpoint_suffix=self.endpoint_suffix)
-        file_service.create_file_from_path(self.share_name, None, self.relative_name, artifact_path)
+        file_service.MAX_RANGE_SIZE = self.range_size
+        # ranges already put are kept across attempts, so a dropped connection only re-sends the missing ones
+        completed_ranges = set()
+        for attempt in range(1, self.attempts + 1):
+            try:
+                file_service.create_file_from_path(self.share_name, None, self.relative_name, artifact_path,
+                                                   max_connections=self.max_connections,
+                                                   completed_ranges=completed_ranges)
+                return
+            except AzureException as ex:
+                if attempt == self.attempts:
+                    raise
+                logger.warning('Upload of %s was interrupted (%s), resuming with %d ranges already uploaded.',
+                               artifact_path, ex, len(completed_ranges))
 
 
 class FolderUpload(FileUpload):
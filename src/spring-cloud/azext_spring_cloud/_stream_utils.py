@@ -19,6 +19,7 @@ from ._utils import get_blob_info
 logger = get_logger(__name__)
 
 DEFAULT_CHUNK_SIZE = 1024 * 4
+MAX_CHUNK_SIZE = 1024 * 1024 * 4
 DEFAULT_LOG_TIMEOUT_IN_SEC = 60 * 30  # 30 minutes
 
 
@@ -75,10 +76,10 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
     if not no_format:
         colorama.init()
 
-    stream = BytesIO()
+    # Bytes read but not flushed yet, i.e. the last incomplete line
+    pending = bytearray()
     metadata = {}
     start = 0
-    end = byte_size - 1
     available = 0
     sleep_time = 1
     max_sleep_time = 15
@@ -104,6 +105,11 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
                 container_name=container_name, blob_name=blob_name)
         return None
 
+    def flush_pending():
+        if pending:
+            logger_level_func(pending.decode('utf-8', errors='ignore'))
+            del pending[:]
+
     # Try to get the initial properties so there's no waiting.
     # If the storage call fails, we'll just sleep and try again after.
     try:
@@ -122,43 +128,36 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
             consecutive_sleep_in_sec = 0
 
             try:
-                old_byte_size = len(stream.getvalue())
+                # Catch up on a large backlog with few big reads, tail a live log with small ones
+                range_size = min(max(byte_size, available - start), MAX_CHUNK_SIZE)
+                stream = BytesIO()
                 blob_service.get_blob_to_stream(
                     container_name=container_name,
                     blob_name=blob_name,
                     start_range=start,
-                    end_range=end,
+                    end_range=start + range_size - 1,
                     stream=stream)
 
-                curr_bytes = stream.getvalue()
-                new_byte_size = len(curr_bytes)
-                amount_read = new_byte_size - old_byte_size
-                start += amount_read
-                end = start + byte_size - 1
-
-                # Only scan what's newly read. If nothing is read, default to 0.
-                min_scan_range = max(new_byte_size - amount_read - 1, 0)
-                for i in range(new_byte_size - 1, min_scan_range, -1):
-                    if curr_bytes[i - 1:i + 1] == b'\r\n':
-                        flush = curr_bytes[:i]  # won't logger.warning \n
-                        stream = BytesIO()
-                        stream.write(curr_bytes[i + 1:])
-                        logger_level_func(flush.decode('utf-8', errors='ignore'))
-                        break
-                    if curr_bytes[i:i + 1] == b'\n':
-                        flush = curr_bytes[:i + 1]  # won't logger.warning \n
-                        stream = BytesIO()
-                        stream.write(curr_bytes[i + 1:])
-                        logger_level_func(flush.decode('utf-8', errors='ignore'))
-                        break
+                chunk = stream.getvalue()
+                start += len(chunk)
+
+                # Only scan what's newly read, plus one byte back for a \r\n split across reads
+                scan_start = max(len(pending) - 1, 0)
+                pending += chunk
+                i = pending.rfind(b'\n', scan_start)
+                if i >= 0:
+                    if i > 0 and pending[i - 1:i] == b'\r':
+                        flush = pending[:i]  # won't logger.warning \n
+                    else:
+                        flush = pending[:i + 1]
+                    del pending[:i + 1]
+                    logger_level_func(flush.decode('utf-8', errors='ignore'))
 
             except AzureHttpError as ae:
                 if ae.status_code != 404:
                     raise CLIError(ae)
             except KeyboardInterrupt:
-                curr_bytes = stream.getvalue()
-                if curr_bytes:
-                    logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+                flush_pending()
                 return
 
         try:
@@ -170,8 +169,7 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
             if ae.status_code != 404:
                 raise CLIError(ae)
         except KeyboardInterrupt:
-            if curr_bytes:
-                logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+            flush_pending()
             return
         except Exception as err:
             raise CLIError(err)
@@ -179,10 +177,7 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
         if consecutive_sleep_in_sec > timeout_in_seconds:
             # Flush anything remaining in the buffer - this would be the case
             # if the file has expired and we weren't able to detect any \r\n
-            curr_bytes = stream.getvalue()
-            if curr_bytes:
-                logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
-
+            flush_pending()
             return
 
         # If no new data available but not complete, sleep before trying to process additional data.
@@ -201,10 +196,7 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
     # One final check to see if there's anything in the buffer to flush
     # E.g., metadata has been set and start == available, but the log file
     # didn't end in \r\n, so we were unable to flush out the final contents.
-    curr_bytes = stream.getvalue()
-
-    if curr_bytes:
-        logger_level_func(curr_bytes.decode('utf-8', errors='ignore'))
+    flush_pending()
 
     build_status = _get_run_status(metadata).lower()
     logger_level_func("Log status was: {}".format(build_status))
@@ -7,11 +7,13 @@ from enum import Enum
 import os
 from time import sleep
 import codecs
+import struct
 import tarfile
 import tempfile
 import uuid
+import zlib
 from io import open
-from re import (search, match, compile)
+from re import (search, compile)
 from json import dumps
 from knack.util import CLIError, todict
 from knack.log import get_logger
@@ -50,14 +52,23 @@ def _pack_source_code(source_location, tar_file_path):
     logger.info("Packing source code into tar to upload...")
 
     ignore_list, ignore_list_size = _load_gitignore_file(source_location)
+    ignore_matcher = _compile_ignore_rules(ignore_list)
+    # Only a '!' rule can bring back a file below an ignored directory. A directory ignored by a rule with
+    # higher priority than all '!' rules, i.e. a lower index, is skipped without being scanned.
+    first_exception_index = next((index for index, item in enumerate(ignore_list or []) if not item.ignore),
+                                 ignore_list_size)
     common_vcs_ignore_list = {'.git', '.gitignore', 'bzrignore', '.hg',
                               '.hgignore', '.svn', '.circleci', 'target', 'docker'}
 
-    def _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index):
+    def _ignore_check(name, parent_ignored, parent_matching_rule_index):
+        ignored, matching_rule_index = _match_ignore_rules(name, parent_ignored, parent_matching_rule_index)
+        return ignored, matching_rule_index, ignored and matching_rule_index <= first_exception_index
+
+    def _match_ignore_rules(name, parent_ignored, parent_matching_rule_index):
         # ignore common vcs dir or file
-        if tarinfo.name in common_vcs_ignore_list:
+        if name in common_vcs_ignore_list:
             logger.info(
-                "Excluding '%s' based on default ignore rules", tarinfo.name)
+                "Excluding '%s' based on default ignore rules", name)
             return True, parent_matching_rule_index
 
         if ignore_list is None:
@@ -65,22 +76,24 @@ def _pack_source_code(source_location, tar_file_path):
             # eg, it will ignore the files under .git folder.
             return parent_ignored, parent_matching_rule_index
 
-        for index, item in enumerate(ignore_list):
-            # stop checking the remaining rules whose priorities are lower than the parent matching rule
-            # at this point, current item should just inherit from parent
-            if index >= parent_matching_rule_index:
-                break
-            if match(item.pattern, tarinfo.name):
+        # the combined pattern matches the rule with the highest priority, i.e. the lowest index.
+        # Rules whose priorities are lower than the parent matching rule are not considered,
+        # the current item just inherits from parent then.
+        matched = ignore_matcher.match(name)
+        if matched:
+            index = int(matched.lastgroup[len(_IGNORE_RULE_GROUP_PREFIX):])
+            if index < parent_matching_rule_index:
+                item = ignore_list[index]
                 logger.debug(".gitignore: rule '%s' matches '%s'.",
-                             item.rule, tarinfo.name)
+                             item.rule, name)
                 return item.ignore, index
 
         logger.debug(".gitignore: no rule for '%s'. parent ignore '%s'",
-                     tarinfo.name, parent_ignored)
+                     name, parent_ignored)
         # inherit from parent
         return parent_ignored, parent_matching_rule_index
 
-    with tarfile.open(tar_file_path, "w:gz") as tar:
+    with open(tar_file_path, "wb") as f, ParallelGzipFile(f) as gz, tarfile.open(fileobj=gz, mode="w|") as tar:
         # need to set arcname to empty string as the archive root path
         _archive_file_recursively(tar,
                                   source_location,
@@ -90,6 +103,91 @@ def _pack_source_code(source_location, tar_file_path):
                                   ignore_check=_ignore_check)
 
 
+_IGNORE_RULE_GROUP_PREFIX = 'rule'
+
+
+def _compile_ignore_rules(ignore_list):
+    """
+    Combine the patterns of all rules into one regular expression. The alternatives are tried in order,
+    so the name of the matched group gives the index of the first matching rule.
+    """
+    if not ignore_list:
+        return compile('(?!)')
+    return compile('|'.join('(?P<{}{}>{})'.format(_IGNORE_RULE_GROUP_PREFIX, index, item.pattern)
+                            for index, item in enumerate(ignore_list)))
+
+
+def _deflate_block(block, compresslevel, mode):
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(block) + compressor.flush(mode)
+
+
+class ParallelGzipFile(object):
+    """
+    Write-only gzip stream that compresses blocks of its input on a thread pool. Every block is deflated on its
+    own and ends with a sync flush, so the compressed blocks concatenate into a single gzip member, as pigz does.
+    """
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, fileobj, compresslevel=9, max_workers=None):
+        from collections import deque
+        from concurrent.futures import ThreadPoolExecutor
+        self.fileobj = fileobj
+        self.compresslevel = compresslevel
+        self.compressed_size = 0
+        self._max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._crc = 0
+        self._size = 0
+        self._closed = False
+        # magic, deflate, no flags, no mtime, maximum compression, unknown OS
+        self._write_compressed(b'\x1f\x8b\x08\x00' + struct.pack('<I', 0) + b'\x02\xff')
+
+    def write(self, data):
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        self._buffer += data
+        while len(self._buffer) >= self.BLOCK_SIZE:
+            block = bytes(self._buffer[:self.BLOCK_SIZE])
+            del self._buffer[:self.BLOCK_SIZE]
+            self._submit(block, zlib.Z_SYNC_FLUSH)
+        return len(data)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._submit(bytes(self._buffer), zlib.Z_FINISH)
+            while self._pending:
+                self._write_compressed(self._pending.popleft().result())
+            self._write_compressed(struct.pack('<II', self._crc & 0xffffffff, self._size & 0xffffffff))
+        finally:
+            self._executor.shutdown()
+
+    def _submit(self, block, mode):
+        self._pending.append(self._executor.submit(_deflate_block, block, self.compresslevel, mode))
+        # keep the memory bounded, write out the oldest blocks once every worker has one queued
+        while len(self._pending) > self._max_workers * 2:
+            self._write_compressed(self._pending.popleft().result())
+
+    def _write_compressed(self, data):
+        self.fileobj.write(data)
+        self.compressed_size += len(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type:
+            self._executor.shutdown()
+            self._closed = True
+        else:
+            self.close()
+
+
 class IgnoreRule(object):  # pylint: disable=too-few-public-methods
     def __init__(self, rule):
 
@@ -145,17 +243,20 @@ def _load_gitignore_file(source_location):
 
 
 def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matching_rule_index, ignore_check):
-    # create a TarInfo object from the file
-    tarinfo = tar.gettarinfo(name, arcname)
+    # check if the file/dir is ignored before touching the file system
+    ignored, matching_rule_index, skip_children = ignore_check(
+        arcname.replace(os.sep, "/"), parent_ignored, parent_matching_rule_index)
 
-    if tarinfo is None:
-        raise CLIError("tarfile: unsupported type {}".format(name))
+    if ignored:
+        if skip_children or not os.path.isdir(name) or os.path.islink(name):
+            return
+    else:
+        # create a TarInfo object from the file
+        tarinfo = tar.gettarinfo(name, arcname)
 
-    # check if the file/dir is ignored
-    ignored, matching_rule_index = ignore_check(
-        tarinfo, parent_ignored, parent_matching_rule_index)
+        if tarinfo is None:
+            raise CLIError("tarfile: unsupported type {}".format(name))
 
-    if not ignored:
         # append the tar header and data to the archive
         if tarinfo.isreg():
             with open(name, "rb") as f:
@@ -163,12 +264,14 @@ def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matchin
         else:
             tar.addfile(tarinfo)
 
+        if not tarinfo.isdir():
+            return
+
     # even the dir is ignored, its child items can still be included, so continue to scan
-    if tarinfo.isdir():
-        for f in os.listdir(name):
-            _archive_file_recursively(tar, os.path.join(name, f), os.path.join(arcname, f),
-                                      parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
-                                      ignore_check=ignore_check)
+    for f in os.listdir(name):
+        _archive_file_recursively(tar, os.path.join(name, f), os.path.join(arcname, f),
+                                  parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
+                                  ignore_check=ignore_check)
 
 
 def get_blob_info(blob_sas_url):
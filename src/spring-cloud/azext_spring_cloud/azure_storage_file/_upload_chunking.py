@@ -6,13 +6,14 @@
 
 # pylint: disable=too-few-public-methods, too-many-instance-attributes
 
+import mmap
 import threading
 import concurrent.futures
 
 
 def _upload_file_chunks(file_service, share_name, directory_name, file_name,
                         file_size, block_size, stream, max_connections,
-                        progress_callback, validate_content, timeout):
+                        progress_callback, validate_content, timeout, completed_ranges=None):
     uploader = _FileChunkUploader(
         file_service,
         share_name,
@@ -24,16 +25,17 @@ def _upload_file_chunks(file_service, share_name, directory_name, file_name,
         max_connections > 1,
         progress_callback,
         validate_content,
-        timeout
+        timeout,
+        completed_ranges
     )
 
     if progress_callback is not None:
         progress_callback(0, file_size)
 
     if max_connections > 1:
-        executor = concurrent.futures.ThreadPoolExecutor(max_connections)
-        range_ids = list(executor.map(uploader.process_chunk,
-                                      uploader.get_chunk_offsets()))
+        with concurrent.futures.ThreadPoolExecutor(max_connections) as executor:
+            range_ids = list(executor.map(uploader.process_chunk,
+                                          uploader.get_chunk_offsets()))
     else:
         if file_size is not None:
             range_ids = [uploader.process_chunk(
@@ -47,7 +49,7 @@ def _upload_file_chunks(file_service, share_name, directory_name, file_name,
 class _FileChunkUploader(object):
     def __init__(self, file_service, share_name, directory_name, file_name,
                  file_size, chunk_size, stream, parallel, progress_callback,
-                 validate_content, timeout):
+                 validate_content, timeout, completed_ranges=None):
         self.file_service = file_service
         self.share_name = share_name
         self.directory_name = directory_name
@@ -55,13 +57,20 @@ class _FileChunkUploader(object):
         self.file_size = file_size
         self.chunk_size = chunk_size
         self.stream = stream
-        self.stream_start = stream.tell() if parallel else None
-        self.stream_lock = threading.Lock() if parallel else None
+        # a memory-mapped file is sliced directly, workers don't need to share the seek position
+        self.memory_mapped = isinstance(stream, mmap.mmap)
+        self.stream_start = stream.tell() if parallel or self.memory_mapped or completed_ranges else None
+        self.stream_lock = threading.Lock() if parallel and not self.memory_mapped else None
         self.progress_callback = progress_callback
         self.progress_total = 0
         self.progress_lock = threading.Lock() if parallel else None
         self.validate_content = validate_content
         self.timeout = timeout
+        # offsets of the ranges already uploaded, filled in as ranges complete so that an interrupted upload
+        # can be resumed by calling again with the same set
+        self.completed_ranges = completed_ranges
+        if completed_ranges and file_size is not None:
+            self.progress_total = sum(min(chunk_size, file_size - offset) for offset in completed_ranges)
 
     def get_chunk_offsets(self):
         index = 0
@@ -76,7 +85,8 @@ class _FileChunkUploader(object):
                 index += self.chunk_size
         else:
             while index < self.file_size:
-                yield index
+                if not self.completed_ranges or index not in self.completed_ranges:
+                    yield index
                 index += self.chunk_size
 
     def process_chunk(self, chunk_offset):
@@ -102,11 +112,17 @@ class _FileChunkUploader(object):
         return range_ids
 
     def _read_from_stream(self, offset, count):
+        if self.memory_mapped and offset is not None:
+            start = self.stream_start + offset
+            return self.stream[start:start + count]
         if self.stream_lock is not None:
             with self.stream_lock:
                 self.stream.seek(self.stream_start + offset)
                 data = self.stream.read(count)
         else:
+            if self.completed_ranges and offset is not None:
+                # completed ranges are skipped, so the stream is not read sequentially
+                self.stream.seek(self.stream_start + offset)
             data = self.stream.read(count)
         return data
 
@@ -134,5 +150,7 @@ class _FileChunkUploader(object):
             timeout=self.timeout
         )
         range_id = 'bytes={0}-{1}'.format(chunk_start, chunk_end)
+        if self.completed_ranges is not None:
+            self.completed_ranges.add(chunk_start)
         self._update_progress(len(chunk_data))
         return range_id
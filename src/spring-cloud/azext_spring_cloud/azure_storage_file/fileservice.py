@@ -12,6 +12,7 @@ import sys
 from datetime import datetime
 
 import math
+import mmap
 from os import path
 
 from azure.common import AzureHttpError
@@ -1894,10 +1895,12 @@ class FileService(StorageClient):
     def create_file_from_path(self, share_name, directory_name, file_name,
                               local_file_path, content_settings=None,
                               metadata=None, validate_content=False, progress_callback=None,
-                              max_connections=2, file_permission=None, smb_properties=SMBProperties(), timeout=None):
+                              max_connections=2, file_permission=None, smb_properties=SMBProperties(), timeout=None,
+                              completed_ranges=None):
         '''
         Creates a new azure file from a local file path, or updates the content of an
-        existing file, with automatic chunking and progress notifications.
+        existing file, with automatic chunking and progress notifications. The local
+        file is memory-mapped, so parallel connections read their ranges independently.
 
         :param str share_name:
             Name of existing share.
@@ -1934,6 +1937,11 @@ class FileService(StorageClient):
             The timeout parameter is expressed in seconds. This method may make
             multiple calls to the Azure service and the timeout will apply to
             each call individually.
+        :param set completed_ranges:
+            Offsets of the ranges that are already uploaded. When it is not empty the file
+            is not created again and only the missing ranges are put. The offsets of the
+            ranges put by this call are added to it, so that an interrupted upload can be
+            resumed by calling again with the same set.
         '''
         _validate_not_none('share_name', share_name)
         _validate_not_none('file_name', file_name)
@@ -1941,10 +1949,17 @@ class FileService(StorageClient):
 
         count = path.getsize(local_file_path)
         with open(local_file_path, 'rb') as stream:
-            self.create_file_from_stream(
-                share_name, directory_name, file_name, stream,
-                count, content_settings, metadata, validate_content, progress_callback,
-                max_connections, file_permission=file_permission, smb_properties=smb_properties, timeout=timeout)
+            if count:
+                stream = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                self.create_file_from_stream(
+                    share_name, directory_name, file_name, stream,
+                    count, content_settings, metadata, validate_content, progress_callback,
+                    max_connections, file_permission=file_permission, smb_properties=smb_properties, timeout=timeout,
+                    completed_ranges=completed_ranges)
+            finally:
+                if count:
+                    stream.close()
 
     def create_file_from_text(self, share_name, directory_name, file_name,
                               text, encoding='utf-8', content_settings=None,
@@ -2073,7 +2088,7 @@ class FileService(StorageClient):
             self, share_name, directory_name, file_name, stream, count,
             content_settings=None, metadata=None, validate_content=False,
             progress_callback=None, max_connections=2, timeout=None,
-            file_permission=None, smb_properties=SMBProperties()):
+            file_permission=None, smb_properties=SMBProperties(), completed_ranges=None):
         '''
         Creates a new file from a file/stream, or updates the content of an
         existing file, with automatic chunking and progress notifications.
@@ -2117,6 +2132,10 @@ class FileService(StorageClient):
             The timeout parameter is expressed in seconds. This method may make
             multiple calls to the Azure service and the timeout will apply to
             each call individually.
+        :param set completed_ranges:
+            Offsets of the ranges that are already uploaded. When it is not empty the file
+            is not created again and only the missing ranges are put. The offsets of the
+            ranges put by this call are added to it.
         '''
         _validate_not_none('share_name', share_name)
         _validate_not_none('file_name', file_name)
@@ -2126,17 +2145,18 @@ class FileService(StorageClient):
         if count < 0:
             raise TypeError(_ERROR_VALUE_NEGATIVE.format('count'))
 
-        self.create_file(
-            share_name,
-            directory_name,
-            file_name,
-            count,
-            content_settings,
-            metadata,
-            file_permission=file_permission,
-            smb_properties=smb_properties,
-            timeout=timeout
-        )
+        if not completed_ranges:
+            self.create_file(
+                share_name,
+                directory_name,
+                file_name,
+                count,
+                content_settings,
+                metadata,
+                file_permission=file_permission,
+                smb_properties=smb_properties,
+                timeout=timeout
+            )
 
         _upload_file_chunks(
             self,
@@ -2149,7 +2169,8 @@ class FileService(StorageClient):
             max_connections,
             progress_callback,
             validate_content,
-            timeout
+            timeout,
+            completed_ranges
         )
 
     def _get_file(self, share_name, directory_name, file_name,
@@ -0,0 +1,79 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    from unittest import mock
+
+from azure.common import AzureException
+from ..._deployment_uploadable_factory import FileUpload
+
+
+class FakeShare(object):
+    def __init__(self, fail_at=None):
+        self.content = bytearray()
+        self.creates = 0
+        self.puts = []
+        self.fail_at = fail_at
+        self.lock = threading.Lock()
+
+    def create_file(self, share_name, directory_name, file_name, content_length, *_, **__):
+        self.creates += 1
+        self.content = bytearray(content_length)
+
+    def update_range(self, share_name, directory_name, file_name, data, start_range, end_range, *_, **__):
+        with self.lock:
+            if start_range == self.fail_at:
+                self.fail_at = None
+                raise AzureException('connection reset')
+            self.puts.append(start_range)
+            self.content[start_range:end_range + 1] = data
+
+
+class TestFileUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.artifact_path = os.path.join(self.folder, 'app.jar')
+        self.data = os.urandom(10 * 1024 + 17)
+        with open(self.artifact_path, 'wb') as f:
+            f.write(self.data)
+
+    def _upload(self, share, **kwargs):
+        upload_url = 'https://account.file.core.windows.net/share/dir/app.jar?sv=sas'
+        uploader = FileUpload(upload_url, range_size=1024, **kwargs)
+        with mock.patch('azext_spring_cloud.azure_storage_file.FileService.create_file', share.create_file), \
+                mock.patch('azext_spring_cloud.azure_storage_file.FileService.update_range', share.update_range):
+            uploader.upload_and_build(artifact_path=self.artifact_path)
+
+    def test_upload_in_parallel_ranges(self):
+        share = FakeShare()
+        self._upload(share, max_connections=4)
+        self.assertEqual(bytes(share.content), self.data)
+        self.assertEqual(sorted(share.puts), list(range(0, len(self.data), 1024)))
+
+    def test_upload_resumes_missing_ranges(self):
+        share = FakeShare(fail_at=5 * 1024)
+        self._upload(share, max_connections=1)
+        self.assertEqual(bytes(share.content), self.data)
+        # the file is created once and every range is put exactly once
+        self.assertEqual(share.creates, 1)
+        self.assertEqual(sorted(share.puts), list(range(0, len(self.data), 1024)))
+
+    def test_upload_gives_up_after_attempts(self):
+        share = FakeShare(fail_at=0)
+        with self.assertRaises(AzureException):
+            self._upload(share, attempts=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
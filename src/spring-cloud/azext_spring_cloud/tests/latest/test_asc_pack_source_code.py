@@ -0,0 +1,66 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import gzip
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from ..._utils import _pack_source_code, ParallelGzipFile
+
+
+class TestParallelGzipFile(unittest.TestCase):
+
+    def test_blocks_form_a_single_gzip_member(self):
+        data = b''.join(str(i).encode() for i in range(1000000))
+        output = io.BytesIO()
+        with ParallelGzipFile(output, max_workers=4) as gz:
+            for i in range(0, len(data), 100000):
+                gz.write(data[i:i + 100000])
+        self.assertEqual(gzip.decompress(output.getvalue()), data)
+        self.assertEqual(gz.compressed_size, len(output.getvalue()))
+
+    def test_empty_input(self):
+        output = io.BytesIO()
+        with ParallelGzipFile(output):
+            pass
+        self.assertEqual(gzip.decompress(output.getvalue()), b'')
+
+
+class TestPackSourceCode(unittest.TestCase):
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        for path in ['src/App.java', 'src/App.class', 'build/out.log', 'logs/a.log', 'logs/keep/b.txt',
+                     'docs/readme.txt', '.git/HEAD', 'target/app.jar']:
+            self._write(path, path)
+
+    def _write(self, path, content):
+        full_path = os.path.join(self.source, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w') as f:
+            f.write(content)
+
+    def _pack(self):
+        tar_file_path = os.path.join(tempfile.mkdtemp(), 'archive.tar.gz')
+        self.addCleanup(shutil.rmtree, os.path.dirname(tar_file_path))
+        _pack_source_code(self.source, tar_file_path)
+        with tarfile.open(tar_file_path, 'r:gz') as tar:
+            return sorted(m.name for m in tar.getmembers() if m.isreg())
+
+    def test_pack_without_gitignore(self):
+        self.assertEqual(self._pack(), ['build/out.log', 'docs/readme.txt', 'logs/a.log', 'logs/keep/b.txt',
+                                        'src/App.class', 'src/App.java'])
+
+    def test_pack_with_gitignore(self):
+        self._write('.gitignore', '**/*.class\nbuild\nlogs/**\n!logs/keep/*.txt\n')
+        self.assertEqual(self._pack(), ['docs/readme.txt', 'logs/keep/b.txt', 'src/App.java'])
+
+
+if __name__ == '__main__':
+    unittest.main()
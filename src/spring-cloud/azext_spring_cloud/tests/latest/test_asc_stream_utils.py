@@ -0,0 +1,69 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import time
+import unittest
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    from unittest import mock
+
+from ..._stream_utils import _stream_logs, DEFAULT_CHUNK_SIZE
+
+
+class FakeBlobService(object):
+    def __init__(self, content):
+        self.content = content
+        self.reads = 0
+
+    def exists(self, **_):
+        return True
+
+    def get_blob_properties(self, **_):
+        props = mock.MagicMock()
+        props.metadata = {'__complete_status': 'Succeeded'}
+        props.properties.content_length = len(self.content)
+        return props
+
+    def get_blob_to_stream(self, start_range, end_range, stream, **_):
+        self.reads += 1
+        stream.write(self.content[start_range:end_range + 1])
+
+
+def _stream(content):
+    lines = []
+    blob_service = FakeBlobService(content)
+    _stream_logs(True, DEFAULT_CHUNK_SIZE, 60, blob_service, 'container', 'blob', True, lines.append)
+    return lines, blob_service
+
+
+class TestStreamLogs(unittest.TestCase):
+
+    def test_stream_logs_split_lines(self):
+        lines, _ = _stream(b'first\r\nsecond\r\nthird\nlast')
+        self.assertEqual(lines, ['first\r\nsecond\r\nthird\n', 'last', 'Log status was: succeeded'])
+
+    def test_stream_logs_crlf_across_reads(self):
+        content = b'a' * (DEFAULT_CHUNK_SIZE - 1) + b'\r\n' + b'b' * 10
+        blob_service = FakeBlobService(content)
+        lines = []
+        with mock.patch('azext_spring_cloud._stream_utils.MAX_CHUNK_SIZE', DEFAULT_CHUNK_SIZE):
+            _stream_logs(True, DEFAULT_CHUNK_SIZE, 60, blob_service, 'container', 'blob', True, lines.append)
+        self.assertEqual(lines, ['a' * (DEFAULT_CHUNK_SIZE - 1) + '\r', 'b' * 10, 'Log status was: succeeded'])
+
+    def test_stream_logs_large_backlog_is_read_in_big_ranges(self):
+        content = b'x' * (8 * 1024 * 1024) + b'\n' + b'line\n' * 100000
+        start = time.time()
+        lines, blob_service = _stream(content)
+        elapsed = time.time() - start
+
+        self.assertEqual(''.join(lines[:-1]).encode(), content)
+        self.assertLessEqual(blob_service.reads, 4)
+        # the whole log is handled in linear time, the old splitter needed minutes for a line this long
+        self.assertLess(elapsed, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -108,6 +108,11 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
     timeout_type = CLIArgumentType(
         help='Request timeout in seconds. Applies to each call to the service.', type=int
     )
+    batch_concurrency_type = CLIArgumentType(
+        type=int, options_list='--max-concurrency', is_preview=True,
+        help='The maximum number of blobs to transfer at the same time. Raising it speeds up batches of many small '
+             'files, whose transfer time is bound by request latency rather than bandwidth.'
+    )
     t_delete_snapshots = self.get_sdk('_generated.models#DeleteSnapshotsOptionType',
                                       resource_type=CUSTOM_DATA_STORAGE_BLOB)
     delete_snapshots_type = CLIArgumentType(
@@ -206,6 +211,9 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('source', options_list=('--source', '-s'))
         c.argument('delete_snapshots', delete_snapshots_type)
         c.argument('lease_id', help='The active lease id for the blob.')
+        c.argument('batch_concurrency', batch_concurrency_type,
+                   help='The maximum number of batch delete requests in flight at the same time. Each batch '
+                        'request deletes up to 256 blobs.')
 
     with self.argument_context('storage blob download') as c:
         c.register_blob_arguments()
@@ -243,6 +251,7 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('source', options_list=('--source', '-s'))
         c.extra('max_concurrency', options_list='--max-connections', type=int, default=2,
                 help='The number of parallel connections with which to download.')
+        c.argument('batch_concurrency', batch_concurrency_type)
         c.extra('no_progress', progress_type)
 
     with self.argument_context('storage blob exists') as c:
@@ -479,6 +488,13 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('destination', options_list=('--destination', '-d'))
         c.argument('max_connections', type=int,
                    help='Maximum number of parallel connections to use when the blob size exceeds 64MB.')
+        c.argument('batch_concurrency', batch_concurrency_type)
+        c.argument('skip_unchanged', action='store_true', is_preview=True,
+                   help='Only upload the files whose blob is missing or differs in size or Content-MD5. Blobs '
+                        'without Content-MD5 are always uploaded again.')
+        c.argument('delete_orphans', action='store_true', is_preview=True,
+                   help='Used with --skip-unchanged. Delete the blobs under the destination path that match the '
+                        'pattern but have no corresponding local file.')
         c.argument('maxsize_condition', arg_group='Content Control')
         c.argument('validate_content', action='store_true', min_api='2016-05-31', arg_group='Content Control')
         c.argument('blob_type', options_list=('--type', '-t'), arg_type=get_enum_type(get_blob_types()))
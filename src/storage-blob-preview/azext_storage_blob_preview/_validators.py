@@ -1115,6 +1115,10 @@ def process_blob_upload_batch_parameters(cmd, namespace):
     if not os.path.exists(namespace.source) or not os.path.isdir(namespace.source):
         raise ValueError('incorrect usage: source must be an existing directory')
 
+    if namespace.delete_orphans and not namespace.skip_unchanged:
+        from azure.cli.core.azclierror import ArgumentUsageError
+        raise ArgumentUsageError('usage error: --delete-orphans can only be used with --skip-unchanged')
+
     # 2. try to extract account name and container name from destination string
     _process_blob_batch_container_parameters(cmd, namespace, source=False)
 
@@ -17,7 +17,7 @@ from ..util import (create_file_share_from_storage_client,
                     create_short_lived_share_sas,
                     filter_none, collect_blobs, collect_blob_objects, collect_files,
                     mkdir_p, guess_content_type, normalize_blob_file_path,
-                    check_precondition_success)
+                    check_precondition_success, run_batch_transfer, BatchProgressReporter)
 from ..profiles import CUSTOM_DATA_STORAGE_BLOB
 
 logger = get_logger(__name__)
@@ -176,7 +176,7 @@ def storage_blob_copy_batch(cmd, client, source_client, container_name=None,
 
 # pylint: disable=unused-argument, too-many-locals
 def storage_blob_download_batch(client, source, destination, container_name, pattern=None, dryrun=False,
-                                progress_callback=None, socket_timeout=None, **kwargs):
+                                progress_callback=None, socket_timeout=None, batch_concurrency=1, **kwargs):
     source_blobs = collect_blobs(client, container_name, pattern)
     blobs_to_download = {}
     for blob_name in source_blobs:
@@ -201,23 +201,21 @@ def storage_blob_download_batch(client, source, destination, container_name, pat
             logger.warning('  - %s', b)
 
     else:
+        from azure.cli.core.azclierror import FileOperationError
+
         @check_precondition_success
         def _download_blob(*args, **kwargs):
             blob = download_blob(*args, **kwargs)
             return blob.name
 
-        # Tell progress reporter to reuse the same hook
-        if progress_callback:
-            progress_callback.reuse = True
-
-        for index, blob_normed in enumerate(blobs_to_download):
-            from azure.cli.core.azclierror import FileOperationError
-            # add blob name and number to progress message
-            if progress_callback:
-                progress_callback.message = '{}/{}: "{}"'.format(
-                    index + 1, len(blobs_to_download), blobs_to_download[blob_normed])
-            blob_client = client.get_blob_client(container=container_name,
-                                                 blob=blobs_to_download[blob_normed])
+        # One progress bar for the whole batch instead of one per blob
+        reporter = BatchProgressReporter(progress_callback.hook, len(blobs_to_download), 'download_stream_current',
+                                         status_codes=(200, 201, 206)) if progress_callback else None
+
+        def _download_one(indexed_blob):
+            index, blob_normed = indexed_blob
+            blob_name = blobs_to_download[blob_normed]
+            blob_client = client.get_blob_client(container=container_name, blob=blob_name)
             destination_path = os.path.join(destination, os.path.normpath(blob_normed))
             destination_folder = os.path.dirname(destination_path)
             # Failed when there is same name for file and folder
@@ -226,14 +224,23 @@ def storage_blob_download_batch(client, source, destination, container_name, pat
                                          "destination folder. ")
             if not os.path.exists(destination_folder):
                 mkdir_p(destination_folder)
-            include, result = _download_blob(client=blob_client, file_path=destination_path,
-                                             progress_callback=progress_callback, **kwargs)
-            if include:
-                results.append(result)
+            file_progress = reporter.file_callback(blob_name) if reporter else None
+            try:
+                include, result = _download_blob(client=blob_client, file_path=destination_path,
+                                                 progress_callback=file_progress, **kwargs)
+            finally:
+                if reporter:
+                    reporter.file_done(blob_name)
+            return index, result if include else None
+
+        # transfers complete out of order when running concurrently, report them in listing order
+        downloaded = sorted(run_batch_transfer(_download_one, enumerate(blobs_to_download),
+                                               max_concurrency=batch_concurrency), key=lambda x: x[0])
+        results = [result for _, result in downloaded if result is not None]
 
         # end progress hook
-        if progress_callback:
-            progress_callback.hook.end()
+        if reporter:
+            reporter.end()
         num_failures = len(blobs_to_download) - len(results)
         if num_failures:
             logger.warning('%s of %s files not downloaded due to "Failed Precondition"',
@@ -247,7 +254,8 @@ def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  #
                               content_settings=None, metadata=None, validate_content=False,
                               maxsize_condition=None, max_connections=2, lease_id=None, progress_callback=None,
                               if_modified_since=None, if_unmodified_since=None, if_match=None,
-                              if_none_match=None, timeout=None, dryrun=False, socket_timeout=None, **kwargs):
+                              if_none_match=None, timeout=None, dryrun=False, socket_timeout=None,
+                              batch_concurrency=1, skip_unchanged=False, delete_orphans=False, **kwargs):
     def _create_return_result(blob_content_settings, upload_result=None):
         return {
             'Blob': client.url,
@@ -258,6 +266,11 @@ def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  #
     source_files = source_files or []
     t_content_settings = cmd.get_models('_models#ContentSettings', resource_type=cmd.command_kwargs['resource_type'])
 
+    if skip_unchanged:
+        source_files = _filter_unchanged_files(client, source, container_name, destination_path, pattern,
+                                               source_files, delete_orphans=delete_orphans, dryrun=dryrun,
+                                               batch_concurrency=batch_concurrency)
+
     results = []
     if dryrun:
         logger.info('upload action: from %s to %s', source, destination)
@@ -274,41 +287,138 @@ def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  #
         def _upload_blob(*args, **kwargs):
             return upload_blob(*args, **kwargs)
 
-        # Tell progress reporter to reuse the same hook
-        if progress_callback:
-            progress_callback.reuse = True
+        # One progress bar for the whole batch instead of one per blob
+        reporter = BatchProgressReporter(progress_callback.hook, len(source_files), 'upload_stream_current') \
+            if progress_callback else None
 
-        for index, source_file in enumerate(source_files):
-            src, dst = source_file
-            # logger.warning('uploading %s', src)
+        def _upload_one(indexed_source_file):
+            index, (src, dst) = indexed_source_file
             guessed_content_settings = guess_content_type(src, content_settings, t_content_settings)
+            blob_name = normalize_blob_file_path(destination_path, dst)
+            blob_client = client.get_blob_client(container=container_name, blob=blob_name)
+            file_progress = reporter.file_callback(blob_name) if reporter else None
+            try:
+                include, result = _upload_blob(cmd, blob_client, file_path=src,
+                                               blob_type=blob_type, content_settings=guessed_content_settings,
+                                               metadata=metadata, validate_content=validate_content,
+                                               maxsize_condition=maxsize_condition, max_connections=max_connections,
+                                               lease_id=lease_id, progress_callback=file_progress,
+                                               if_modified_since=if_modified_since,
+                                               if_unmodified_since=if_unmodified_since, if_match=if_match,
+                                               if_none_match=if_none_match, timeout=timeout, **kwargs)
+            finally:
+                if reporter:
+                    reporter.file_done(blob_name)
+            if not include:
+                return index, None
+            return index, _create_return_result(blob_content_settings=guessed_content_settings, upload_result=result)
+
+        # transfers complete out of order when running concurrently, report them in source order
+        uploaded = sorted(run_batch_transfer(_upload_one, enumerate(source_files), max_concurrency=batch_concurrency),
+                          key=lambda x: x[0])
+        results = [result for _, result in uploaded if result is not None]
 
-            # add blob name and number to progress message
-            if progress_callback:
-                progress_callback.message = '{}/{}: "{}"'.format(
-                    index + 1, len(source_files), normalize_blob_file_path(destination_path, dst))
-            blob_client = client.get_blob_client(container=container_name,
-                                                 blob=normalize_blob_file_path(destination_path, dst))
-            include, result = _upload_blob(cmd, blob_client, file_path=src,
-                                           blob_type=blob_type, content_settings=guessed_content_settings,
-                                           metadata=metadata, validate_content=validate_content,
-                                           maxsize_condition=maxsize_condition, max_connections=max_connections,
-                                           lease_id=lease_id, progress_callback=progress_callback,
-                                           if_modified_since=if_modified_since,
-                                           if_unmodified_since=if_unmodified_since, if_match=if_match,
-                                           if_none_match=if_none_match, timeout=timeout, **kwargs)
-            if include:
-                results.append(_create_return_result(blob_content_settings=guessed_content_settings,
-                                                     upload_result=result))
         # end progress hook
-        if progress_callback:
-            progress_callback.hook.end()
+        if reporter:
+            reporter.end()
         num_failures = len(source_files) - len(results)
         if num_failures:
             logger.warning('%s of %s files not uploaded due to "Failed Precondition"', num_failures, len(source_files))
     return results
 
 
+def _get_upload_manifest_path(source, container_name, account_name):
+    import hashlib
+    from azure.cli.core._config import GLOBAL_CONFIG_DIR
+    key = '{}|{}|{}'.format(os.path.normcase(source), account_name, container_name)
+    return os.path.join(GLOBAL_CONFIG_DIR, 'storage-blob-preview', 'upload-batch',
+                        hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def _load_upload_manifest(manifest_path):
+    import json
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_upload_manifest(manifest_path, manifest):
+    import json
+    mkdir_p(os.path.dirname(manifest_path))
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+
+# pylint: disable=too-many-locals
+def _filter_unchanged_files(client, source, container_name, destination_path, pattern, source_files,
+                            delete_orphans=False, dryrun=False, batch_concurrency=1):
+    """
+    Drop the files whose blob is already up to date from source_files. A blob is up to date when it has the size
+    of the local file and the same Content-MD5; a blob without Content-MD5 can't be compared and is uploaded again.
+    Local hashes are cached in a manifest between runs, keyed by the file's size and mtime.
+    Blobs under the destination path that have no local file left are deleted when delete_orphans is set.
+    """
+    import base64
+    from concurrent.futures import ThreadPoolExecutor
+    from fnmatch import fnmatch
+    from ..util import get_file_md5
+
+    local_files = {normalize_blob_file_path(destination_path, dst): src for src, dst in source_files}
+    prefix = normalize_blob_file_path(None, destination_path) + '/' if destination_path else None
+    orphan_pattern = pattern.lstrip('/') if pattern else None
+    orphans, to_hash = [], []
+    # one pass over the listing finds the orphaned blobs and the blobs to compare with their local file
+    container_client = client.get_container_client(container_name)
+    for blob in container_client.list_blobs(name_starts_with=prefix):
+        src = local_files.get(blob.name)
+        if src is None:
+            relative_name = blob.name[len(prefix):] if prefix else blob.name
+            if not orphan_pattern or fnmatch(relative_name, orphan_pattern):
+                orphans.append(blob.name)
+            continue
+        stat = os.stat(src)
+        content_md5 = blob.content_settings.content_md5
+        if stat.st_size == blob.size and content_md5:
+            to_hash.append((blob.name, src, stat, base64.b64encode(content_md5).decode('utf-8')))
+
+    if delete_orphans and dryrun:
+        for blob_name in orphans:
+            logger.warning('  - delete orphan %s', blob_name)
+    elif delete_orphans:
+        def _delete_orphans(blob_names):
+            container_client.delete_blobs(*blob_names)
+            return len(blob_names)
+
+        num_orphans = sum(run_batch_transfer(_delete_orphans, _chunk(orphans, BLOB_BATCH_MAX_SIZE),
+                                             max_concurrency=batch_concurrency))
+        logger.warning('%s orphaned blobs deleted', num_orphans)
+
+    manifest_path = _get_upload_manifest_path(source, container_name, client.account_name)
+    manifest = _load_upload_manifest(manifest_path)
+    new_manifest = {}
+    missing = []
+    for _, src, stat, _ in to_hash:
+        cached = manifest.get(src)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+            new_manifest[src] = cached
+        else:
+            missing.append((src, stat))
+    if missing:
+        # hashlib releases the GIL while it hashes, so threads hash several files at once
+        with ThreadPoolExecutor() as executor:
+            for (src, stat), md5 in zip(missing, executor.map(get_file_md5, [src for src, _ in missing])):
+                new_manifest[src] = [stat.st_size, stat.st_mtime, md5]
+    unchanged = {blob_name for blob_name, src, _, remote_md5 in to_hash if new_manifest[src][2] == remote_md5}
+    if not dryrun:
+        _save_upload_manifest(manifest_path, new_manifest)
+
+    logger.warning('%s of %s files are unchanged and will be skipped', len(unchanged), len(source_files))
+    return [(src, dst) for src, dst in source_files
+            if normalize_blob_file_path(destination_path, dst) not in unchanged]
+
+
 def transform_blob_type(cmd, blob_type):
     """
     get_blob_types() will get ['block', 'page', 'append']
@@ -347,17 +457,32 @@ def _blob_precondition_check(source_blobs, if_modified_since=None, if_unmodified
     from datetime import timezone
     if_modified_since_utc = if_modified_since.replace(tzinfo=timezone.utc) if if_modified_since else None
     if_unmodified_since_utc = if_unmodified_since.replace(tzinfo=timezone.utc) if if_unmodified_since else None
-    result = []
     for blob in source_blobs:
         if not if_modified_since or blob[1].last_modified >= if_modified_since_utc:
             if not if_unmodified_since or blob[1].last_modified <= if_unmodified_since_utc:
-                result.append(blob[0])
-    return result
+                yield blob[0]
+
+
+# The service accepts at most 256 sub-requests in a single blob batch request
+BLOB_BATCH_MAX_SIZE = 256
+
+
+def _chunk(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 
 def storage_blob_delete_batch(client, source, container_name, pattern=None, lease_id=None,
                               delete_snapshots=None, if_modified_since=None, if_unmodified_since=None, if_match=None,
-                              if_none_match=None, timeout=None, dryrun=False, **kwargs):
+                              if_none_match=None, timeout=None, dryrun=False, batch_concurrency=4, **kwargs):
+    import time
+
     @check_precondition_success
     def _delete_blob(blob_name):
         blob_client = client.get_blob_client(container=container_name, blob=blob_name)
@@ -372,7 +497,8 @@ def storage_blob_delete_batch(client, source, container_name, pattern=None, leas
         }
         return blob_client.delete_blob(**delete_blob_args)
 
-    source_blobs = list(collect_blob_objects(client, container_name, pattern))
+    # Blobs are deleted while the listing is still paging in, so nothing below holds the full blob list
+    source_blobs = collect_blob_objects(client, container_name, pattern)
 
     if dryrun:
         delete_blobs = _blob_precondition_check(source_blobs, if_modified_since=if_modified_since,
@@ -380,16 +506,60 @@ def storage_blob_delete_batch(client, source, container_name, pattern=None, leas
         logger.warning('delete action: from %s', source)
         logger.warning('    pattern %s', pattern)
         logger.warning('  container %s', container_name)
-        logger.warning('      total %d', len(delete_blobs))
         logger.warning(' operations')
+        total = 0
         for blob in delete_blobs:
             logger.warning('  - %s', blob)
+            total += 1
+        logger.warning('      total %d', total)
         return []
 
-    results = [result for include, result in (_delete_blob(blob[0]) for blob in source_blobs) if include]
-    num_failures = len(source_blobs) - len(results)
+    if if_match and if_none_match:
+        # a batch sub-request carries a single etag condition, delete the blobs one by one to send both
+        def _delete_chunk(blob_names):
+            results = [_delete_blob(blob_name) for blob_name in blob_names]
+            return len(blob_names), sum(1 for include, _ in results if not include), []
+    else:
+        from azure.core import MatchConditions
+        container_client = client.get_container_client(container_name)
+        etag_conditions = {}
+        if if_match:
+            etag_conditions = {'etag': if_match, 'match_condition': MatchConditions.IfNotModified}
+        elif if_none_match:
+            etag_conditions = {'etag': if_none_match, 'match_condition': MatchConditions.IfModified}
+
+        def _delete_chunk(blob_names):
+            sub_requests = [dict(name=blob_name, lease_id=lease_id, delete_snapshots=delete_snapshots,
+                                 if_modified_since=if_modified_since, if_unmodified_since=if_unmodified_since,
+                                 timeout=timeout, **etag_conditions) for blob_name in blob_names]
+            responses = container_client.delete_blobs(*sub_requests, raise_on_any_failure=False, timeout=timeout)
+            precondition_failures, errors = 0, []
+            for blob_name, response in zip(blob_names, responses):
+                if response.status_code in [304, 412]:
+                    precondition_failures += 1
+                elif response.status_code >= 300:
+                    errors.append((blob_name, response.status_code, response.reason))
+            return len(blob_names), precondition_failures, errors
+
+    start = time.time()
+    total, num_failures, errors = 0, 0, []
+    for chunk_total, chunk_failures, chunk_errors in run_batch_transfer(
+            _delete_chunk, _chunk((blob[0] for blob in source_blobs), BLOB_BATCH_MAX_SIZE),
+            max_concurrency=batch_concurrency):
+        total += chunk_total
+        num_failures += chunk_failures
+        errors.extend(chunk_errors)
+
+    elapsed = time.time() - start
+    logger.info('%s blobs processed in %.1f seconds (%.1f blobs/s)', total, elapsed, total / elapsed if elapsed else 0)
     if num_failures:
-        logger.warning('%s of %s blobs not deleted due to "Failed Precondition"', num_failures, len(source_blobs))
+        logger.warning('%s of %s blobs not deleted due to "Failed Precondition"', num_failures, total)
+    if errors:
+        from azure.cli.core.azclierror import AzureResponseError
+        for blob_name, status_code, reason in errors:
+            logger.info('failed to delete %s: %s %s', blob_name, status_code, reason)
+        raise AzureResponseError('{} of {} blobs failed to be deleted. The first failure is "{}": {} {}'.format(
+            len(errors), total, *errors[0]))
 
 
 def generate_container_shared_access_signature(client, container_name, permission=None,
@@ -0,0 +1,217 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from ...util import run_batch_transfer, BatchProgressReporter
+from ...operations.blob import storage_blob_delete_batch, _filter_unchanged_files
+
+
+class _FakeResponse(object):  # pylint: disable=too-few-public-methods
+    def __init__(self, status_code, current, total):
+        self.http_response = mock.MagicMock(status_code=status_code)
+        self.context = {'upload_stream_current': current, 'data_stream_total': total}
+
+
+class TestBatchTransfer(unittest.TestCase):
+
+    def test_sequential_transfer_keeps_order(self):
+        self.assertEqual(list(run_batch_transfer(lambda x: x * 2, range(5))), [0, 2, 4, 6, 8])
+
+    def test_concurrent_transfer_is_bounded(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def _transfer(item):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.01)
+            with lock:
+                state['running'] -= 1
+            return item
+
+        results = list(run_batch_transfer(_transfer, iter(range(40)), max_concurrency=4))
+        self.assertEqual(sorted(results), list(range(40)))
+        self.assertLessEqual(state['peak'], 4)
+        self.assertGreater(state['peak'], 1)
+
+    def test_concurrent_transfer_raises_first_error(self):
+        def _transfer(item):
+            if item == 3:
+                raise ValueError('boom')
+            return item
+
+        with self.assertRaises(ValueError):
+            list(run_batch_transfer(_transfer, range(10), max_concurrency=4))
+
+    def test_concurrent_transfers_overlap(self):
+        # each transfer only returns once max_concurrency of them are in flight at the same time, so the batch
+        # completes only if the transfers overlap, however slow the machine running the test
+        barrier = threading.Barrier(10, timeout=10)
+
+        def _transfer(item):
+            barrier.wait()
+            return item
+
+        results = list(run_batch_transfer(_transfer, range(50), max_concurrency=10))
+        self.assertEqual(sorted(results), list(range(50)))
+        self.assertFalse(barrier.broken)
+
+    def test_progress_reporter_aggregates_files(self):
+        hook = mock.MagicMock()
+        reporter = BatchProgressReporter(hook, 2, 'upload_stream_current')
+        first, second = reporter.file_callback('a'), reporter.file_callback('b')
+
+        first(_FakeResponse(201, 50, 100))
+        second(_FakeResponse(201, 100, 300))
+        hook.add.assert_called_with(message='0/2 files', value=150, total_val=400)
+
+        first(_FakeResponse(201, 100, 100))
+        reporter.file_done('a')
+        hook.add.assert_called_with(message='1/2 files', value=200, total_val=400)
+
+        # failed responses are not counted
+        second(_FakeResponse(412, 300, 300))
+        hook.add.assert_called_with(message='1/2 files', value=200, total_val=400)
+
+        reporter.end()
+        hook.end.assert_called_once()
+
+
+class TestBlobDeleteBatch(unittest.TestCase):
+
+    @staticmethod
+    def _client(blob_count, status_codes):
+        client = mock.MagicMock()
+        container_client = client.get_container_client.return_value
+        blobs = []
+        for i in range(blob_count):
+            blob = mock.MagicMock()
+            blob.name = 'blob_{}'.format(i)
+            blobs.append(blob)
+        container_client.list_blobs.return_value = iter(blobs)
+        container_client.delete_blobs.side_effect = lambda *blobs, **kwargs: iter(
+            [mock.MagicMock(status_code=status_codes(blob['name']), reason='reason') for blob in blobs])
+        return client, container_client
+
+    def test_delete_batch_groups_sub_requests(self):
+        client, container_client = self._client(600, lambda _: 202)
+        storage_blob_delete_batch(client, 'source', 'container', pattern='*')
+        batch_sizes = sorted(len(c[0]) for c in container_client.delete_blobs.call_args_list)
+        self.assertEqual(batch_sizes, [88, 256, 256])
+
+    def test_delete_batch_sends_etag_conditions_per_sub_request(self):
+        from azure.core import MatchConditions
+        client, container_client = self._client(10, lambda _: 202)
+        storage_blob_delete_batch(client, 'source', 'container', pattern='*', if_none_match='*')
+        sub_requests = container_client.delete_blobs.call_args[0]
+        self.assertEqual(10, len(sub_requests))
+        for sub_request in sub_requests:
+            self.assertEqual('*', sub_request['etag'])
+            self.assertEqual(MatchConditions.IfModified, sub_request['match_condition'])
+        client.get_blob_client.assert_not_called()
+
+    def test_delete_batch_counts_precondition_failures(self):
+        client, _ = self._client(10, lambda name: 412 if name.endswith('3') else 202)
+        with mock.patch('azext_storage_blob_preview.operations.blob.logger') as logger:
+            storage_blob_delete_batch(client, 'source', 'container', pattern='*')
+        logger.warning.assert_called_with('%s of %s blobs not deleted due to "Failed Precondition"', 1, 10)
+
+    def test_delete_batch_reports_other_failures(self):
+        from azure.cli.core.azclierror import AzureResponseError
+        client, _ = self._client(10, lambda name: 404 if name.endswith('5') else 202)
+        with self.assertRaisesRegex(AzureResponseError, '1 of 10 blobs'):
+            storage_blob_delete_batch(client, 'source', 'container', pattern='*')
+
+
+class TestBlobUploadBatchSkipUnchanged(unittest.TestCase):
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.manifest_path = os.path.join(self.source, 'manifest', 'manifest.json')
+        patcher = mock.patch('azext_storage_blob_preview.operations.blob._get_upload_manifest_path',
+                             return_value=self.manifest_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write(self, name, content):
+        path = os.path.join(self.source, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path, name
+
+    @staticmethod
+    def _blob(name, content, content_md5=True):
+        blob = mock.MagicMock(size=len(content))
+        blob.name = name
+        blob.content_settings.content_md5 = bytearray(hashlib.md5(content).digest()) if content_md5 else None
+        return blob
+
+    def _client(self, blobs):
+        client = mock.MagicMock()
+        client.get_container_client.return_value.list_blobs.side_effect = lambda **kwargs: iter(blobs)
+        return client
+
+    def test_skip_unchanged_files(self):
+        source_files = [self._write('same.txt', b'same'), self._write('changed.txt', b'new!'),
+                        self._write('new.txt', b'new')]
+        client = self._client([self._blob('dir/same.txt', b'same'), self._blob('dir/changed.txt', b'old!'),
+                               self._blob('dir/orphan.txt', b'orphan')])
+
+        to_upload = _filter_unchanged_files(client, self.source, 'container', 'dir', None, source_files)
+        self.assertEqual([dst for _, dst in to_upload], ['changed.txt', 'new.txt'])
+        client.get_container_client.return_value.delete_blobs.assert_not_called()
+
+        with open(self.manifest_path) as f:
+            self.assertEqual(len(json.load(f)), 2)
+        # a second run is answered from the manifest
+        with mock.patch('azext_storage_blob_preview.util.get_file_md5') as get_file_md5:
+            to_upload = _filter_unchanged_files(client, self.source, 'container', 'dir', None, source_files)
+        get_file_md5.assert_not_called()
+        self.assertEqual([dst for _, dst in to_upload], ['changed.txt', 'new.txt'])
+
+    def test_blobs_without_content_md5_are_uploaded(self):
+        source_files = [self._write('same.txt', b'same')]
+        blob = self._blob('same.txt', b'same', content_md5=False)
+        blob.last_modified.timestamp.return_value = os.stat(source_files[0][0]).st_mtime + 3600
+        to_upload = _filter_unchanged_files(self._client([blob]), self.source, 'container', None, None, source_files)
+        self.assertEqual(to_upload, source_files)
+
+    def test_skip_unchanged_deletes_orphans(self):
+        source_files = [self._write('same.txt', b'same')]
+        client = self._client([self._blob('same.txt', b'same'), self._blob('orphan.txt', b'orphan'),
+                               self._blob('orphan.log', b'orphan')])
+
+        to_upload = _filter_unchanged_files(client, self.source, 'container', None, '*.txt', source_files,
+                                            delete_orphans=True)
+        self.assertEqual(to_upload, [])
+        client.get_container_client.return_value.delete_blobs.assert_called_once_with('orphan.txt')
+
+    def test_dryrun_lists_orphans_without_deleting_them(self):
+        source_files = [self._write('same.txt', b'same'), self._write('changed.txt', b'new!')]
+        client = self._client([self._blob('same.txt', b'same'), self._blob('changed.txt', b'old!'),
+                               self._blob('orphan.txt', b'orphan')])
+
+        with mock.patch('azext_storage_blob_preview.operations.blob.logger') as logger:
+            to_upload = _filter_unchanged_files(client, self.source, 'container', None, None, source_files,
+                                                delete_orphans=True, dryrun=True)
+        self.assertEqual([dst for _, dst in to_upload], ['changed.txt'])
+        logger.warning.assert_any_call('  - delete orphan %s', 'orphan.txt')
+        client.get_container_client.return_value.delete_blobs.assert_not_called()
+        self.assertFalse(os.path.exists(self.manifest_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
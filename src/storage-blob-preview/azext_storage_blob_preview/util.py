@@ -235,3 +235,94 @@ def check_precondition_success(func):
                 raise
             return False, None
     return wrapper
+
+
+def get_file_md5(file_path):
+    """Return the base64 encoded MD5 of a local file, in the format of the Content-MD5 of a blob."""
+    import base64
+    import hashlib
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(4 * 1024 * 1024), b''):
+            md5.update(chunk)
+    return base64.b64encode(md5.digest()).decode('utf-8')
+
+
+def run_batch_transfer(action, items, max_concurrency=1):
+    """
+    Apply action to each of the items with at most max_concurrency calls in flight, yielding the results in the
+    order the calls complete. Items are pulled from the iterable lazily, so it can be a generator over a listing.
+    The first exception raised by an action is re-raised once the calls already in flight have settled.
+    """
+    if not max_concurrency or max_concurrency <= 1:
+        for item in items:
+            yield action(item)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        in_flight = set()
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < max_concurrency:
+                try:
+                    in_flight.add(executor.submit(action, next(items)))
+                except StopIteration:
+                    exhausted = True
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+class BatchProgressReporter(object):  # pylint: disable=too-few-public-methods
+    """
+    Aggregate the progress of the transfers of a batch command into a single progress bar. Each transfer gets its
+    own raw_response_hook from file_callback(); the hooks may be invoked from several threads at once.
+    """
+
+    def __init__(self, hook, total_files, current_key, status_codes=(200, 201)):
+        import threading
+        self.hook = hook
+        self._lock = threading.Lock()
+        self._total_files = total_files
+        self._current_key = current_key
+        self._status_codes = status_codes
+        self._files_done = 0
+        self._bytes_current = 0
+        self._bytes_total = 0
+        self._file_current = {}
+        self._file_total = {}
+
+    def file_callback(self, name):
+        def _update_progress(response):
+            if response.http_response.status_code not in self._status_codes:
+                return
+            total = response.context['data_stream_total']
+            if not total:
+                return
+            current = response.context[self._current_key]
+            with self._lock:
+                self._bytes_current += current - self._file_current.get(name, 0)
+                self._bytes_total += total - self._file_total.get(name, 0)
+                self._file_current[name] = current
+                self._file_total[name] = total
+                self._report()
+        return _update_progress
+
+    def file_done(self, name):
+        with self._lock:
+            self._files_done += 1
+            self._file_current.pop(name, None)
+            self._file_total.pop(name, None)
+            self._report()
+
+    def end(self):
+        self.hook.end()
+
+    def _report(self):
+        if self._bytes_total:
+            self.hook.add(message='{}/{} files'.format(self._files_done, self._total_files),
+                          value=self._bytes_current, total_val=self._bytes_total)
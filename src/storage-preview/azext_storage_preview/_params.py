@@ -672,6 +672,9 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('source', options_list=('--source', '-s'), validator=process_file_upload_batch_parameters)
         c.argument('destination', options_list=('--destination', '-d'))
         c.argument('max_connections', arg_group='Upload Control', type=int)
+        c.argument('batch_concurrency', options_list='--max-concurrency', arg_group='Upload Control', type=int,
+                   is_preview=True,
+                   help='The maximum number of files to upload at the same time. Default to 4.')
         c.argument('validate_content', action='store_true', min_api='2016-05-31')
         c.register_content_settings_argument(t_file_content_settings, update=False, arg_group='Content Settings',
                                              process_md5=True)
@@ -31,10 +31,11 @@ def storage_file_upload(client, local_file_path, content_settings=None,
 
 def storage_file_upload_batch(cmd, client, destination, source, destination_path=None, pattern=None, dryrun=False,
                               validate_content=False, content_settings=None, max_connections=1, metadata=None,
-                              progress_callback=None):
+                              progress_callback=None, batch_concurrency=4):
     """ Upload local files to Azure Storage File Share in batch """
 
-    from ..util import glob_files_locally, normalize_blob_file_path, guess_content_type
+    from concurrent.futures import ThreadPoolExecutor
+    from ..util import glob_files_locally, normalize_blob_file_path, guess_content_type, BatchProgressReporter
     from ..track2_util import make_file_url
 
     source_files = [c for c in glob_files_locally(source, pattern)]
@@ -50,23 +51,53 @@ def storage_file_upload_batch(cmd, client, destination, source, destination_path
                  'Type': guess_content_type(src, content_settings, settings_class).content_type} for src, dst in
                 source_files]
 
-    # TODO: Performance improvement
-    # 1. Upload files in parallel
-    def _upload_action(src, dst):
-        dst = normalize_blob_file_path(destination_path, dst)
-        dir_name = os.path.dirname(dst)
-        file_name = os.path.basename(dst)
+    source_files = [(src, normalize_blob_file_path(destination_path, dst)) for src, dst in source_files]
 
-        _make_directory_in_files_share(client, dir_name)
+    # One progress bar for the whole batch, the files uploaded at the same time each report their own bytes
+    reporter = BatchProgressReporter(progress_callback.hook, len(source_files), 'upload_stream_current') \
+        if progress_callback else None
 
+    def _upload_action(src_dst):
+        src, dst = src_dst
         logger.warning('uploading %s', src)
 
-        storage_file_upload(client.get_file_client(dst), src, content_settings, metadata, validate_content,
-                            progress_callback, max_connections)
+        file_progress = reporter.file_callback(dst) if reporter else None
+        try:
+            storage_file_upload(client.get_file_client(dst), src, content_settings, metadata, validate_content,
+                                file_progress, max_connections)
+        finally:
+            if reporter:
+                reporter.file_done(dst)
+
+        return make_file_url(client, os.path.dirname(dst), os.path.basename(dst))
+
+    with ThreadPoolExecutor(max_workers=max(batch_concurrency or 1, 1)) as executor:
+        # Every directory of the tree is created once, a whole level at a time, before any file goes up
+        existing_dirs = set()
+        for level in _directory_levels(os.path.dirname(dst) for _, dst in source_files):
+            list(executor.map(lambda dir_name: _make_directory_in_files_share(client, dir_name, existing_dirs),
+                              level))
+        results = list(executor.map(_upload_action, source_files))
 
-        return make_file_url(client, dir_name, file_name)
+    if reporter:
+        reporter.end()
+    return results
 
-    return list(_upload_action(src, dst) for src, dst in source_files)
+
+def _directory_levels(directory_paths):
+    """
+    Collect the unique directories, including all ancestors, of the given paths and group them by depth, so that
+    creating the groups in order always creates a parent before its children.
+    """
+    levels = {}
+    for directory_path in directory_paths:
+        while directory_path:
+            depth = directory_path.count('/')
+            if directory_path in levels.setdefault(depth, set()):
+                break
+            levels[depth].add(directory_path)
+            directory_path = os.path.dirname(directory_path)
+    return [sorted(levels[depth]) for depth in sorted(levels)]
 
 
 def _make_directory_in_files_share(share_client, directory_path, existing_dirs=None):
@@ -74,7 +105,7 @@ def _make_directory_in_files_share(share_client, directory_path, existing_dirs=N
     Create directories recursively.
     This method accept a existing_dirs set which serves as the cache of existing directory. If the
     parameter is given, the method will search the set first to avoid repeatedly create directory
-    which already exists.
+    which already exists. The set can be shared by threads creating directories of the same share.
     """
     from azure.common import AzureHttpError
     from azure.core.exceptions import ResourceExistsError
@@ -89,7 +120,7 @@ def _make_directory_in_files_share(share_client, directory_path, existing_dirs=N
         p = os.path.dirname(p)
 
     for dir_name in reversed(parents):
-        if existing_dirs and (dir_name in existing_dirs):
+        if existing_dirs is not None and (dir_name in existing_dirs):
             continue
 
         try:
@@ -100,5 +131,5 @@ def _make_directory_in_files_share(share_client, directory_path, existing_dirs=N
             from knack.util import CLIError
             raise CLIError('Failed to create directory {}'.format(dir_name))
 
-        if existing_dirs:
-            existing_dirs.add(directory_path)
+        if existing_dirs is not None:
+            existing_dirs.add(dir_name)
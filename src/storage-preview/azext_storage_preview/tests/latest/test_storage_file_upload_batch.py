@@ -0,0 +1,75 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from ...operations.file import _directory_levels, _make_directory_in_files_share, storage_file_upload_batch
+
+
+class TestFileUploadBatchDirectories(unittest.TestCase):
+
+    def test_directory_levels_are_unique_and_parent_first(self):
+        levels = _directory_levels(['a/b/c', 'a/b', 'a/d', '', 'e/f/g', 'a/b/c'])
+        self.assertEqual(levels, [['a', 'e'], ['a/b', 'a/d', 'e/f'], ['a/b/c', 'e/f/g']])
+
+    def test_make_directory_uses_cache(self):
+        share_client = mock.MagicMock()
+        existing_dirs = set()
+        for level in _directory_levels(['a/b/c', 'a/b/d', 'a/e']):
+            for dir_name in level:
+                _make_directory_in_files_share(share_client, dir_name, existing_dirs)
+        _make_directory_in_files_share(share_client, 'a/b/c', existing_dirs)
+
+        created = [c[1]['directory_path'] for c in share_client.get_directory_client.call_args_list]
+        self.assertEqual(created, ['a', 'a/b', 'a/e', 'a/b/c', 'a/b/d'])
+        self.assertEqual(existing_dirs, {'a', 'a/b', 'a/e', 'a/b/c', 'a/b/d'})
+
+
+
+class TestFileUploadBatchProgress(unittest.TestCase):
+
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        for i in range(4):
+            with open(os.path.join(self.source, 'file{}'.format(i)), 'wb') as f:
+                f.write(b'x' * 100 * (i + 1))
+
+    def test_files_uploaded_concurrently_report_one_progress(self):
+        # every upload reports its first half once all of them are in flight, so their progress interleaves
+        barrier = threading.Barrier(4, timeout=10)
+        hooks = []
+
+        def _upload_file(data, length, raw_response_hook=None, **kwargs):
+            hooks.append(raw_response_hook)
+            for current in (length // 2, length):
+                response = mock.MagicMock()
+                response.http_response.status_code = 201
+                response.context = {'upload_stream_current': current, 'data_stream_total': length}
+                raw_response_hook(response)
+                if current < length:
+                    barrier.wait()
+
+        client = mock.MagicMock()
+        client.get_file_client.return_value.upload_file.side_effect = _upload_file
+        progress_callback = mock.MagicMock()
+        storage_file_upload_batch(mock.MagicMock(), client, 'share', self.source,
+                                  progress_callback=progress_callback, batch_concurrency=4)
+
+        self.assertEqual(4, len(set(hooks)))
+        self.assertNotIn(progress_callback, hooks)
+        progress_callback.hook.add.assert_called_with(message='4/4 files', value=1000, total_val=1000)
+        values = [c[1]['value'] for c in progress_callback.hook.add.call_args_list]
+        self.assertEqual(sorted(values), values)
+        progress_callback.hook.end.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
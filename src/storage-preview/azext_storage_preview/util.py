@@ -239,3 +239,54 @@ def check_precondition_success(func):
             logger.warning('Failed precondition')
             return False, None
     return wrapper
+
+
+class BatchProgressReporter(object):  # pylint: disable=too-few-public-methods
+    """
+    Aggregate the progress of the transfers of a batch command into a single progress bar. Each transfer gets its
+    own raw_response_hook from file_callback(); the hooks may be invoked from several threads at once.
+    """
+
+    def __init__(self, hook, total_files, current_key, status_codes=(200, 201)):
+        import threading
+        self.hook = hook
+        self._lock = threading.Lock()
+        self._total_files = total_files
+        self._current_key = current_key
+        self._status_codes = status_codes
+        self._files_done = 0
+        self._bytes_current = 0
+        self._bytes_total = 0
+        self._file_current = {}
+        self._file_total = {}
+
+    def file_callback(self, name):
+        def _update_progress(response):
+            if response.http_response.status_code not in self._status_codes:
+                return
+            total = response.context['data_stream_total']
+            if not total:
+                return
+            current = response.context[self._current_key]
+            with self._lock:
+                self._bytes_current += current - self._file_current.get(name, 0)
+                self._bytes_total += total - self._file_total.get(name, 0)
+                self._file_current[name] = current
+                self._file_total[name] = total
+                self._report()
+        return _update_progress
+
+    def file_done(self, name):
+        with self._lock:
+            self._files_done += 1
+            self._file_current.pop(name, None)
+            self._file_total.pop(name, None)
+            self._report()
+
+    def end(self):
+        self.hook.end()
+
+    def _report(self):
+        if self._bytes_total:
+            self.hook.add(message='{}/{} files'.format(self._files_done, self._total_files),
+                          value=self._bytes_current, total_val=self._bytes_total)
@@ -9,6 +9,7 @@ from re import match, search, findall
 from knack.log import get_logger
 from knack.util import CLIError
 from azure.cli.core.azclierror import ValidationError
+from azure.core.exceptions import HttpResponseError
 
 from azure.cli.command_modules.vm.custom import get_vm, _is_linux_os
 from azure.cli.command_modules.resource._client_factory import _resource_client_factory
@@ -55,12 +56,12 @@ def validate_create(cmd, namespace):
     if namespace.repair_group_name:
         if namespace.repair_group_name == namespace.resource_group_name:
             raise CLIError('The repair resource group name cannot be the same as the source VM resource group.')
-        _validate_resource_group_name(namespace.repair_group_name)
+        _validate_resource_group_name(cmd, namespace.repair_group_name)
     else:
         namespace.repair_group_name = 'repair-' + namespace.vm_name + '-' + timestamp
 
     # Check encrypted disk
-    encryption_type, _, _, _ = _fetch_encryption_settings(source_vm)
+    encryption_type, _, _, _ = _fetch_encryption_settings(cmd, source_vm)
     # Currently only supporting single pass
     if encryption_type in (Encryption.SINGLE_WITH_KEK, Encryption.SINGLE_WITHOUT_KEK):
         if not namespace.unlock_encrypted_vm:
@@ -272,7 +273,7 @@ def _validate_disk_name(disk_name):
         raise CLIError('Disk name only allow up to 80 characters.')
 
 
-def _validate_resource_group_name(rg_name):
+def _validate_resource_group_name(cmd, rg_name):
     rg_pattern = r'[0-9a-zA-Z._\-()]+$'
     # if match is null or ends in period, then raise error
     if not match(rg_pattern, rg_name) or rg_name[-1] == '.':
@@ -283,15 +284,13 @@ def _validate_resource_group_name(rg_name):
 
     # Check for existing dup name
     try:
-        list_rg_command = 'az group list --query "[].name" -o json'
         logger.info('Checking for existing resource groups with identical name within subscription...')
-        output = _call_az_command(list_rg_command)
-    except AzCommandError as azCommandError:
-        logger.error(azCommandError)
+        rg_exists = _resource_client_factory(cmd.cli_ctx).resource_groups.check_existence(rg_name)
+    except HttpResponseError as httpResponseError:
+        logger.error(httpResponseError)
         raise CLIError('Unexpected error occured while fetching existing resource groups.')
-    rg_list = loads(output)
 
-    if rg_name in [rg.lower() for rg in rg_list]:
+    if rg_exists:
         raise CLIError('Resource group with name \'{}\' already exists within subscription.'.format(rg_name))
 
 
@@ -6,10 +6,15 @@
 # pylint: disable=line-too-long, too-many-locals, too-many-statements, broad-except, too-many-branches
 import timeit
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from knack.log import get_logger
 
+from azure.core.exceptions import HttpResponseError
+from azure.cli.core.profiles import ResourceType
 from azure.cli.command_modules.vm.custom import get_vm, _is_linux_os
+from azure.cli.command_modules.vm._client_factory import _compute_client_factory
+from azure.cli.command_modules.resource._client_factory import _resource_client_factory
 from azure.cli.command_modules.storage.storage_url_helpers import StorageResourceIdentifier
 from msrestazure.tools import parse_resource_id
 from .exceptions import SkuDoesNotSupportHyperV
@@ -29,10 +34,8 @@ from .repair_utils import (
     _process_bash_parameters,
     _parse_run_script_raw_logs,
     _check_script_succeeded,
-    _fetch_disk_info,
     _unlock_singlepass_encrypted_disk,
     _invoke_run_command,
-    _check_hyperV_gen,
     _get_cloud_init_script,
     _select_distro_linux,
     _check_linux_hyperV_gen,
@@ -49,9 +52,9 @@ def create(cmd, vm_name, resource_group_name, repair_password=None, repair_usern
     command = command_helper(logger, cmd, 'vm repair create')
     # Main command calling block
     try:
-        # Fetch source VM data
-        source_vm = get_vm(cmd, resource_group_name, vm_name)
-        source_vm_instance_view = get_vm(cmd, resource_group_name, vm_name, 'instanceView')
+        # Fetch source VM data, the instance view is expanded in the same call
+        source_vm = get_vm(cmd, resource_group_name, vm_name, 'instanceView')
+        source_vm_instance_view = source_vm
 
         is_linux = _is_linux_os(source_vm)
         is_gen2 = _is_gen2(source_vm_instance_view)
@@ -61,21 +64,38 @@ def create(cmd, vm_name, resource_group_name, repair_password=None, repair_usern
         copy_disk_id = None
         resource_tag = _get_repair_resource_tag(resource_group_name, vm_name)
         created_resources = []
+        compute_client = _compute_client_factory(cmd.cli_ctx)
 
-        # Fetch OS image urn and set OS type for disk create
-        if is_linux:
-            # os_image_urn = "UbuntuLTS"
-            os_type = 'Linux'
-            hyperV_generation_linux = _check_linux_hyperV_gen(source_vm)
-            if hyperV_generation_linux == 'V2':
-                logger.info('Generation 2 VM detected, RHEL/Centos/Oracle 6 distros not available to be used for rescue VM ')
-                logger.debug('gen2 machine detected')
-                os_image_urn = _select_distro_linux_gen2(distro)
-            else:
-                os_image_urn = _select_distro_linux(distro)
-        else:
-            os_image_urn = _fetch_compatible_windows_os_urn(source_vm)
-            os_type = 'Windows'
+        def _fetch_os_image():
+            # Fetch OS image urn and hyperV generation of the source VM
+            if is_linux:
+                hyperV_generation_linux = _check_linux_hyperV_gen(cmd, source_vm)
+                if hyperV_generation_linux == 'V2':
+                    logger.info('Generation 2 VM detected, RHEL/Centos/Oracle 6 distros not available to be used for rescue VM ')
+                    logger.debug('gen2 machine detected')
+                    return _select_distro_linux_gen2(cmd, distro, source_vm.location), hyperV_generation_linux
+                return _select_distro_linux(cmd, distro, source_vm.location), hyperV_generation_linux
+            return _fetch_compatible_windows_os_urn(cmd, source_vm), None
+
+        def _create_resource_group():
+            logger.info('Creating resource group for repair VM and its resources...')
+            _resource_client_factory(cmd.cli_ctx).resource_groups.create_or_update(repair_group_name, {'location': source_vm.location})
+
+        # The lookups below are independent of each other, issue them concurrently
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            os_image_future = executor.submit(_fetch_os_image)
+            sku_future = executor.submit(_fetch_compatible_sku, cmd, source_vm, enable_nested)
+            source_disk_future = executor.submit(compute_client.disks.get, resource_group_name, target_disk_name) if is_managed else None
+            resource_group_future = executor.submit(_create_resource_group)
+
+            os_image_urn, hyperV_generation_linux = os_image_future.result()
+            # Fetch VM size of repair VM
+            sku = sku_future.result()
+            if not sku:
+                raise SkuNotAvailableError('Failed to find compatible VM size for source VM\'s OS disk within given region and subscription.')
+            source_disk = source_disk_future.result() if source_disk_future else None
+            # Create new resource group
+            resource_group_future.result()
 
         # Set up base create vm command
         if is_linux:
@@ -85,10 +105,6 @@ def create(cmd, vm_name, resource_group_name, repair_password=None, repair_usern
             create_repair_vm_command = 'az vm create -g {g} -n {n} --tag {tag} --image {image} --admin-username {username} --admin-password {password} --public-ip-address {option}' \
                 .format(g=repair_group_name, n=repair_vm_name, tag=resource_tag, image=os_image_urn, username=repair_username, password=repair_password, option=associate_public_ip)
 
-        # Fetch VM size of repair VM
-        sku = _fetch_compatible_sku(source_vm, enable_nested)
-        if not sku:
-            raise SkuNotAvailableError('Failed to find compatible VM size for source VM\'s OS disk within given region and subscription.')
         create_repair_vm_command += ' --size {sku}'.format(sku=sku)
 
         # Set availability zone for vm
@@ -96,34 +112,27 @@ def create(cmd, vm_name, resource_group_name, repair_password=None, repair_usern
             zone = source_vm.zones[0]
             create_repair_vm_command += ' --zone {zone}'.format(zone=zone)
 
-        # Create new resource group
-        create_resource_group_command = 'az group create -l {loc} -n {group_name}' \
-                                        .format(loc=source_vm.location, group_name=repair_group_name)
-        logger.info('Creating resource group for repair VM and its resources...')
-        _call_az_command(create_resource_group_command)
-
         # MANAGED DISK
         if is_managed:
             logger.info('Source VM uses managed disks. Creating repair VM with managed disks.\n')
 
-            # Copy OS disk command
-            disk_sku, location, os_type, hyperV_generation = _fetch_disk_info(resource_group_name, target_disk_name)
-            copy_disk_command = 'az disk create -g {g} -n {n} --source {s} --sku {sku} --location {loc} --os-type {os_type} --query id -o tsv' \
-                                .format(g=resource_group_name, n=copy_disk_name, s=target_disk_name, sku=disk_sku, loc=location, os_type=os_type)
+            # Copy OS disk
+            disk_model, disk_sku_model, creation_data = cmd.get_models('Disk', 'DiskSku', 'CreationData', resource_type=ResourceType.MGMT_COMPUTE, operation_group='disks')
+            copy_disk = disk_model(location=source_disk.location, sku=disk_sku_model(name=source_disk.sku.name), os_type=source_disk.os_type,
+                                   creation_data=creation_data(create_option='Copy', source_resource_id=source_disk.id))
 
             # Only add hyperV variable when available
-            if hyperV_generation:
-                copy_disk_command += ' --hyper-v-generation {hyperV}'.format(hyperV=hyperV_generation)
+            if source_disk.hyper_v_generation:
+                copy_disk.hyper_v_generation = source_disk.hyper_v_generation
             elif is_linux and hyperV_generation_linux == 'V2':
                 logger.info('The disk did not contian the info of gen2 , but the machine is created from gen2 image')
-                copy_disk_command += ' --hyper-v-generation {hyperV}'.format(hyperV=hyperV_generation_linux)
+                copy_disk.hyper_v_generation = hyperV_generation_linux
             # Set availability zone for vm when available
             if source_vm.zones:
-                zone = source_vm.zones[0]
-                copy_disk_command += ' --zone {zone}'.format(zone=zone)
+                copy_disk.zones = [source_vm.zones[0]]
             # Copy OS Disk
             logger.info('Copying OS disk of source VM...')
-            copy_disk_id = _call_az_command(copy_disk_command).strip('\n')
+            copy_disk_id = compute_client.disks.begin_create_or_update(resource_group_name, copy_disk_name, copy_disk).result().id
             # For Linux the disk gets not attached at VM creation time. To prevent an incorrect boot state it is required to attach the disk after the VM got created.
             if not is_linux:
                 # Add copied OS Disk to VM creat command so that the VM is created with the disk attached
@@ -223,7 +232,7 @@ def create(cmd, vm_name, resource_group_name, repair_password=None, repair_usern
 
                 logger.debug("stderr: %s", ret_enable_nested_again)
 
-        created_resources = _list_resource_ids_in_rg(repair_group_name)
+        created_resources = _list_resource_ids_in_rg(cmd, repair_group_name)
         command.set_status_success()
 
     # Some error happened. Stop command and clean-up resources.
@@ -231,7 +240,7 @@ def create(cmd, vm_name, resource_group_name, repair_password=None, repair_usern
         command.error_stack_trace = traceback.format_exc()
         command.error_message = "Command interrupted by user input."
         command.message = "Command interrupted by user input. Cleaning up resources."
-    except AzCommandError as azCommandError:
+    except (AzCommandError, HttpResponseError) as azCommandError:
         command.error_stack_trace = traceback.format_exc()
         command.error_message = str(azCommandError)
         command.message = "Repair create failed. Cleaning up created resources."
@@ -267,7 +276,7 @@ def create(cmd, vm_name, resource_group_name, repair_password=None, repair_usern
     if not command.is_status_success():
         command.set_status_error()
         return_dict = command.init_return_dict()
-        _clean_up_resources(repair_group_name, confirm=False)
+        _clean_up_resources(cmd, repair_group_name, confirm=False)
     else:
         created_resources.append(copy_disk_id)
         command.message = 'Your repair VM \'{n}\' has been created in the resource group \'{repair_rg}\' with disk \'{d}\' attached as data disk. ' \
@@ -337,7 +346,7 @@ def restore(cmd, vm_name, resource_group_name, disk_name=None, repair_vm_id=None
             logger.info('Attaching repaired data disk to source VM as an OS disk...')
             _call_az_command(attach_unmanaged_command)
         # Clean
-        _clean_up_resources(repair_resource_group, confirm=not yes)
+        _clean_up_resources(cmd, repair_resource_group, confirm=not yes)
         command.set_status_success()
     except KeyboardInterrupt:
         command.error_stack_trace = traceback.format_exc()
@@ -12,8 +12,13 @@ from json import loads
 import pkgutil
 import requests
 
+from concurrent.futures import ThreadPoolExecutor
 from knack.log import get_logger
 from knack.prompting import prompt_y_n, NoTTYException
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from azure.cli.command_modules.vm._client_factory import _compute_client_factory
+from azure.cli.command_modules.resource._client_factory import _resource_client_factory
+from msrestazure.tools import parse_resource_id
 
 from .encryption_types import Encryption
 
@@ -173,48 +178,66 @@ def check_extension_version(extension_name):
     logger.debug('The extension with name %s does not exist within available extensions.', extension_name)
 
 
-def _clean_up_resources(resource_group_name, confirm):
+def _clean_up_resources(cmd, resource_group_name, confirm):
 
     try:
         if confirm:
             message = 'The clean-up will remove the resource group \'{rg}\' and all repair resources within:\n\n{r}' \
-                      .format(rg=resource_group_name, r='\n'.join(_list_resource_ids_in_rg(resource_group_name)))
+                      .format(rg=resource_group_name, r='\n'.join(_list_resource_ids_in_rg(cmd, resource_group_name)))
             logger.warning(message)
             if not prompt_y_n('Continue with clean-up and delete resources?'):
                 logger.warning('Skipping clean-up')
                 return
 
-        delete_resource_group_command = 'az group delete --name {name} --yes --no-wait'.format(name=resource_group_name)
         logger.info('Cleaning up resources by deleting repair resource group \'%s\'...', resource_group_name)
-        _call_az_command(delete_resource_group_command)
+        # Do not wait for the deletion to finish
+        _resource_client_factory(cmd.cli_ctx).resource_groups.begin_delete(resource_group_name)
     # NoTTYException exception only thrown from confirm block
     except NoTTYException:
         logger.warning('Cannot confirm clean-up resouce in non-interactive mode.')
         logger.warning('Skipping clean-up')
         return
-    except AzCommandError as azCommandError:
-        # Only way to distinguish errors
-        resource_not_found_error_string = 'could not be found'
-        if resource_not_found_error_string in str(azCommandError):
-            logger.info('Resource group not found. Skipping clean up.')
-            return
-        logger.error(azCommandError)
+    except ResourceNotFoundError:
+        logger.info('Resource group not found. Skipping clean up.')
+        return
+    except HttpResponseError as httpResponseError:
+        logger.error(httpResponseError)
         logger.error("Clean up failed.")
 
 
-def _fetch_compatible_sku(source_vm, hyperv):
+def _get_sku_capability(sku, name):
+    return next((capability.value for capability in sku.capabilities or [] if capability.name == name), None)
+
+
+def _is_repair_vm_sku_candidate(sku):
+    """
+    Returns True for VM sizes with 2 to 16 vCPUs, 8 to 32GB memory, data disks, premium IO and known Hyper-V generations.
+    """
+    try:
+        vcpus = float(_get_sku_capability(sku, 'vCPUs'))
+        memory = float(_get_sku_capability(sku, 'MemoryGB'))
+        max_data_disks = float(_get_sku_capability(sku, 'MaxDataDiskCount'))
+    except (TypeError, ValueError):
+        return False
+    return 2 <= vcpus <= 16 and 8 <= memory <= 32 and max_data_disks > 0 and \
+        _get_sku_capability(sku, 'PremiumIO') == 'True' and \
+        _get_sku_capability(sku, 'HyperVGenerations') is not None
+
+
+def _fetch_compatible_sku(cmd, source_vm, hyperv):
+    from azure.cli.command_modules.vm.custom import list_skus
 
     location = source_vm.location
     source_vm_sku = source_vm.hardware_profile.vm_size
 
+    # A single listing of the available sizes in the location answers both checks
+    logger.info('Fetching available VM sizes for repair VM...')
+    vm_skus = [sku for sku in list_skus(cmd, location=location) if sku.resource_type == 'virtualMachines']
+
     # First get the source_vm sku, if its available go with it
     if not (not source_vm_sku.endswith('v3') and hyperv):
-        check_sku_command = 'az vm list-skus -s {sku} -l {loc} --query [].name -o tsv'.format(sku=source_vm_sku, loc=location)
-
         logger.info('Checking if source VM size is available...')
-        sku_check = _call_az_command(check_sku_command).strip('\n')
-
-        if sku_check:
+        if any(source_vm_sku.lower() in sku.name.lower() for sku in vm_skus):
             logger.info('Source VM size \'%s\' is available. Using it to create repair VM.\n', source_vm_sku)
             return source_vm_sku
 
@@ -222,30 +245,8 @@ def _fetch_compatible_sku(source_vm, hyperv):
 
     # List available standard SKUs
     # TODO, premium IO only when needed
-    if not hyperv:
-        list_sku_command = 'az vm list-skus -s standard_d -l {loc} --query ' \
-            '"[?capabilities[?name==\'vCPUs\' && to_number(value)>= to_number(\'2\')] && ' \
-            'capabilities[?name==\'vCPUs\' && to_number(value)<= to_number(\'16\')] && ' \
-            'capabilities[?name==\'MemoryGB\' && to_number(value)>=to_number(\'8\')] && ' \
-            'capabilities[?name==\'MemoryGB\' && to_number(value)<=to_number(\'32\')] && ' \
-            'capabilities[?name==\'MaxDataDiskCount\' && to_number(value)>to_number(\'0\')] && ' \
-            'capabilities[?name==\'PremiumIO\' && value==\'True\'] && ' \
-            'capabilities[?name==\'HyperVGenerations\']].name" -o json ' \
-            .format(loc=location)
-
-    else:
-        list_sku_command = 'az vm list-skus -s _v3 -l {loc} --query ' \
-            '"[?capabilities[?name==\'vCPUs\' && to_number(value)>= to_number(\'2\')] && ' \
-            'capabilities[?name==\'vCPUs\' && to_number(value)<= to_number(\'16\')] && ' \
-            'capabilities[?name==\'MemoryGB\' && to_number(value)>=to_number(\'8\')] && ' \
-            'capabilities[?name==\'MemoryGB\' && to_number(value)<=to_number(\'32\')] && ' \
-            'capabilities[?name==\'MaxDataDiskCount\' && to_number(value)>to_number(\'0\')] && ' \
-            'capabilities[?name==\'PremiumIO\' && value==\'True\'] && ' \
-            'capabilities[?name==\'HyperVGenerations\']].name" -o json ' \
-            .format(loc=location)
-
-    logger.info('Fetching available VM sizes for repair VM...')
-    sku_list = loads(_call_az_command(list_sku_command).strip('\n'))
+    size_filter = '_v3' if hyperv else 'standard_d'
+    sku_list = [sku.name for sku in vm_skus if size_filter in sku.name.lower() and _is_repair_vm_sku_candidate(sku)]
 
     if sku_list:
         logger.info('VM size \'%s\' is available. Using it to create repair VM.\n', sku_list[0])
@@ -254,28 +255,22 @@ def _fetch_compatible_sku(source_vm, hyperv):
     return None
 
 
-def _fetch_disk_info(resource_group_name, disk_name):
-    """ Returns sku, location, os_type, hyperVgeneration as tuples """
-    show_disk_command = 'az disk show -g {g} -n {name} --query [sku.name,location,osType,hyperVGeneration] -o json'.format(g=resource_group_name, name=disk_name)
-    disk_info = loads(_call_az_command(show_disk_command))
-    # Note that disk_info will always have 4 elements if the command succeeded, if it fails it will cause an exception
-    sku, location, os_type, hyper_v_version = disk_info[0], disk_info[1], disk_info[2], disk_info[3]
-    return (sku, location, os_type, hyper_v_version)
+def _fetch_disk(cmd, disk_id):
+    disk_info = parse_resource_id(disk_id)
+    return _compute_client_factory(cmd.cli_ctx).disks.get(disk_info['resource_group'], disk_info['name'])
 
 
 def _get_repair_resource_tag(resource_group_name, source_vm_name):
     return 'repair_source={rg}/{vm_name}'.format(rg=resource_group_name, vm_name=source_vm_name)
 
 
-def _list_resource_ids_in_rg(resource_group_name):
-    get_resources_command = 'az resource list --resource-group {rg} --query [].id -o json' \
-                            .format(rg=resource_group_name)
+def _list_resource_ids_in_rg(cmd, resource_group_name):
     logger.debug('Fetching resources in resource group...')
-    ids = loads(_call_az_command(get_resources_command))
-    return ids
+    resources = _resource_client_factory(cmd.cli_ctx).resources.list_by_resource_group(resource_group_name)
+    return [resource.id for resource in resources]
 
 
-def _fetch_encryption_settings(source_vm):
+def _fetch_encryption_settings(cmd, source_vm):
     key_vault = None
     kekurl = None
     secreturl = None
@@ -285,12 +280,13 @@ def _fetch_encryption_settings(source_vm):
     if not _uses_managed_disk(source_vm):
         return Encryption.NONE, key_vault, kekurl, secreturl
 
-    disk_id = source_vm.storage_profile.os_disk.managed_disk.id
-    show_disk_command = 'az disk show --id {i} --query [encryptionSettingsCollection,encryptionSettingsCollection.encryptionSettings[].diskEncryptionKey.sourceVault.id,encryptionSettingsCollection.encryptionSettings[].keyEncryptionKey.keyUrl,encryptionSettingsCollection.encryptionSettings[].diskEncryptionKey.secretUrl] -o json' \
-                        .format(i=disk_id)
-    encryption_type, key_vault, kekurl, secreturl = loads(_call_az_command(show_disk_command))
-    if [encryption_type, key_vault, kekurl] == [None, None, None]:
+    disk = _fetch_disk(cmd, source_vm.storage_profile.os_disk.managed_disk.id)
+    if disk.encryption_settings_collection is None:
         return Encryption.NONE, key_vault, kekurl, secreturl
+    encryption_settings = disk.encryption_settings_collection.encryption_settings or []
+    key_vault = [settings.disk_encryption_key.source_vault.id for settings in encryption_settings if settings.disk_encryption_key]
+    secreturl = [settings.disk_encryption_key.secret_url for settings in encryption_settings if settings.disk_encryption_key]
+    kekurl = [settings.key_encryption_key.key_url for settings in encryption_settings if settings.key_encryption_key]
     if kekurl == []:
         key_vault, secreturl = key_vault[0], secreturl[0]
         return Encryption.SINGLE_WITHOUT_KEK, key_vault, kekurl, secreturl
@@ -298,40 +294,33 @@ def _fetch_encryption_settings(source_vm):
     return Encryption.SINGLE_WITH_KEK, key_vault, kekurl, secreturl
 
 
-def _check_hyperV_gen(source_vm):
-    disk_id = source_vm.storage_profile.os_disk.managed_disk.id
-    show_disk_command = 'az disk show --id {i} --query [hyperVgeneration] -o json' \
-                        .format(i=disk_id)
-    hyperVGen = loads(_call_az_command(show_disk_command))
+def _check_hyperV_gen(cmd, source_vm):
+    hyperVGen = _fetch_disk(cmd, source_vm.storage_profile.os_disk.managed_disk.id).hyper_v_generation
     if hyperVGen == 'V2':
         raise SkuDoesNotSupportHyperV('Cannot support V2 HyperV generation. Please run command without --enabled-nested')
 
 
-def _check_linux_hyperV_gen(source_vm):
-    disk_id = source_vm.storage_profile.os_disk.managed_disk.id
-    show_disk_command = 'az disk show --id {i} --query [hyperVgeneration] -o json' \
-                        .format(i=disk_id)
-    hyperVGen = loads(_call_az_command(show_disk_command))
+def _check_linux_hyperV_gen(cmd, source_vm):
+    hyperVGen = None
+    if _uses_managed_disk(source_vm):
+        hyperVGen = _fetch_disk(cmd, source_vm.storage_profile.os_disk.managed_disk.id).hyper_v_generation
     if hyperVGen != 'V2':
         logger.info('Trying to check on the source VM if it has the parameter of gen2')
         # if image is created from Marketplace gen2 image , the disk will not have the mark for gen2
-        fetch_hypervgen_command = 'az vm get-instance-view --ids {id} --query "[instanceView.hyperVGeneration]" -o json'.format(id=source_vm.id)
-        hyperVGen_list = loads(_call_az_command(fetch_hypervgen_command))
-        hyperVGen = hyperVGen_list[0]
-        if hyperVGen == 'V2':
-            return hyperVGen
-        else:
-            hyperVGen = 'V1'
-            return hyperVGen
-    else:
-        return hyperVGen
+        instance_view = source_vm.instance_view
+        if instance_view is None:
+            instance_view = _compute_client_factory(cmd.cli_ctx).virtual_machines.instance_view(
+                parse_resource_id(source_vm.id)['resource_group'], source_vm.name)
+        if instance_view.hyper_v_generation == 'V2':
+            return 'V2'
+        return 'V1'
+    return 'V2'
 
 
-def _secret_tag_check(resource_group_name, copy_disk_name, secreturl):
+def _secret_tag_check(cmd, resource_group_name, copy_disk_name, secreturl):
     DEFAULT_LINUXPASSPHRASE_FILENAME = 'LinuxPassPhraseFileName'
-    show_disk_command = 'az disk show -g {g} -n {n} --query encryptionSettingsCollection.encryptionSettings[].diskEncryptionKey.secretUrl -o json' \
-                        .format(n=copy_disk_name, g=resource_group_name)
-    secreturl_new = loads(_call_az_command(show_disk_command))[0]
+    copy_disk = _compute_client_factory(cmd.cli_ctx).disks.get(resource_group_name, copy_disk_name)
+    secreturl_new = copy_disk.encryption_settings_collection.encryption_settings[0].disk_encryption_key.secret_url
     if secreturl == secreturl_new:
         logger.debug('Secret urls are same. Skipping the tag check...')
     else:
@@ -351,13 +340,13 @@ def _unlock_singlepass_encrypted_disk(repair_vm_name, repair_group_name, is_linu
     return _unlock_mount_windows_encrypted_disk(repair_vm_name, repair_group_name)
 
 
-def _unlock_singlepass_encrypted_disk_fallback(source_vm, resource_group_name, repair_vm_name, repair_group_name, copy_disk_name, is_linux):
+def _unlock_singlepass_encrypted_disk_fallback(cmd, source_vm, resource_group_name, repair_vm_name, repair_group_name, copy_disk_name, is_linux):
     """
     Fallback for unlocking disk when script fails. This will install the ADE extension to unlock the Data disk.
     """
 
     # Installs the extension on repair VM and mounts the disk after unlocking.
-    encryption_type, key_vault, kekurl, secreturl = _fetch_encryption_settings(source_vm)
+    encryption_type, key_vault, kekurl, secreturl = _fetch_encryption_settings(cmd, source_vm)
     if is_linux:
         volume_type = 'DATA'
     else:
@@ -378,7 +367,7 @@ def _unlock_singlepass_encrypted_disk_fallback(source_vm, resource_group_name, r
         # Linux VM encryption extension has a bug and we need to manually unlock and mount its disk
         if is_linux:
             # Validating secret tag and setting original tag if it got changed
-            _secret_tag_check(resource_group_name, copy_disk_name, secreturl)
+            _secret_tag_check(cmd, resource_group_name, copy_disk_name, secreturl)
             logger.debug("Manually unlocking and mounting disk for Linux VMs.")
             _unlock_mount_linux_encrypted_disk(repair_vm_name, repair_group_name)
     except AzCommandError as azCommandError:
@@ -387,7 +376,7 @@ def _unlock_singlepass_encrypted_disk_fallback(source_vm, resource_group_name, r
         if is_linux and "Failed to encrypt data volumes with error" in error_message:
             logger.debug("Expected bug for linux VMs. Ignoring error.")
             # Validating secret tag and setting original tag if it got changed
-            _secret_tag_check(resource_group_name, copy_disk_name, secreturl)
+            _secret_tag_check(cmd, resource_group_name, copy_disk_name, secreturl)
             _unlock_mount_linux_encrypted_disk(repair_vm_name, repair_group_name)
         else:
             raise
@@ -405,11 +394,36 @@ def _unlock_mount_windows_encrypted_disk(repair_vm_name, repair_group_name):
     return _invoke_run_command(WINDOWS_RUN_SCRIPT_NAME, repair_vm_name, repair_group_name, False)
 
 
-def _fetch_compatible_windows_os_urn(source_vm):
+def _list_image_urns(cmd, location, publisher, offer, sku):
+    """
+    Returns the urns of the images whose publisher, offer and sku contain the given filters, latest first.
+    Same matching as 'az vm image list --all', the versions of the matching skus are listed concurrently.
+    """
+    images_client = _compute_client_factory(cmd.cli_ctx).virtual_machine_images
+    image_skus = []
+    for image_publisher in images_client.list_publishers(location):
+        if publisher.lower() not in image_publisher.name.lower():
+            continue
+        for image_offer in images_client.list_offers(location, image_publisher.name):
+            if offer.lower() not in image_offer.name.lower():
+                continue
+            for image_sku in images_client.list_skus(location, image_publisher.name, image_offer.name):
+                if sku.lower() in image_sku.name.lower():
+                    image_skus.append((image_publisher.name, image_offer.name, image_sku.name))
+
+    def _list_urns(image_sku):
+        return [':'.join(image_sku + (version.name,)) for version in images_client.list(location, *image_sku)]
+
+    with ThreadPoolExecutor(max_workers=max(min(len(image_skus), 8), 1)) as executor:
+        urns = [urn for sku_urns in executor.map(_list_urns, image_skus) for urn in sku_urns]
+    return sorted(urns, reverse=True)
+
+
+def _fetch_compatible_windows_os_urn(cmd, source_vm):
     location = source_vm.location
-    fetch_urn_command = 'az vm image list -s "2016-Datacenter" -f WindowsServer -p MicrosoftWindowsServer -l {loc} --verbose --all --query "[?sku==\'2016-Datacenter\'].urn | reverse(sort(@))" -o json'.format(loc=location)
     logger.info('Fetching compatible Windows OS images from gallery...')
-    urns = loads(_call_az_command(fetch_urn_command))
+    urns = [urn for urn in _list_image_urns(cmd, location, 'MicrosoftWindowsServer', 'WindowsServer', '2016-Datacenter')
+            if urn.split(':')[2] == '2016-Datacenter']
 
     # No OS images available for Windows2016
     if not urns:
@@ -428,10 +442,9 @@ def _fetch_compatible_windows_os_urn(source_vm):
     return urns[0]
 
 
-def _suse_image_selector(distro):
-    fetch_urn_command = 'az vm image list --publisher SUSE --offer {offer} --sku gen1 --verbose --all --query "[].urn | reverse(sort(@))" -o json'.format(offer=distro)
+def _suse_image_selector(cmd, distro, location):
     logger.info('Fetching compatible SUSE OS images from gallery...')
-    urns = loads(_call_az_command(fetch_urn_command))
+    urns = _list_image_urns(cmd, location, 'SUSE', distro, 'gen1')
 
     # Raise exception when not finding SUSE image
     if not urns:
@@ -443,10 +456,9 @@ def _suse_image_selector(distro):
     return urns[0]
 
 
-def _suse_image_selector_gen2(distro):
-    fetch_urn_command = 'az vm image list --publisher SUSE --offer {offer} --sku gen2 --verbose --all --query "[].urn | reverse(sort(@))" -o json'.format(offer=distro)
+def _suse_image_selector_gen2(cmd, distro, location):
     logger.info('Fetching compatible SUSE OS images from gallery...')
-    urns = loads(_call_az_command(fetch_urn_command))
+    urns = _list_image_urns(cmd, location, 'SUSE', distro, 'gen2')
 
     # Raise exception when not finding SUSE image
     if not urns:
@@ -458,7 +470,7 @@ def _suse_image_selector_gen2(distro):
     return urns[0]
 
 
-def _select_distro_linux(distro):
+def _select_distro_linux(cmd, distro, location):
     image_lookup = {
         'rhel6': 'RedHat:RHEL:6.10:latest',
         'rhel7': 'RedHat:rhel-raw:7-raw:latest',
@@ -471,11 +483,16 @@ def _select_distro_linux(distro):
         'oracle6': 'Oracle:Oracle-Linux:6.10:latest',
         'oracle7': 'Oracle:Oracle-Linux:ol79:latest',
         'oracle8': 'Oracle:Oracle-Linux:ol82:latest',
-        'sles12': _suse_image_selector('sles-12'),
-        'sles15': _suse_image_selector('sles-15')
+    }
+    # SUSE images are looked up only when asked for
+    suse_lookup = {
+        'sles12': 'sles-12',
+        'sles15': 'sles-15'
     }
     if distro in image_lookup:
         os_image_urn = image_lookup[distro]
+    elif distro in suse_lookup:
+        os_image_urn = _suse_image_selector(cmd, suse_lookup[distro], location)
     else:
         if distro.count(":") == 3:
             logger.info('A custom URN was provided , will be used as distro for the recovery VM')
@@ -486,7 +503,7 @@ def _select_distro_linux(distro):
     return os_image_urn
 
 
-def _select_distro_linux_gen2(distro):
+def _select_distro_linux_gen2(cmd, distro, location):
     # base on the document : https://docs.microsoft.com/en-us/azure/virtual-machines/generation-2#generation-2-vm-images-in-azure-marketplace
     # RHEL/Centos/Oracle 6 are not supported for Gen 2
     image_lookup = {
@@ -501,11 +518,16 @@ def _select_distro_linux_gen2(distro):
         'oracle6': 'Oracle:Oracle-Linux:ol79-gen2:latest',
         'oracle7': 'Oracle:Oracle-Linux:ol79-gen2:latest',
         'oracle8': 'Oracle:Oracle-Linux:ol82-gen2:latest',
-        'sles12': _suse_image_selector_gen2('sles-12'),
-        'sles15': _suse_image_selector_gen2('sles-15')
+    }
+    # SUSE images are looked up only when asked for
+    suse_lookup = {
+        'sles12': 'sles-12',
+        'sles15': 'sles-15'
     }
     if distro in image_lookup:
         os_image_urn = image_lookup[distro]
+    elif distro in suse_lookup:
+        os_image_urn = _suse_image_selector_gen2(cmd, suse_lookup[distro], location)
     else:
         if distro.count(":") == 3:
             logger.info('A custom URN was provided , will be used as distro for the recovery VM')
@@ -0,0 +1,74 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: disable=line-too-long
+import unittest
+from unittest import mock
+
+from azext_vm_repair.repair_utils import _fetch_compatible_sku, _select_distro_linux, _list_image_urns
+
+
+def _sku(name, vcpus='4', memory='16', resource_type='virtualMachines'):
+    sku = mock.MagicMock(resource_type=resource_type)
+    sku.name = name
+    capabilities = {'vCPUs': vcpus, 'MemoryGB': memory, 'MaxDataDiskCount': '8', 'PremiumIO': 'True', 'HyperVGenerations': 'V1,V2'}
+    sku.capabilities = []
+    for capability_name, value in capabilities.items():
+        capability = mock.MagicMock(value=value)
+        capability.name = capability_name
+        sku.capabilities.append(capability)
+    return sku
+
+
+def _named(name):
+    resource = mock.MagicMock()
+    resource.name = name
+    return resource
+
+
+class RepairUtilsTest(unittest.TestCase):
+
+    def _source_vm(self, vm_size):
+        source_vm = mock.MagicMock(location='westus')
+        source_vm.hardware_profile.vm_size = vm_size
+        return source_vm
+
+    @mock.patch('azure.cli.command_modules.vm.custom.list_skus')
+    def test_fetch_compatible_sku_uses_source_size(self, list_skus):
+        list_skus.return_value = [_sku('Standard_D2s_v3'), _sku('Standard_D4s_v3')]
+        self.assertEqual(_fetch_compatible_sku(mock.MagicMock(), self._source_vm('Standard_D4s_v3'), False), 'Standard_D4s_v3')
+        list_skus.assert_called_once()
+
+    @mock.patch('azure.cli.command_modules.vm.custom.list_skus')
+    def test_fetch_compatible_sku_filters_capabilities(self, list_skus):
+        list_skus.return_value = [_sku('Standard_D64s_v3', vcpus='64', memory='256'), _sku('Standard_D2', resource_type='disks'),
+                                  _sku('Standard_E4s_v3'), _sku('Standard_D4s_v3')]
+        self.assertEqual(_fetch_compatible_sku(mock.MagicMock(), self._source_vm('Standard_M8ms'), False), 'Standard_D4s_v3')
+        # a single listing answers both the source size check and the fallback
+        list_skus.assert_called_once()
+
+    @mock.patch('azext_vm_repair.repair_utils._list_image_urns')
+    def test_select_distro_linux_looks_up_suse_only_when_asked(self, list_image_urns):
+        list_image_urns.return_value = ['SUSE:sles-15-sp3:gen1:2022.01.01', 'SUSE:sles-15-sp2:gen1:2021.01.01']
+        self.assertEqual(_select_distro_linux(mock.MagicMock(), 'ubuntu18', 'westus'), 'Canonical:UbuntuServer:18.04-LTS:latest')
+        list_image_urns.assert_not_called()
+        self.assertEqual(_select_distro_linux(mock.MagicMock(), 'sles15', 'westus'), 'SUSE:sles-15-sp3:gen1:2022.01.01')
+        list_image_urns.assert_called_once_with(mock.ANY, 'westus', 'SUSE', 'sles-15', 'gen1')
+
+    @mock.patch('azext_vm_repair.repair_utils._compute_client_factory')
+    def test_list_image_urns_matches_like_image_list_all(self, compute_client_factory):
+        images = compute_client_factory.return_value.virtual_machine_images
+        images.list_publishers.return_value = [_named('SUSE'), _named('Canonical')]
+        images.list_offers.return_value = [_named('sles-15-sp2'), _named('sles-12-sp5')]
+        images.list_skus.side_effect = lambda location, publisher, offer: [_named('gen1'), _named('gen2')]
+        images.list.side_effect = lambda location, publisher, offer, sku: [_named('2021.01.01'), _named('2022.01.01')]
+
+        urns = _list_image_urns(mock.MagicMock(), 'westus', 'SUSE', 'sles-15', 'gen1')
+        self.assertEqual(urns, ['SUSE:sles-15-sp2:gen1:2022.01.01', 'SUSE:sles-15-sp2:gen1:2021.01.01'])
+        images.list_offers.assert_called_once_with('westus', 'SUSE')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import queue
+import socket
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from azext_webapp.tunnel import TunnelConnection, TunnelServer
+
+CLIENTS = 8
+PAYLOAD_SIZE = 1024 * 1024
+
+
+class _EchoWebSocket(object):
+    """ a websocket whose remote end sends back every message """
+
+    def __init__(self):
+        self.connected = True
+        self._messages = queue.Queue()
+
+    def send_binary(self, data):
+        self._messages.put(data)
+
+    def recv(self):
+        return self._messages.get()
+
+    def close(self):
+        self.connected = False
+        self._messages.put(b'')
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TunnelServerTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('azext_webapp.tunnel.create_connection',
+                             side_effect=lambda *args, **kwargs: _EchoWebSocket())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = TunnelServer('127.0.0.1', 0, 'app', 'user', 'password')
+        self.addCleanup(self.server.sock.close)
+
+    def _round_trip(self, client, payload, barrier):
+        barrier.wait()
+        sender = threading.Thread(target=client.sendall, args=(payload,), daemon=True)
+        sender.start()
+        received = bytearray()
+        while len(received) < len(payload):
+            data = client.recv(65536)
+            if not data:
+                break
+            received.extend(data)
+        sender.join()
+        return bytes(received)
+
+    def test_concurrent_clients_are_tunneled(self):
+        threading.Thread(target=self.server.start_server, daemon=True).start()
+        payloads = [os.urandom(PAYLOAD_SIZE) for _ in range(CLIENTS)]
+        clients = [socket.create_connection(('127.0.0.1', self.server.local_port), timeout=10) for _ in range(CLIENTS)]
+        try:
+            # the clients send at the same time, each over its own websocket
+            barrier = threading.Barrier(CLIENTS, timeout=10)
+            with ThreadPoolExecutor(max_workers=CLIENTS) as executor:
+                received = list(executor.map(self._round_trip, clients, payloads, [barrier] * CLIENTS))
+            self.assertEqual(payloads, received)
+
+            def _all_counted():
+                stats = self.server.get_connection_stats()
+                return len(stats) == CLIENTS and all(s['bytesToLocal'] == PAYLOAD_SIZE and
+                                                     s['messagesToLocal'] == s['messagesToRemote'] for s in stats)
+
+            self.assertTrue(_wait_for(_all_counted))
+            for stats in self.server.get_connection_stats():
+                self.assertEqual(PAYLOAD_SIZE, stats['bytesToRemote'])
+                self.assertGreater(stats['messagesToRemote'], 0)
+        finally:
+            for client in clients:
+                client.close()
+        # the connections are dropped once their clients are closed
+        self.assertTrue(_wait_for(lambda: not self.server.get_connection_stats()))
+
+    def test_stats_of_open_connections_are_logged_on_shutdown(self):
+        connection = TunnelConnection(1, mock.Mock(), _EchoWebSocket())
+        connection.bytes_to_remote = 10
+        self.server.connections[1] = connection
+        with mock.patch.object(TunnelServer, '_listen', side_effect=KeyboardInterrupt), \
+                mock.patch('azext_webapp.tunnel.logger') as logger:
+            with self.assertRaises(KeyboardInterrupt):
+                self.server.start_server()
+        stats = [call[0][1] for call in logger.info.call_args_list if call[0][0] == 'Connection stats: %s']
+        self.assertEqual([1], [s['index'] for s in stats])
+        self.assertEqual(10, stats[0]['bytesToRemote'])
+
+
+if __name__ == '__main__':
+    unittest.main()
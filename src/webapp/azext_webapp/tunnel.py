@@ -12,7 +12,7 @@ import traceback
 import logging as logs
 from contextlib import closing
 from datetime import datetime
-from threading import Thread
+from threading import Lock, Thread
 
 import websocket
 from websocket import create_connection, WebSocket
@@ -22,16 +22,60 @@ from knack.log import get_logger
 logger = get_logger(__name__)
 
 
+# the size of the first read of a local connection, doubled while reads fill the buffer
+TUNNEL_READ_SIZE = 4096
+TUNNEL_MAX_READ_SIZE = 64 * 1024
+
+
 class TunnelWebSocket(WebSocket):
     def recv_frame(self):
         frame = super(TunnelWebSocket, self).recv_frame()
-        logger.info('Received frame: %s', frame)
+        logger.debug('Received frame: opcode %s, %s bytes', frame.opcode, len(frame.data))
         return frame
 
-    def recv(self):
-        data = super(TunnelWebSocket, self).recv()
-        logger.info('Received websocket data: %s', data)
-        return data
+
+class TunnelConnection(object):  # pylint: disable=too-many-instance-attributes
+    """
+    A local client and its own websocket, with counters of the data tunneled in each direction. The latency of
+    a direction is the time spent forwarding its messages.
+    """
+
+    def __init__(self, index, client, ws):
+        self.index = index
+        self.client = client
+        self.ws = ws
+        self.connected_at = time.time()
+        self.bytes_to_remote = 0
+        self.bytes_to_local = 0
+        self.messages_to_remote = 0
+        self.messages_to_local = 0
+        self.latency_to_remote = 0.0
+        self.latency_to_local = 0.0
+        self.closed = False
+        self._lock = Lock()
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.client.close()
+        self.ws.close()
+
+    def get_stats(self):
+        def _average_ms(seconds, messages):
+            return round(seconds * 1000 / messages, 3) if messages else 0.0
+
+        return {
+            'index': self.index,
+            'seconds': round(time.time() - self.connected_at, 3),
+            'bytesToRemote': self.bytes_to_remote,
+            'bytesToLocal': self.bytes_to_local,
+            'messagesToRemote': self.messages_to_remote,
+            'messagesToLocal': self.messages_to_local,
+            'averageLatencyToRemoteMs': _average_ms(self.latency_to_remote, self.messages_to_remote),
+            'averageLatencyToLocalMs': _average_ms(self.latency_to_local, self.messages_to_local)
+        }
 
 
 # pylint: disable=no-member,too-many-instance-attributes,bare-except,no-self-use
@@ -46,6 +90,8 @@ class TunnelServer(object):
         self.remote_password = remote_password
         self.client = None
         self.ws = None
+        self.connections = {}
+        self._connections_lock = Lock()
         logger.info('Creating a socket on port: %s', self.local_port)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         logger.info('Setting socket options')
@@ -106,85 +152,112 @@ class TunnelServer(object):
         self.sock.listen(100)
         index = 0
         basic_auth_string = self.create_basic_auth()
+        host = 'wss://{}{}'.format(self.remote_addr, '.scm.azurewebsites.net/AppServiceTunnel/Tunnel.ashx')
+        basic_auth_header = 'Authorization: Basic {}'.format(basic_auth_string)
+        cli_logger = get_logger()  # get CLI logger which has the level set through command lines
+        is_verbose = any(handler.level <= logs.INFO for handler in cli_logger.handlers)
+        if is_verbose:
+            logger.info('Websocket tracing enabled')
+            websocket.enableTrace(True)
+        else:
+            logger.warning('Websocket tracing disabled, use --verbose flag to enable')
+            websocket.enableTrace(False)
         while True:
-            self.client, _address = self.sock.accept()
-            self.client.settimeout(1800)
-            host = 'wss://{}{}'.format(self.remote_addr, '.scm.azurewebsites.net/AppServiceTunnel/Tunnel.ashx')
-            basic_auth_header = 'Authorization: Basic {}'.format(basic_auth_string)
-            cli_logger = get_logger()  # get CLI logger which has the level set through command lines
-            is_verbose = any(handler.level <= logs.INFO for handler in cli_logger.handlers)
-            if is_verbose:
-                logger.info('Websocket tracing enabled')
-                websocket.enableTrace(True)
-            else:
-                logger.warning('Websocket tracing disabled, use --verbose flag to enable')
-                websocket.enableTrace(False)
-            self.ws = create_connection(host,
-                                        sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
-                                        class_=TunnelWebSocket,
-                                        header=[basic_auth_header],
-                                        sslopt={'cert_reqs': ssl.CERT_NONE},
-                                        enable_multithread=True)
-            logger.info('Websocket, connected status: %s', self.ws.connected)
+            client, _address = self.sock.accept()
+            client.settimeout(1800)
             index = index + 1
             logger.info('Got debugger connection... index: %s', index)
-            debugger_thread = Thread(target=self._listen_to_client, args=(self.client, self.ws, index))
-            web_socket_thread = Thread(target=self._listen_to_web_socket, args=(self.client, self.ws, index))
-            debugger_thread.start()
-            web_socket_thread.start()
-            logger.info('Both debugger and websocket threads started...')
-            logger.warning('Successfully connected to local server..')
-            debugger_thread.join()
-            web_socket_thread.join()
-            logger.info('Both debugger and websocket threads stopped...')
-            logger.warning('Stopped local server..')
-
-    def _listen_to_web_socket(self, client, ws_socket, index):
+            # each client is served on its own threads so that the next one is accepted right away
+            Thread(target=self._serve_client, args=(client, host, basic_auth_header, index), daemon=True).start()
+
+    def _serve_client(self, client, host, basic_auth_header, index):
+        try:
+            ws = create_connection(host,
+                                   sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
+                                   class_=TunnelWebSocket,
+                                   header=[basic_auth_header],
+                                   sslopt={'cert_reqs': ssl.CERT_NONE},
+                                   enable_multithread=True)
+        except:
+            traceback.print_exc(file=sys.stdout)
+            client.close()
+            return
+        logger.info('Websocket, connected status: %s, index: %s', ws.connected, index)
+        self.client = client
+        self.ws = ws
+        connection = TunnelConnection(index, client, ws)
+        with self._connections_lock:
+            self.connections[index] = connection
+
+        web_socket_thread = Thread(target=self._listen_to_web_socket, args=(connection,), daemon=True)
+        web_socket_thread.start()
+        logger.warning('Successfully connected to local server.. index: %s', index)
+        self._listen_to_client(connection)
+        web_socket_thread.join()
+        with self._connections_lock:
+            del self.connections[index]
+        logger.info('Connection stats: %s', connection.get_stats())
+        logger.warning('Stopped local server.. index: %s', index)
+
+    def get_connection_stats(self):
+        with self._connections_lock:
+            connections = list(self.connections.values())
+        return [connection.get_stats() for connection in connections]
+
+    def _listen_to_web_socket(self, connection):
+        client, ws_socket, index = connection.client, connection.ws, connection.index
         while True:
             try:
-                logger.info('Waiting for websocket data, connection status: %s, index: %s', ws_socket.connected, index)
                 data = ws_socket.recv()
-                logger.info('Received websocket data: %s, index: %s', data, index)
                 if data:
-                    # Set the response to echo back the recieved data
-                    response = data
-                    logger.info('Sending to debugger, response: %s, index: %s', response, index)
-                    client.sendall(response)
-                    logger.info('Done sending to debugger, index: %s', index)
+                    start = time.time()
+                    client.sendall(data)
+                    connection.latency_to_local += time.time() - start
+                    connection.bytes_to_local += len(data)
+                    connection.messages_to_local += 1
                 else:
                     logger.info('Client disconnected!, index: %s', index)
-                    client.close()
-                    ws_socket.close()
+                    connection.close()
                     break
             except:
-                traceback.print_exc(file=sys.stdout)
-                client.close()
-                ws_socket.close()
+                if not connection.closed:
+                    traceback.print_exc(file=sys.stdout)
+                connection.close()
                 return False
 
-    def _listen_to_client(self, client, ws_socket, index):
+    def _listen_to_client(self, connection):
+        client, ws_socket, index = connection.client, connection.ws, connection.index
+        # the buffer is reused by every read, which grows while the client sends more than it holds
+        buf = memoryview(bytearray(TUNNEL_MAX_READ_SIZE))
+        read_size = TUNNEL_READ_SIZE
         while True:
             try:
-                logger.info('Waiting for debugger data, index: %s', index)
-                buf = bytearray(4096)
-                nbytes = client.recv_into(buf, 4096)
-                logger.info('Received debugger data, nbytes: %s, index: %s', nbytes, index)
+                nbytes = client.recv_into(buf, read_size)
                 if nbytes > 0:
-                    responseData = buf[0:nbytes]
-                    logger.info('Sending to websocket, response data: %s, index: %s', responseData, index)
-                    ws_socket.send_binary(responseData)
-                    logger.info('Done sending to websocket, index: %s', index)
+                    start = time.time()
+                    ws_socket.send_binary(bytes(buf[:nbytes]))
+                    connection.latency_to_remote += time.time() - start
+                    connection.bytes_to_remote += nbytes
+                    connection.messages_to_remote += 1
+                    if nbytes == read_size:
+                        read_size = min(read_size * 2, TUNNEL_MAX_READ_SIZE)
+                    elif nbytes < read_size // 4:
+                        read_size = max(read_size // 2, TUNNEL_READ_SIZE)
                 else:
                     logger.warning('Client disconnected %s', index)
-                    client.close()
-                    ws_socket.close()
+                    connection.close()
                     break
             except:
-                traceback.print_exc(file=sys.stdout)
-                client.close()
-                ws_socket.close()
+                if not connection.closed:
+                    traceback.print_exc(file=sys.stdout)
+                connection.close()
                 return False
 
     def start_server(self):
         logger.warning('Start your favorite client and connect to port %s', self.local_port)
-        self._listen()
+        try:
+            self._listen()
+        finally:
+            # the connections still open when the server stops, e.g. on Ctrl+C
+            for stats in self.get_connection_stats():
+                logger.info('Connection stats: %s', stats)